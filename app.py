@@ -1,239 +1,1293 @@
 # -*- coding: utf-8 -*-
-from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, jsonify, make_response, g
+from flask import has_request_context, before_render_template, template_rendered
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from markupsafe import Markup
+from werkzeug.datastructures import CallbackDict
+from werkzeug.security import check_password_hash, generate_password_hash
+import base64
+import csv
+import hashlib
+import heapq
+import hmac
+import io
+import json
+import math
+import os
+import re
+import secrets
+import shutil
+import statistics
 import sqlite3
-from datetime import datetime
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import click
+from datetime import datetime, timedelta
   
 app = Flask(__name__)
 app.secret_key = "super_secret_key_nsi_2026"
 
+CHEMIN_DB = os.environ.get('NOOB_NOTE_DB', 'pronote.db')
+# Base utilisée par les requêtes ; un outil peut la changer le temps d'une vérification.
+app.config['CHEMIN_DB'] = CHEMIN_DB
+TAILLE_POOL = int(os.environ.get('NOOB_NOTE_TAILLE_POOL', '5'))
 JOURS_SEMAINE = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi']
+# Jour des cours en toutes lettres, tel qu'il est rangé dans EmploiDuTemps.jour_semaine (jour_num = rang + 1).
+NOMS_JOURS = JOURS_SEMAINE + ['Samedi', 'Dimanche']
+LIMITE_RECHERCHE = 20
+# Bornes des tranches de l'histogramme des notes : [0, 4[, [4, 8[, [8, 12[, [12, 16[, [16, 20].
+TRANCHES_HISTOGRAMME = (4, 8, 12, 16)
+NOTE_MAX = 20
+COEFFICIENT_MAX = 20
+
+# Réglages appliqués à chaque connexion ouverte par le pool. Le journal WAL, lui,
+# est gardé dans le fichier : il est activé une fois par activer_wal (commande migrer).
+PRAGMAS_CONNEXION = [
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA mmap_size = 67108864",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+]
+TAILLE_CACHE_REQUETES = 256
+
+TAILLE_CACHE_CLASSES = int(os.environ.get('NOOB_NOTE_CACHE_TAILLE', '2048'))
+DUREE_CACHE_CLASSES = float(os.environ.get('NOOB_NOTE_CACHE_TTL', '300'))
+TYPE_CACHE_CLASSES = os.environ.get('NOOB_NOTE_CACHE', 'memoire')
+FICHIER_CACHE_CLASSES = os.environ.get('NOOB_NOTE_CACHE_FICHIER', 'cache_calculs.db')
+
+# Coût du hachage des mots de passe (PBKDF2) : à ajuster selon le CPU disponible par connexion.
+ITERATIONS_HACHAGE = int(os.environ.get('NOOB_NOTE_HACHAGE_ITERATIONS', '600000'))
+METHODE_HACHAGE = f"pbkdf2:sha256:{ITERATIONS_HACHAGE}"
+TAILLE_CACHE_CONNEXIONS = int(os.environ.get('NOOB_NOTE_CACHE_CONNEXIONS', '10000'))
+DUREE_CACHE_CONNEXIONS = float(os.environ.get('NOOB_NOTE_CACHE_CONNEXIONS_TTL', '3600'))
+
+# Sessions : 'sqlite' (côté serveur, partagées par les workers) ou 'cookie' (cookie signé de Flask).
+TYPE_SESSIONS = os.environ.get('NOOB_NOTE_SESSIONS', 'sqlite')
+# Par défaut, sessions.db à côté de la base (voir SessionsSQLite.pool).
+FICHIER_SESSIONS = os.environ.get('NOOB_NOTE_SESSIONS_FICHIER')
+
+# Profilage des requêtes (désactivé par défaut) : compteurs SQL et rendu par route sur /admin/metrics.
+PROFILAGE_ACTIF = os.environ.get('NOOB_NOTE_PROFILAGE', '0') == '1'
+SEUIL_REQUETE_LENTE_MS = float(os.environ.get('NOOB_NOTE_SEUIL_LENT_MS', '500'))
+
+# Change à chaque déploiement de nouveaux gabarits : les ETag des pages élève en dépendent.
+DOSSIER_GABARITS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+VERSION_GABARITS = str(int(max(
+    (os.path.getmtime(os.path.join(DOSSIER_GABARITS, nom)) for nom in os.listdir(DOSSIER_GABARITS)),
+    default=0
+)))
+
+# -------------------------------------------------------------------------
+# CONNEXIONS A LA BASE (pool partagé par processus)
+# -------------------------------------------------------------------------
+
+
+class PoolConnexions:
+    """Garde des connexions SQLite ouvertes pour les réutiliser entre les requêtes.
+
+    Un pool appartient à un seul processus (un worker gunicorn) et peut être
+    utilisé par plusieurs threads : chaque thread emprunte une connexion puis
+    la rend à la fin de son travail.
+    """
+
+    def __init__(self, chemin_db, taille):
+        self.chemin_db = chemin_db
+        self.taille = taille
+        self.pid = os.getpid()
+        self._libres = []
+        self._verrou = threading.Lock()
+        self.connexions_creees = 0
+        self.reutilisations = 0
+        self.fermetures = 0
+        # Fonction appelée avec le texte de chaque requête (voir tracer).
+        self.trace = None
+
+    def _ouvrir(self):
+        """Ouvre une connexion déjà configurée (WAL, cache, mmap...)."""
+        conn = sqlite3.connect(
+            self.chemin_db,
+            timeout=30,
+            check_same_thread=False,
+            cached_statements=TAILLE_CACHE_REQUETES,
+            factory=ConnexionMesuree if PROFILAGE_ACTIF else sqlite3.Connection
+        )
+        if self.trace is not None:
+            conn.set_trace_callback(self.trace)
+        for pragma in PRAGMAS_CONNEXION:
+            conn.execute(pragma)
+        return conn
+
+    def _prendre(self):
+        with self._verrou:
+            if self._libres:
+                self.reutilisations += 1
+                return self._libres.pop()
+            self.connexions_creees += 1
+        return self._ouvrir()
+
+    def _rendre(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._verrou:
+            if len(self._libres) < self.taille:
+                self._libres.append(conn)
+                return
+            self.fermetures += 1
+        conn.close()
+
+    @contextmanager
+    def connexion(self):
+        """Prête une connexion le temps d'un bloc with."""
+        conn = self._prendre()
+        try:
+            yield conn
+        finally:
+            self._rendre(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Donne un curseur dont les écritures sont validées ensemble (ou annulées)."""
+        with self.connexion() as conn:
+            try:
+                yield conn.cursor()
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+
+    def tracer(self, rappel):
+        """Transmet le texte de chaque requête à rappel (None pour arrêter).
+
+        S'applique aux connexions libres et à celles ouvertes ensuite : à
+        appeler quand aucune connexion n'est empruntée.
+        """
+        with self._verrou:
+            self.trace = rappel
+            for conn in self._libres:
+                conn.set_trace_callback(rappel)
+
+    def statistiques(self):
+        """Compteurs du pool, pour vérifier que les connexions sont bien réutilisées."""
+        with self._verrou:
+            demandes = self.connexions_creees + self.reutilisations
+            return {
+                'taille': self.taille,
+                'connexions_libres': len(self._libres),
+                'connexions_creees': self.connexions_creees,
+                'reutilisations': self.reutilisations,
+                'fermetures': self.fermetures,
+                'taux_reutilisation': round(self.reutilisations / demandes, 4) if demandes else 0
+            }
+
+
+_pools = {}
+_verrou_pools = threading.Lock()
+
+
+def obtenir_pool(chemin_db=None):
+    """Retourne le pool du processus courant pour cette base (par défaut app.config['CHEMIN_DB'])."""
+    chemin_db = chemin_db or app.config['CHEMIN_DB']
+    with _verrou_pools:
+        pool = _pools.get(chemin_db)
+        # Après un fork (gunicorn --preload), on ne réutilise pas les connexions du parent.
+        if pool is None or pool.pid != os.getpid():
+            pool = PoolConnexions(chemin_db, TAILLE_POOL)
+            _pools[chemin_db] = pool
+        return pool
+
+
+def activer_wal(chemin_db):
+    """Passe la base en journal WAL : les lectures ne bloquent plus l'écriture en cours."""
+    with obtenir_pool(chemin_db).connexion() as conn:
+        conn.execute("PRAGMA journal_mode = WAL")
+
+
+# -------------------------------------------------------------------------
+# PROFILAGE DES REQUETES (NOOB_NOTE_PROFILAGE=1)
+# -------------------------------------------------------------------------
+
+
+class MesuresRequete:
+    """Ce qu'une requête HTTP a coûté : instructions SQL (durée, lignes) et rendu des gabarits."""
+
+    def __init__(self):
+        self.instructions = []
+        self.duree_rendu = 0.0
+        self._verrou = threading.Lock()
+
+    def instruction(self, sql, duree):
+        """Enregistre une instruction exécutée ; retourne son indice pour y ajouter la lecture des lignes."""
+        with self._verrou:
+            self.instructions.append([sql, duree, 0])
+            return len(self.instructions) - 1
+
+    def lecture(self, indice, duree, nb_lignes):
+        with self._verrou:
+            self.instructions[indice][1] += duree
+            self.instructions[indice][2] += nb_lignes
+
+    @property
+    def duree_sql(self):
+        return sum(duree for _, duree, _ in self.instructions)
+
+    @property
+    def nb_lignes(self):
+        return sum(nb_lignes for _, _, nb_lignes in self.instructions)
+
+
+def mesures_en_cours():
+    """Mesures de la requête HTTP en cours, ou None (ligne de commande, profilage coupé)."""
+    if not has_request_context():
+        return None
+    return g.get('mesures')
+
+
+class CurseurMesure(sqlite3.Cursor):
+    """Curseur qui chronomètre ses instructions et compte les lignes lues."""
+
+    _indice = None
+
+    def execute(self, sql, parametres=()):
+        debut = time.perf_counter()
+        try:
+            return super().execute(sql, parametres)
+        finally:
+            self._noter(sql, time.perf_counter() - debut)
+
+    def executemany(self, sql, parametres):
+        debut = time.perf_counter()
+        try:
+            return super().executemany(sql, parametres)
+        finally:
+            self._noter(sql, time.perf_counter() - debut)
+
+    def fetchone(self):
+        debut = time.perf_counter()
+        ligne = super().fetchone()
+        self._noter_lecture(time.perf_counter() - debut, 0 if ligne is None else 1)
+        return ligne
+
+    def fetchall(self):
+        debut = time.perf_counter()
+        lignes = super().fetchall()
+        self._noter_lecture(time.perf_counter() - debut, len(lignes))
+        return lignes
+
+    def _noter(self, sql, duree):
+        mesures = mesures_en_cours()
+        if mesures is not None:
+            self._indice = mesures.instruction(sql, duree)
+
+    def _noter_lecture(self, duree, nb_lignes):
+        mesures = mesures_en_cours()
+        if mesures is not None and self._indice is not None:
+            mesures.lecture(self._indice, duree, nb_lignes)
+
+
+class ConnexionMesuree(sqlite3.Connection):
+    """Connexion dont toutes les requêtes passent par un CurseurMesure (utilisée si le profilage est actif)."""
+
+    def cursor(self, factory=CurseurMesure):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametres=()):
+        return self.cursor().execute(sql, parametres)
+
+    def executemany(self, sql, parametres):
+        return self.cursor().executemany(sql, parametres)
+
+
+class Histogramme:
+    """Histogramme cumulatif au format Prometheus (une série par route)."""
+
+    def __init__(self, nom, aide, bornes):
+        self.nom = nom
+        self.aide = aide
+        self.bornes = bornes
+        self._series = {}
+        self._verrou = threading.Lock()
+
+    def observer(self, route, valeur):
+        with self._verrou:
+            serie = self._series.setdefault(route, [[0] * len(self.bornes), 0.0, 0])
+            for i, borne in enumerate(self.bornes):
+                if valeur <= borne:
+                    serie[0][i] += 1
+            serie[1] += valeur
+            serie[2] += 1
+
+    def exporter(self):
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} histogram"]
+        with self._verrou:
+            for route, (cumuls, somme, total) in sorted(self._series.items()):
+                for borne, cumul in zip(self.bornes, cumuls):
+                    lignes.append(f'{self.nom}_bucket{{route="{route}",le="{borne}"}} {cumul}')
+                lignes.append(f'{self.nom}_bucket{{route="{route}",le="+Inf"}} {total}')
+                lignes.append(f'{self.nom}_sum{{route="{route}"}} {somme:.6f}')
+                lignes.append(f'{self.nom}_count{{route="{route}"}} {total}')
+        return lignes
+
+
+BORNES_SECONDES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+BORNES_NOMBRES = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 10000)
+
+# Propres à chaque worker : Prometheus additionne les séries de tous les workers interrogés.
+HISTOGRAMMES = {
+    'requete': Histogramme('noob_note_requete_secondes', "Durée totale de la requête HTTP.", BORNES_SECONDES),
+    'sql': Histogramme('noob_note_sql_secondes', "Temps passé dans SQLite par requête HTTP.", BORNES_SECONDES),
+    'instruction': Histogramme('noob_note_sql_instruction_secondes', "Durée de chaque instruction SQL.", BORNES_SECONDES),
+    'nb_requetes': Histogramme('noob_note_sql_requetes', "Nombre d'instructions SQL par requête HTTP.", BORNES_NOMBRES),
+    'lignes': Histogramme('noob_note_sql_lignes', "Lignes lues dans SQLite par requête HTTP.", BORNES_NOMBRES),
+    'rendu': Histogramme('noob_note_rendu_secondes', "Temps de rendu des gabarits par requête HTTP.", BORNES_SECONDES),
+}
+
+
+# -------------------------------------------------------------------------
+# CACHE DES CALCULS DE CLASSE (classements et statistiques par matière)
+# -------------------------------------------------------------------------
+
+
+class CacheLRU:
+    """Cache en mémoire de taille bornée, dont les entrées expirent après une durée de vie.
+
+    Quand le cache est plein, l'entrée utilisée le moins récemment est retirée.
+    C'est le stockage par défaut (un cache par worker) et celui des tests.
+    """
+
+    def __init__(self, taille_max, duree_vie):
+        self.taille_max = taille_max
+        self.duree_vie = duree_vie
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self.succes = 0
+        self.echecs = 0
+
+    def obtenir(self, cle, calculer, conserver=None):
+        """Retourne la valeur en cache, ou la calcule avec calculer() puis la garde.
+
+        Si conserver est donné, la valeur calculée n'est gardée que si conserver(valeur) est vrai.
+        """
+        maintenant = time.monotonic()
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None and entree[0] > maintenant:
+                self._entrees.move_to_end(cle)
+                self.succes += 1
+                return entree[1]
+            self.echecs += 1
+
+        valeur = calculer()
+        if conserver is not None and not conserver(valeur):
+            return valeur
+        with self._verrou:
+            self._entrees[cle] = (maintenant + self.duree_vie, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+        return valeur
+
+    def vider(self):
+        with self._verrou:
+            self._entrees.clear()
+
+    def statistiques(self):
+        with self._verrou:
+            demandes = self.succes + self.echecs
+            return {
+                'entrees': len(self._entrees),
+                'taille_max': self.taille_max,
+                'duree_vie_s': self.duree_vie,
+                'succes': self.succes,
+                'echecs': self.echecs,
+                'taux_succes': round(self.succes / demandes, 4) if demandes else 0
+            }
+
+
+class CacheSQLite:
+    """Cache rangé dans un fichier SQLite local, partagé par tous les workers de la machine.
+
+    Les valeurs sont stockées en JSON (les tuples reviennent donc sous forme
+    de listes). Les compteurs de succès / échecs restent propres à chaque worker.
+    """
+
+    PURGE_TOUTES_LES = 256
+
+    def __init__(self, chemin, taille_max, duree_vie):
+        self.chemin = chemin
+        self.taille_max = taille_max
+        self.duree_vie = duree_vie
+        self.succes = 0
+        self.echecs = 0
+        self._ecritures = 0
+        activer_wal(self.chemin)
+        with obtenir_pool(self.chemin).transaction() as cur:
+            cur.execute("CREATE TABLE IF NOT EXISTS CacheCalculs (cle TEXT PRIMARY KEY, valeur TEXT, expire REAL)")
+
+    def obtenir(self, cle, calculer):
+        pool = obtenir_pool(self.chemin)
+        with pool.connexion() as conn:
+            res = conn.execute("SELECT valeur, expire FROM CacheCalculs WHERE cle = ?", (cle,)).fetchone()
+        if res is not None and res[1] > time.time():
+            self.succes += 1
+            return json.loads(res[0])
+        self.echecs += 1
+
+        valeur = calculer()
+        with pool.transaction() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO CacheCalculs (cle, valeur, expire) VALUES (?, ?, ?)",
+                (cle, json.dumps(valeur), time.time() + self.duree_vie)
+            )
+            self._ecritures += 1
+            if self._ecritures % self.PURGE_TOUTES_LES == 0:
+                self._purger(cur)
+        return valeur
+
+    def _purger(self, cur):
+        """Retire les entrées expirées puis les plus anciennes au-delà de taille_max."""
+        cur.execute("DELETE FROM CacheCalculs WHERE expire <= ?", (time.time(),))
+        cur.execute(
+            "DELETE FROM CacheCalculs WHERE cle IN "
+            "(SELECT cle FROM CacheCalculs ORDER BY expire DESC LIMIT -1 OFFSET ?)",
+            (self.taille_max,)
+        )
+
+    def vider(self):
+        with obtenir_pool(self.chemin).transaction() as cur:
+            cur.execute("DELETE FROM CacheCalculs")
+
+    def statistiques(self):
+        with obtenir_pool(self.chemin).connexion() as conn:
+            entrees = conn.execute("SELECT COUNT(*) FROM CacheCalculs").fetchone()[0]
+        demandes = self.succes + self.echecs
+        return {
+            'stockage': self.chemin,
+            'entrees': entrees,
+            'taille_max': self.taille_max,
+            'duree_vie_s': self.duree_vie,
+            'succes': self.succes,
+            'echecs': self.echecs,
+            'taux_succes': round(self.succes / demandes, 4) if demandes else 0
+        }
+
+
+def creer_cache_classes():
+    """Choisit le stockage du cache selon NOOB_NOTE_CACHE : 'memoire' (défaut) ou 'sqlite'."""
+    if TYPE_CACHE_CLASSES == 'sqlite':
+        return CacheSQLite(FICHIER_CACHE_CLASSES, TAILLE_CACHE_CLASSES, DUREE_CACHE_CLASSES)
+    return CacheLRU(TAILLE_CACHE_CLASSES, DUREE_CACHE_CLASSES)
+
+
+_EMPLOI_DU_TEMPS_DISPONIBLE = {}
+
+
+def emploi_du_temps_disponible(chemin_db):
+    """Vérifie une fois par base que la table EmploiDuTemps existe."""
+    if chemin_db not in _EMPLOI_DU_TEMPS_DISPONIBLE:
+        with obtenir_pool(chemin_db).connexion() as conn:
+            res = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='EmploiDuTemps'").fetchone()
+        _EMPLOI_DU_TEMPS_DISPONIBLE[chemin_db] = res is not None
+    return _EMPLOI_DU_TEMPS_DISPONIBLE[chemin_db]
+
+
+# Les clés contiennent le numéro de version des données concernées (table
+# VersionsDonnees, incrémentée à chaque écriture de note) : dès qu'une note
+# change, tous les workers calculent une nouvelle clé et ignorent l'ancienne.
+CACHE_CLASSES = creer_cache_classes()
+
 
 # -------------------------------------------------------------------------
 # CLASSES METIER (Votre code d'origine adapté Web)
 # -------------------------------------------------------------------------
 
+# Une note telle qu'affichée à l'élève : un tuple nommé, plus léger qu'un dictionnaire.
+NoteEleve = namedtuple('NoteEleve', ['id_note', 'id_matiere', 'nom_matiere', 'valeur', 'coefficient', 'date_note', 'date_iso'])
+
+
+class GroupeMatiere:
+    """Notes d'une matière avec les sommes nécessaires à sa moyenne pondérée."""
+
+    __slots__ = ('id_matiere', 'nom_matiere', 'notes', 'somme_ponderee', 'somme_coefficients')
+
+    def __init__(self, id_matiere, nom_matiere):
+        self.id_matiere = id_matiere
+        self.nom_matiere = nom_matiere
+        self.notes = []
+        self.somme_ponderee = 0
+        self.somme_coefficients = 0
+
+    def ajouter(self, note):
+        self.notes.append(note)
+        self.somme_ponderee += note.valeur * note.coefficient
+        self.somme_coefficients += note.coefficient
+
+    @property
+    def moyenne_matiere(self):
+        if self.somme_coefficients == 0:
+            return 0
+        return round(self.somme_ponderee / self.somme_coefficients, 2)
+
+
+
+def creneau(instant):
+    """(jour_num, minute) d'un instant : 1 = lundi, minutes depuis minuit ; comparable aux colonnes de EmploiDuTemps."""
+    return instant.isoweekday(), instant.hour * 60 + instant.minute
+
+
+def dater_cours(cours, instant, semaines_plus_tard=0):
+    """Ajoute au cours la date (AAAA-MM-JJ) où il a lieu dans la semaine de l'instant."""
+    lundi = instant.date() - timedelta(days=instant.isoweekday() - 1)
+    jour = lundi + timedelta(days=cours['jour_num'] - 1 + 7 * semaines_plus_tard)
+    return dict(cours, date=jour.isoformat())
+
+
+def construire_requete_recherche(texte):
+    """Transforme la saisie en requête FTS5 : chaque mot devient un préfixe ("mar"*), None si vide."""
+    mots = re.findall(r"\w+", texte or "")
+    if not mots:
+        return None
+    return " ".join(f'"{mot}"*' for mot in mots)
+
 
 class Utilisateur:
     def __init__(self, id_u, nom, prenom):
         self.id = id_u
         self.nom = nom
         self.prenom = prenom
-        self.db_path = 'pronote.db'
+        self.db_path = app.config['CHEMIN_DB']
 
     def _executer(self, sql, params=(), fetch=False, commit=False):
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.cursor()
-            cur.execute(sql, params)
+        with obtenir_pool(self.db_path).connexion() as conn:
+            cur = conn.execute(sql, params)
+            resultat = cur.fetchall() if fetch else None
             if commit:
                 conn.commit()
-            return cur.fetchall() if fetch else None
+            return resultat
+
+    def lire_version(self, portee):
+        """Numéro de version d'une portée ('eleve:12', 'classe:3', 'classe:3:2'...), 0 si jamais modifiée."""
+        res = self._executer("SELECT version FROM VersionsDonnees WHERE portee = ?", (portee,), fetch=True)
+        return res[0][0] if res else 0
+
+    def lire_cours(self, id_classe=None, id_prof=None, apres=None, limite=None):
+        """Cours d'une classe (ou d'un professeur si id_prof est donné) dans l'ordre de la semaine.
+
+        apres=(jour_num, minute) ne garde que les cours qui commencent à ce
+        moment ou plus tard. Les index par classe et par professeur donnent
+        les cours déjà triés.
+        """
+        colonne, valeur = ('id_classe', id_classe) if id_prof is None else ('id_prof', id_prof)
+        sql = f'''SELECT EmploiDuTemps.id_cours, EmploiDuTemps.jour_num, EmploiDuTemps.minute_debut,
+                         EmploiDuTemps.minute_fin, EmploiDuTemps.jour_semaine, EmploiDuTemps.heure_debut,
+                         EmploiDuTemps.heure_fin, Matieres.nom_matiere, Professeurs.prenom, Professeurs.nom,
+                         EmploiDuTemps.salle, EmploiDuTemps.id_classe, Classes.nom_classe
+                  FROM EmploiDuTemps
+                  JOIN Matieres ON EmploiDuTemps.id_matiere = Matieres.id_matiere
+                  JOIN Professeurs ON EmploiDuTemps.id_prof = Professeurs.id_prof
+                  LEFT JOIN Classes ON EmploiDuTemps.id_classe = Classes.id_classe
+                  WHERE EmploiDuTemps.{colonne} = ?'''
+        params = [valeur]
+        if apres is not None:
+            sql += " AND (EmploiDuTemps.jour_num, EmploiDuTemps.minute_debut) >= (?, ?)"
+            params.extend(apres)
+        sql += " ORDER BY EmploiDuTemps.jour_num, EmploiDuTemps.minute_debut"
+        if limite is not None:
+            sql += " LIMIT ?"
+            params.append(limite)
+
+        cours = []
+        for (id_cours, jour_num, minute_debut, minute_fin, jour, h_debut, h_fin, matiere,
+             prenom_prof, nom_prof, salle, id_classe_cours, nom_classe) in self._executer(sql, params, fetch=True):
+            cours.append({
+                'id_cours': id_cours,
+                'jour': jour,
+                'jour_num': jour_num,
+                'heure_debut': h_debut,
+                'heure_fin': h_fin,
+                'minute_debut': minute_debut,
+                'minute_fin': minute_fin,
+                'matiere': matiere,
+                'prof': f"{prenom_prof} {nom_prof}",
+                'salle': salle,
+                'id_classe': id_classe_cours,
+                'nom_classe': nom_classe
+            })
+        return cours
+
+    def emploi_du_temps_classe(self, id_classe):
+        """Semaine de cours d'une classe, gardée en cache jusqu'à la prochaine modification d'un de ses cours."""
+        cle = f"{os.path.abspath(self.db_path)}|cours|{id_classe}|{self.lire_version(f'edt:{id_classe}')}"
+        return CACHE_CLASSES.obtenir(cle, lambda: self.lire_cours(id_classe=id_classe))
+
+    def emploi_du_temps_prof(self, id_prof):
+        """Semaine de cours d'un professeur, gardée en cache jusqu'à la prochaine modification d'un de ses cours."""
+        cle = f"{os.path.abspath(self.db_path)}|cours_prof|{id_prof}|{self.lire_version(f'edt_prof:{id_prof}')}"
+        return CACHE_CLASSES.obtenir(cle, lambda: self.lire_cours(id_prof=id_prof))
+
+    def cours_de_la_semaine(self, instant=None, id_classe=None, id_prof=None):
+        """Cours de la semaine de l'instant (maintenant par défaut), chacun avec sa date."""
+        if not emploi_du_temps_disponible(self.db_path):
+            return []
+        instant = instant or datetime.now()
+        cours = self.emploi_du_temps_prof(id_prof) if id_prof is not None else self.emploi_du_temps_classe(id_classe)
+        return [dater_cours(c, instant) for c in cours]
+
+    def construire_emploi_par_jour(self, emploi):
+        """Regroupe les cours par jour pour simplifier l'affichage HTML."""
+        emploi_par_jour = {jour: [] for jour in JOURS_SEMAINE}
+        for cours in emploi:
+            if cours['jour'] in emploi_par_jour:
+                emploi_par_jour[cours['jour']].append(cours)
+        return emploi_par_jour
+
+    def prochain_cours(self, instant=None, id_classe=None, id_prof=None):
+        """Premier cours qui commence à partir de l'instant, éventuellement la semaine suivante ; None s'il n'y en a pas."""
+        if not emploi_du_temps_disponible(self.db_path):
+            return None
+        instant = instant or datetime.now()
+        cours = self.lire_cours(id_classe, id_prof, apres=creneau(instant), limite=1)
+        if cours:
+            return dater_cours(cours[0], instant)
+        # Plus rien cette semaine : l'emploi du temps recommence le lundi suivant.
+        cours = self.lire_cours(id_classe, id_prof, limite=1)
+        return dater_cours(cours[0], instant, semaines_plus_tard=1) if cours else None
+
+    def salles_libres(self, instant=None):
+        """Salles sans cours à cet instant.
+
+        La liste des salles est lue en sautant d'une salle à la suivante dans
+        l'index par salle (une recherche par salle, pas de parcours des cours),
+        puis chaque salle est testée par une recherche dans ce même index.
+        """
+        if not emploi_du_temps_disponible(self.db_path):
+            return []
+        jour_num, minute = creneau(instant or datetime.now())
+        sql = '''WITH RECURSIVE salles(salle) AS (
+                     SELECT MIN(salle) FROM EmploiDuTemps
+                     UNION ALL
+                     SELECT (SELECT MIN(salle) FROM EmploiDuTemps WHERE salle > salles.salle)
+                     FROM salles WHERE salle IS NOT NULL
+                 )
+                 SELECT salle FROM salles
+                 WHERE salle IS NOT NULL
+                   AND NOT EXISTS (
+                       SELECT 1 FROM EmploiDuTemps AS occupee
+                       WHERE occupee.salle = salles.salle AND occupee.jour_num = ?
+                         AND occupee.minute_debut <= ? AND occupee.minute_fin > ?
+                   )'''
+        return [salle for (salle,) in self._executer(sql, (jour_num, minute, minute), fetch=True)]
+
+    def evolution_eleve(self, id_eleve):
+        """Moyenne de l'élève après chaque date où il a eu une note, par matière et toutes matières confondues.
+
+        Retourne {'generale': [{'date', 'moyenne'}], 'matieres': [{'id_matiere', 'nom_matiere', 'points'}]}.
+        """
+        sql = '''SELECT E.id_matiere, Matieres.nom_matiere, E.date_iso, E.somme_ponderee, E.somme_coefficients
+                 FROM EvolutionEleveMatiere AS E JOIN Matieres ON E.id_matiere = Matieres.id_matiere
+                 WHERE E.id_eleve = ?
+                 ORDER BY E.id_matiere, E.date_iso'''
+        matieres = {}
+        for id_matiere, nom_matiere, date_iso, somme_ponderee, somme_coefficients in self._executer(sql, (id_eleve,), fetch=True):
+            matiere = matieres.setdefault(id_matiere, {'id_matiere': id_matiere, 'nom_matiere': nom_matiere, 'points': []})
+            matiere['points'].append(point_evolution(date_iso, somme_ponderee, somme_coefficients))
+
+        sql = "SELECT date_iso, somme_ponderee, somme_coefficients FROM EvolutionEleve WHERE id_eleve = ? ORDER BY date_iso"
+        generale = [point_evolution(*ligne) for ligne in self._executer(sql, (id_eleve,), fetch=True)]
+        return {'generale': generale, 'matieres': sorted(matieres.values(), key=lambda m: m['nom_matiere'])}
+
+    def moyennes_eleve_au(self, id_eleve, date_iso):
+        """Moyennes de l'élève telles qu'elles étaient le soir de date_iso (une recherche par matière)."""
+        sql = '''SELECT Matieres.id_matiere, Matieres.nom_matiere, E.somme_ponderee, E.somme_coefficients, E.nb_notes
+                 FROM AgregatsEleveMatiere AS A
+                 JOIN Matieres ON A.id_matiere = Matieres.id_matiere
+                 JOIN EvolutionEleveMatiere AS E ON E.id_eleve = A.id_eleve AND E.id_matiere = A.id_matiere
+                  AND E.date_iso = (SELECT MAX(date_iso) FROM EvolutionEleveMatiere
+                                    WHERE id_eleve = A.id_eleve AND id_matiere = A.id_matiere AND date_iso <= ?)
+                 WHERE A.id_eleve = ?
+                 ORDER BY Matieres.nom_matiere'''
+        resultats = [formater_resultat_matiere(*ligne) for ligne in self._executer(sql, (date_iso, id_eleve), fetch=True)]
+
+        sql = '''SELECT somme_ponderee, somme_coefficients FROM EvolutionEleve
+                 WHERE id_eleve = ? AND date_iso <= ? ORDER BY date_iso DESC LIMIT 1'''
+        res = self._executer(sql, (id_eleve, date_iso), fetch=True)
+        moyenne = point_evolution(date_iso, *res[0])['moyenne'] if res else None
+        return {'date': date_iso, 'moyenne_generale': moyenne, 'matieres': resultats}
+
+    def courbe_mediane_classe(self, id_classe, id_matiere=None, debut=None, fin=None):
+        """Médiane des moyennes des élèves de la classe à la fin de chaque mois (gardée en cache).
+
+        Sans bornes, la courbe va de la rentrée à la dernière note de la classe.
+        Chaque point demande une recherche par élève dans les sommes cumulées.
+        """
+        if fin is None:
+            res = self._executer(
+                '''SELECT MAX((SELECT MAX(date_iso) FROM EvolutionEleve WHERE id_eleve = Eleves.id_eleve))
+                   FROM Eleves WHERE id_classe = ?''', (id_classe,), fetch=True
+            )
+            fin = res[0][0] if res and res[0][0] else datetime.now().strftime("%Y-%m-%d")
+        if debut is None:
+            annee, mois = int(fin[:4]), int(fin[5:7])
+            debut = f"{annee if mois >= 8 else annee - 1}-09-01"
+        if debut > fin:
+            return []
+
+        cle = (f"{os.path.abspath(self.db_path)}|mediane|{id_classe}|{id_matiere}|{debut}|{fin}|"
+               f"{self.lire_version(f'classe:{id_classe}')}")
+        return CACHE_CLASSES.obtenir(cle, lambda: self._calculer_courbe_mediane(id_classe, id_matiere, fins_de_mois(debut, fin)))
+
+    def _calculer_courbe_mediane(self, id_classe, id_matiere, dates):
+        if id_matiere is None:
+            table, condition, params = 'EvolutionEleve', '', []
+        else:
+            table, condition, params = 'EvolutionEleveMatiere', 'AND E.id_matiere = ?', [id_matiere]
+        points = ", ".join("(?)" for _ in dates)
+        sql = f'''WITH points(date_iso) AS (VALUES {points})
+                  SELECT points.date_iso,
+                         (SELECT E.somme_ponderee / NULLIF(E.somme_coefficients, 0) FROM {table} AS E
+                          WHERE E.id_eleve = Eleves.id_eleve {condition} AND E.date_iso <= points.date_iso
+                          ORDER BY E.date_iso DESC LIMIT 1)
+                  FROM points CROSS JOIN Eleves
+                  WHERE Eleves.id_classe = ?'''
+        moyennes = {date_iso: [] for date_iso in dates}
+        for date_iso, moyenne in self._executer(sql, [*dates, *params, id_classe], fetch=True):
+            if moyenne is not None:
+                moyennes[date_iso].append(moyenne)
+        return [
+            {'date': date_iso, 'mediane': round(statistics.median(valeurs), 2) if valeurs else None, 'nb_eleves': len(valeurs)}
+            for date_iso, valeurs in moyennes.items()
+        ]
+
+    def calculer_classement_classe(self, id_classe):
+        """Classe tous les élèves d'une classe en une seule requête groupée.
+
+        Retourne un dictionnaire {id_eleve: (rang, moyenne)} trié du premier au
+        dernier : un seul calcul suffit pour toute la classe, et il est gardé en
+        cache jusqu'à la prochaine modification de note dans cette classe.
+        """
+        portee = f"classe:{id_classe}"
+        cle = f"{os.path.abspath(self.db_path)}|classement|{id_classe}|{self.lire_version(portee)}"
+        return CACHE_CLASSES.obtenir(cle, lambda: self._classer_eleves(id_classe))
+
+    def _classer_eleves(self, id_classe):
+        sql = '''SELECT Eleves.id_eleve,
+                        COALESCE((SELECT SUM(A.somme_ponderee) / NULLIF(SUM(A.somme_coefficients), 0)
+                                  FROM AgregatsEleveMatiere AS A
+                                  WHERE A.id_eleve = Eleves.id_eleve), 0) AS moyenne
+                 FROM Eleves
+                 WHERE Eleves.id_classe = ?
+                 ORDER BY moyenne DESC, Eleves.rowid'''
+        lignes = self._executer(sql, (id_classe,), fetch=True)
+
+        classement = {}
+        for rang, (id_eleve, moyenne) in enumerate(lignes, start=1):
+            classement[id_eleve] = (rang, moyenne)
+        return classement
+
+    def lire_stats_classe_matiere(self, id_classe, id_matiere):
+        """Lit (moyenne, min, max) d'une classe dans une matière depuis les agrégats (avec cache)."""
+        portee = f"classe:{id_classe}:{id_matiere}"
+        cle = f"{os.path.abspath(self.db_path)}|stats|{id_classe}|{id_matiere}|{self.lire_version(portee)}"
+        return CACHE_CLASSES.obtenir(cle, lambda: self._lire_stats_classe_matiere(id_classe, id_matiere))
+
+    def _lire_stats_classe_matiere(self, id_classe, id_matiere):
+        sql = '''SELECT somme_valeurs / nb_notes, note_min, note_max FROM AgregatsClasseMatiere
+                 WHERE id_classe = ? AND id_matiere = ? AND nb_notes > 0'''
+        res = self._executer(sql, (id_classe, id_matiere), fetch=True)
+        if not res:
+            return None
+        return res[0]
 
 
 class Professeur(Utilisateur):
+    def __init__(self, id_u, nom, prenom, contexte=None):
+        super().__init__(id_u, nom, prenom)
+        # Classes et matières enseignées, gardées en session (voir charger_contexte).
+        self.contexte = contexte
+
+    def lire_version_contexte(self):
+        """Version des cours du professeur : change dès qu'un de ses cours est ajouté, modifié ou retiré."""
+        return f"prof:{self.id}:{self.lire_version(f'edt_prof:{self.id}')}"
+
+    def charger_contexte(self, version=None):
+        """Lit une fois les couples (classe, matière) enseignés, d'après l'emploi du temps ; à garder en session."""
+        if version is None:
+            version = self.lire_version_contexte()
+        self.contexte = {'id': self.id, 'version': version, 'affectations': self._lire_affectations()}
+        return self.contexte
+
+    def lister_affectations(self):
+        """[(id_classe, nom_classe, id_matiere, nom_matiere)] des cours du professeur (index par professeur)."""
+        if self.contexte is not None:
+            return [tuple(affectation) for affectation in self.contexte['affectations']]
+        return self._lire_affectations()
+
+    def _lire_affectations(self):
+        """Lit les cours du professeur dans la base, sans passer par le contexte."""
+        if not emploi_du_temps_disponible(self.db_path):
+            return []
+        sql = '''SELECT EmploiDuTemps.id_classe, Classes.nom_classe, EmploiDuTemps.id_matiere, Matieres.nom_matiere
+                 FROM EmploiDuTemps
+                 JOIN Matieres ON EmploiDuTemps.id_matiere = Matieres.id_matiere
+                 LEFT JOIN Classes ON EmploiDuTemps.id_classe = Classes.id_classe
+                 WHERE EmploiDuTemps.id_prof = ?
+                 GROUP BY EmploiDuTemps.id_classe, EmploiDuTemps.id_matiere
+                 ORDER BY EmploiDuTemps.id_classe, EmploiDuTemps.id_matiere'''
+        return [tuple(ligne) for ligne in self._executer(sql, (self.id,), fetch=True)]
+
+    def classes_enseignees(self):
+        """[(id_classe, nom_classe)] des classes où le professeur a cours, dans l'ordre des identifiants."""
+        classes = {}
+        for id_classe, nom_classe, _, _ in self.lister_affectations():
+            classes.setdefault(id_classe, nom_classe or f"Classe {id_classe}")
+        return list(classes.items())
+
+    def matieres_enseignees(self, id_classe=None):
+        """[(id_matiere, nom_matiere)] enseignées par le professeur, dans une classe ou dans toutes."""
+        matieres = {}
+        for id_c, _, id_matiere, nom_matiere in self.lister_affectations():
+            if id_classe is None or str(id_c) == str(id_classe):
+                matieres.setdefault(id_matiere, nom_matiere)
+        return sorted(matieres.items())
+
+    def enseigne_dans(self, id_classe):
+        """Vrai si le professeur a cours avec cette classe."""
+        return any(str(id_c) == str(id_classe) for id_c, _ in self.classes_enseignees())
+
+    def classe_de_l_eleve(self, id_eleve):
+        """Classe d'un élève (None s'il n'existe pas)."""
+        res = self._executer("SELECT id_classe FROM Eleves WHERE id_eleve = ?", (id_eleve,), fetch=True)
+        return res[0][0] if res else None
+
+    def enseigne_a_eleve(self, id_eleve):
+        """Vrai si l'élève est dans une classe où le professeur a cours."""
+        id_classe = self.classe_de_l_eleve(id_eleve)
+        return id_classe is not None and self.enseigne_dans(id_classe)
+
     def lister_eleves_par_classe(self, id_classe):
-        """Récupère les élèves d'une classe spécifique (T7, T8, T9)."""
+        """Récupère les élèves d'une classe (par nom)."""
         sql = "SELECT id_eleve, nom, prenom FROM Eleves WHERE id_classe = ? ORDER BY nom"
         return self._executer(sql, (id_classe,), fetch=True)
 
-    def chercher_eleve(self, nom_partiel):
-        """Recherche d'élèves par nom."""
-        sql = "SELECT id_eleve, nom, prenom, id_classe FROM Eleves WHERE nom LIKE ?"
-        return self._executer(sql, (f"%{nom_partiel}%",), fetch=True)
+    def chercher_eleve(self, texte, limite=LIMITE_RECHERCHE):
+        """Recherche d'élèves par début de nom, de prénom ou de classe, les plus pertinents d'abord.
+
+        "zoe ma" trouve Zoé Martin : chaque mot est un préfixe, accents ignorés.
+        """
+        requete = construire_requete_recherche(texte)
+        if requete is None:
+            return []
+        sql = '''SELECT Eleves.id_eleve, Eleves.nom, Eleves.prenom, Eleves.id_classe, RechercheEleves.nom_classe
+                 FROM RechercheEleves JOIN Eleves ON Eleves.id_eleve = RechercheEleves.id_eleve
+                 WHERE RechercheEleves MATCH ?
+                 ORDER BY RechercheEleves.rank
+                 LIMIT ?'''
+        return self._executer(sql, (requete, limite), fetch=True)
 
     def ajouter_note(self, id_eleve, id_matiere, note, coeff):
         """Ajoute une note (CREATE)."""
-        date_jour = datetime.now().strftime("%d/%m/%Y")
-        sql = "INSERT INTO Notes (valeur, coefficient, date_note, id_eleve, id_matiere) VALUES (?,?,?,?,?)"
-        self._executer(sql, (note, coeff, date_jour, id_eleve, id_matiere), commit=True)
+        maintenant = datetime.now()
+        sql = "INSERT INTO Notes (valeur, coefficient, date_note, date_iso, id_eleve, id_matiere) VALUES (?,?,?,?,?,?)"
+        with obtenir_pool(self.db_path).transaction() as cur:
+            cur.execute(sql, (note, coeff, maintenant.strftime("%d/%m/%Y"), maintenant.strftime("%Y-%m-%d"), id_eleve, id_matiere))
+            rafraichir_agregats(cur, id_eleve, id_matiere)
+            decaler_evolution(cur, id_eleve, id_matiere, maintenant.strftime("%Y-%m-%d"), note * coeff, coeff, 1)
+
+    def ajouter_notes_en_lot(self, id_classe, id_matiere, coeff, date_iso, saisies):
+        """Enregistre une évaluation entière d'une classe (une matière, un coefficient, une date).
+
+        saisies est une liste de couples (id_eleve, valeur saisie). Les lignes
+        invalides, dont celles d'élèves d'une autre classe, sont signalées sans
+        bloquer les autres ; toutes les lignes valides sont écrites dans une
+        seule transaction.
+        Retourne {'ajoutees': nombre, 'erreurs': [(ligne, id_eleve, message), ...]}.
+        """
+        erreurs = []
+        try:
+            coeff = float(str(coeff).replace(',', '.'))
+            date_note = datetime.strptime(date_iso, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return {'ajoutees': 0, 'erreurs': [(0, '', "Coefficient ou date invalide.")]}
+        if not coefficient_valide(coeff):
+            return {'ajoutees': 0, 'erreurs': [(0, '', f"Le coefficient doit être positif et au plus {COEFFICIENT_MAX}.")]}
+        if not self._executer("SELECT 1 FROM Matieres WHERE id_matiere = ?", (id_matiere,), fetch=True):
+            return {'ajoutees': 0, 'erreurs': [(0, '', "Matière inconnue.")]}
+
+        sql = "SELECT id_eleve FROM Eleves WHERE id_classe = ?"
+        eleves_de_la_classe = {str(ligne[0]) for ligne in self._executer(sql, (id_classe,), fetch=True)}
+
+        lignes_valides = []
+        for numero, (id_eleve, valeur) in enumerate(saisies, start=1):
+            id_eleve = str(id_eleve).strip()
+            valeur = str(valeur).strip().replace(',', '.')
+            if id_eleve not in eleves_de_la_classe:
+                erreurs.append((numero, id_eleve, "Élève inconnu dans cette classe."))
+                continue
+            try:
+                valeur = float(valeur)
+            except ValueError:
+                erreurs.append((numero, id_eleve, f"Note illisible : {valeur!r}."))
+                continue
+            if not note_valide(valeur):
+                erreurs.append((numero, id_eleve, f"La note doit être comprise entre 0 et {NOTE_MAX}."))
+                continue
+            lignes_valides.append((valeur, coeff, date_note.strftime("%d/%m/%Y"), date_iso, id_eleve, id_matiere))
+
+        sql = "INSERT INTO Notes (valeur, coefficient, date_note, date_iso, id_eleve, id_matiere) VALUES (?,?,?,?,?,?)"
+        # Écarts (somme pondérée, coefficients, notes) à reporter sur l'évolution de chaque élève.
+        ecarts = {}
+        for valeur, coeff_note, _, _, id_eleve, _ in lignes_valides:
+            pondere, coefficients, nb_notes = ecarts.get(id_eleve, (0, 0, 0))
+            ecarts[id_eleve] = (pondere + valeur * coeff_note, coefficients + coeff_note, nb_notes + 1)
+
+        with obtenir_pool(self.db_path).transaction() as cur:
+            cur.executemany(sql, lignes_valides)
+            for id_eleve, ecart in ecarts.items():
+                rafraichir_agregats_eleve(cur, id_eleve, id_matiere)
+                decaler_evolution(cur, id_eleve, id_matiere, date_iso, *ecart)
+            if ecarts:
+                rafraichir_agregats_classe(cur, id_classe, id_matiere)
+
+        return {'ajoutees': len(lignes_valides), 'erreurs': erreurs}
 
     def modifier_note(self, id_note, nouvelle_valeur, nouveau_coeff):
         """Modifie une note existante (UPDATE)."""
         sql = "UPDATE Notes SET valeur = ?, coefficient = ? WHERE id_note = ?"
-        self._executer(sql, (nouvelle_valeur, nouveau_coeff, id_note), commit=True)
+        with obtenir_pool(self.db_path).transaction() as cur:
+            cur.execute("SELECT id_eleve, id_matiere, valeur, coefficient, date_iso FROM Notes WHERE id_note = ?", (id_note,))
+            res = cur.fetchone()
+            cur.execute(sql, (nouvelle_valeur, nouveau_coeff, id_note))
+            if res:
+                id_eleve, id_matiere, ancienne_valeur, ancien_coeff, date_iso = res
+                rafraichir_agregats(cur, id_eleve, id_matiere)
+                decaler_evolution(cur, id_eleve, id_matiere, date_iso,
+                                  nouvelle_valeur * nouveau_coeff - ancienne_valeur * ancien_coeff,
+                                  nouveau_coeff - ancien_coeff, 0)
 
     def supprimer_note(self, id_note):
         """Supprime une note (DELETE)."""
         sql = "DELETE FROM Notes WHERE id_note = ?"
-        self._executer(sql, (id_note,), commit=True)
+        with obtenir_pool(self.db_path).transaction() as cur:
+            cur.execute("SELECT id_eleve, id_matiere, valeur, coefficient, date_iso FROM Notes WHERE id_note = ?", (id_note,))
+            res = cur.fetchone()
+            cur.execute(sql, (id_note,))
+            if res:
+                id_eleve, id_matiere, valeur, coeff, date_iso = res
+                rafraichir_agregats(cur, id_eleve, id_matiere)
+                decaler_evolution(cur, id_eleve, id_matiere, date_iso, -valeur * coeff, -coeff, -1)
+
+    def preparer_bulletins_classe(self, id_classe):
+        """Rassemble en trois requêtes tout ce qu'il faut pour les bulletins d'une classe.
+
+        Le classement est calculé une seule fois pour toute la classe ; chaque
+        élément retourné peut ensuite être mis en forme par rendre_bulletin_eleve.
+        """
+        classement = self.calculer_classement_classe(id_classe)
+
+        sql = '''SELECT A.id_eleve, Matieres.id_matiere, Matieres.nom_matiere,
+                        A.somme_ponderee, A.somme_coefficients, A.nb_notes
+                 FROM Eleves
+                 JOIN AgregatsEleveMatiere AS A ON A.id_eleve = Eleves.id_eleve
+                 JOIN Matieres ON A.id_matiere = Matieres.id_matiere
+                 WHERE Eleves.id_classe = ?
+                 ORDER BY Matieres.nom_matiere'''
+        resultats_par_eleve = {}
+        for id_eleve, *ligne in self._executer(sql, (id_classe,), fetch=True):
+            resultats_par_eleve.setdefault(id_eleve, []).append(formater_resultat_matiere(*ligne))
+
+        sql = '''SELECT Eleves.id_eleve, Eleves.nom, Eleves.prenom, Classes.nom_classe
+                 FROM Eleves JOIN Classes ON Eleves.id_classe = Classes.id_classe
+                 WHERE Eleves.id_classe = ? ORDER BY Eleves.nom'''
+        bulletins = []
+        for id_eleve, nom, prenom, nom_classe in self._executer(sql, (id_classe,), fetch=True):
+            rang, moyenne = classement.get(id_eleve, (0, 0))
+            bulletins.append({
+                'nom_classe': nom_classe,
+                'id_eleve': id_eleve,
+                'nom': nom,
+                'prenom': prenom,
+                'resultats': resultats_par_eleve.get(id_eleve, []),
+                'rang': rang,
+                'total': len(classement),
+                'moyenne': round(moyenne, 2)
+            })
+        return bulletins
+
+    def lister_classes(self):
+        """Retourne les identifiants de toutes les classes."""
+        return [ligne[0] for ligne in self._executer("SELECT id_classe FROM Classes ORDER BY id_classe", fetch=True)]
 
-    def voir_notes_eleve(self, id_eleve):
-        """Voir le détail des notes pour un élève spécifique."""
-        sql = '''SELECT Notes.id_note, Matieres.nom_matiere, Notes.valeur, Notes.coefficient, Notes.date_note, Matieres.id_matiere
+    def voir_notes_eleve(self, id_eleve, limite=None, apres=None):
+        """Voir le détail des notes pour un élève spécifique.
+
+        apres=(date_iso, id_note) reprend la liste juste après cette note
+        (pagination par curseur, sans OFFSET).
+        """
+        sql = '''SELECT Notes.id_note, Matieres.nom_matiere, Notes.valeur, Notes.coefficient, Notes.date_note,
+                        Matieres.id_matiere, Notes.date_iso
                  FROM Notes JOIN Matieres ON Notes.id_matiere = Matieres.id_matiere
-                 WHERE id_eleve = ? ORDER BY date_note DESC'''
-        return self._executer(sql, (id_eleve,), fetch=True)
+                 WHERE id_eleve = ?'''
+        params = [id_eleve]
+        if apres is not None:
+            sql += " AND (Notes.date_iso < ? OR (Notes.date_iso = ? AND Notes.id_note < ?))"
+            params.extend((apres[0], apres[0], apres[1]))
+        sql += " ORDER BY date_iso DESC, id_note DESC"
+        if limite is not None:
+            sql += " LIMIT ?"
+            params.append(limite)
+        return self._executer(sql, params, fetch=True)
+
+    def statistiques_classe(self, id_classe):
+        """Statistiques de toutes les matières d'une classe en une seule requête (gardées en cache).
+
+        Pour chaque matière : moyenne, min, max, médiane, écart-type, nombre de
+        notes et répartition des notes dans les tranches de TRANCHES_HISTOGRAMME.
+        """
+        cle = f"{os.path.abspath(self.db_path)}|statistiques|{id_classe}|{self.lire_version(f'classe:{id_classe}')}"
+        return CACHE_CLASSES.obtenir(cle, lambda: self._calculer_statistiques_classe(id_classe))
+
+    def _calculer_statistiques_classe(self, id_classe):
+        # Une colonne par tranche : [0, 4[, [4, 8[, ... [16, 20].
+        bornes = (None,) + TRANCHES_HISTOGRAMME + (None,)
+        colonnes_tranches = []
+        for debut, fin in zip(bornes, bornes[1:]):
+            conditions = [f"valeur >= {debut}" if debut is not None else None,
+                          f"valeur < {fin}" if fin is not None else None]
+            colonnes_tranches.append(f"SUM({' AND '.join(c for c in conditions if c)})")
+
+        sql = f'''WITH NotesClasse AS (
+                     SELECT Notes.id_matiere, Notes.valeur,
+                            ROW_NUMBER() OVER (PARTITION BY Notes.id_matiere ORDER BY Notes.valeur) AS position,
+                            COUNT(*) OVER (PARTITION BY Notes.id_matiere) AS nb
+                     FROM Eleves JOIN Notes ON Notes.id_eleve = Eleves.id_eleve
+                     WHERE Eleves.id_classe = ?
+                  )
+                  SELECT Matieres.id_matiere, Matieres.nom_matiere, AVG(valeur), MIN(valeur), MAX(valeur), COUNT(*),
+                         AVG(CASE WHEN position IN ((nb + 1) / 2, (nb + 2) / 2) THEN valeur END),
+                         AVG(valeur * valeur) - AVG(valeur) * AVG(valeur),
+                         {', '.join(colonnes_tranches)}
+                  FROM NotesClasse JOIN Matieres ON NotesClasse.id_matiere = Matieres.id_matiere
+                  GROUP BY Matieres.id_matiere
+                  ORDER BY Matieres.nom_matiere'''
+
+        statistiques = []
+        for id_matiere, nom_matiere, moyenne, note_min, note_max, nb_notes, mediane, variance, *tranches in \
+                self._executer(sql, (id_classe,), fetch=True):
+            statistiques.append({
+                'id_matiere': id_matiere,
+                'nom_matiere': nom_matiere,
+                'moyenne': round(moyenne, 2),
+                'min': note_min,
+                'max': note_max,
+                'mediane': round(mediane, 2),
+                'ecart_type': round(math.sqrt(max(variance, 0)), 2),
+                'nb_notes': nb_notes,
+                'histogramme': tranches
+            })
+        return statistiques
+
+    def comparer_classes(self):
+        """Moyenne de chaque classe dans chaque matière, lue dans les agrégats (une seule requête).
+
+        Retourne (classes, matieres, moyennes) où moyennes[(id_classe, id_matiere)] vaut la moyenne.
+        """
+        sql = '''SELECT Classes.id_classe, Classes.nom_classe, Matieres.id_matiere, Matieres.nom_matiere,
+                        A.somme_valeurs / A.nb_notes
+                 FROM AgregatsClasseMatiere AS A
+                 JOIN Classes ON A.id_classe = Classes.id_classe
+                 JOIN Matieres ON A.id_matiere = Matieres.id_matiere
+                 WHERE A.nb_notes > 0
+                 ORDER BY Classes.id_classe, Matieres.nom_matiere'''
+        classes = {}
+        matieres = {}
+        moyennes = {}
+        for id_classe, nom_classe, id_matiere, nom_matiere, moyenne in self._executer(sql, fetch=True):
+            classes[id_classe] = nom_classe
+            matieres[id_matiere] = nom_matiere
+            moyennes[(id_classe, id_matiere)] = round(moyenne, 2)
+        return classes, matieres, moyennes
 
     def stats_matiere_classe(self, id_classe, id_matiere):
         """Calcule Moyenne, Min et Max pour une classe."""
-        sql = '''SELECT AVG(valeur), MIN(valeur), MAX(valeur) FROM Notes
-                 JOIN Eleves ON Notes.id_eleve = Eleves.id_eleve
-                 WHERE id_classe = ? AND id_matiere = ?'''
-        res = self._executer(sql, (id_classe, id_matiere), fetch=True)
-        if res and res[0][0] is not None:
-            return res[0]
-        return None
+        return self.lire_stats_classe_matiere(id_classe, id_matiere)
 
 
 class Eleve(Utilisateur):
+    def __init__(self, id_u, nom, prenom, contexte=None):
+        super().__init__(id_u, nom, prenom)
+        # Infos, matières et version des données gardées en session (voir charger_contexte).
+        self.contexte = contexte
+
+    def charger_contexte(self, version=None):
+        """Lit une fois ce que toutes les pages de l'élève réutilisent ; à garder en session.
+
+        Le contexte reste valable tant que lire_version_pages() renvoie la même version.
+        """
+        if version is None:
+            version = self.lire_version_pages()
+        self.contexte = {
+            'id': self.id,
+            'version': version,
+            'infos': self._lire_infos_personnelles(),
+            'matieres': self._lire_matieres_disponibles()
+        }
+        return self.contexte
+
     def voir_mes_notes(self):
         """Version simple des notes pour les fonctions existantes (bulletin txt)."""
         sql = '''SELECT Matieres.nom_matiere, Notes.valeur, Notes.coefficient, Notes.date_note
                  FROM Notes JOIN Matieres ON Notes.id_matiere = Matieres.id_matiere
-                 WHERE id_eleve = ? ORDER BY date_note DESC'''
+                 WHERE id_eleve = ? ORDER BY date_iso DESC, id_note DESC'''
         return self._executer(sql, (self.id,), fetch=True)
 
-    def voir_mes_notes_detaillees(self):
-        """Version détaillée des notes pour l'interface web élève."""
+    def voir_mes_notes_detaillees(self, id_matiere='toutes', periode='tout', limite=None, apres=None):
+        """Notes de l'élève pour l'interface web, filtrées et triées directement en SQL.
+
+        apres=(date_iso, id_note) reprend la liste juste après cette note
+        (pagination par curseur, sans OFFSET).
+        """
         sql = '''SELECT Notes.id_note, Notes.id_matiere, Matieres.nom_matiere,
-                        Notes.valeur, Notes.coefficient, Notes.date_note
+                        Notes.valeur, Notes.coefficient, Notes.date_note, Notes.date_iso
                  FROM Notes JOIN Matieres ON Notes.id_matiere = Matieres.id_matiere
                  WHERE Notes.id_eleve = ?'''
-        lignes = self._executer(sql, (self.id,), fetch=True)
-
-        notes_detaillees = []
-        for id_note, id_matiere, nom_matiere, valeur, coefficient, date_note in lignes:
-            notes_detaillees.append({
-                'id_note': id_note,
-                'id_matiere': id_matiere,
-                'nom_matiere': nom_matiere,
-                'valeur': valeur,
-                'coefficient': coefficient,
-                'date_note': date_note
-            })
-
-        notes_detaillees.sort(
-            key=lambda note: self.convertir_date_fr_vers_tuple(note['date_note']),
-            reverse=True
-        )
-        return notes_detaillees
-
-    def convertir_date_fr_vers_tuple(self, date_fr):
-        """Convertit JJ/MM/AAAA en tuple (AAAA, MM, JJ) pour trier simplement."""
-        try:
-            jour, mois, annee = date_fr.split('/')
-            return (int(annee), int(mois), int(jour))
-        except ValueError:
-            return (0, 0, 0)
+        params = [self.id]
+
+        if id_matiere != 'toutes':
+            sql += " AND Notes.id_matiere = ?"
+            params.append(id_matiere)
+
+        bornes = self.bornes_periode(periode)
+        if bornes is not None:
+            sql += " AND Notes.date_iso >= ? AND Notes.date_iso < ?"
+            params.extend(bornes)
+
+        if apres is not None:
+            sql += " AND (Notes.date_iso < ? OR (Notes.date_iso = ? AND Notes.id_note > ?))"
+            params.extend((apres[0], apres[0], apres[1]))
+
+        sql += " ORDER BY Notes.date_iso DESC, Notes.id_note"
+        if limite is not None:
+            sql += " LIMIT ?"
+            params.append(limite)
+        return list(map(NoteEleve._make, self._executer(sql, params, fetch=True)))
+
+    def bornes_periode(self, periode):
+        """Retourne les dates ISO [début, fin[ du semestre demandé (None pour 'tout').
+
+        Le semestre 1 va de septembre à janvier, le semestre 2 de février à
+        juillet, dans l'année scolaire de la note la plus récente de l'élève.
+        """
+        if periode not in ('s1', 's2'):
+            return None
 
-    def calculer_moyenne_ponderee(self, liste_notes):
-        """Calcule une moyenne pondérée à partir d'une liste [(note, coeff), ...]."""
-        somme_notes = 0
-        somme_coefficients = 0
+        res = self._executer("SELECT MAX(date_iso) FROM Notes WHERE id_eleve = ?", (self.id,), fetch=True)
+        if not res or res[0][0] is None:
+            return None
 
-        for valeur, coefficient in liste_notes:
-            somme_notes += valeur * coefficient
-            somme_coefficients += coefficient
+        derniere_date = res[0][0]
+        annee, mois = int(derniere_date[:4]), int(derniere_date[5:7])
+        rentree = annee if mois >= 8 else annee - 1
 
-        if somme_coefficients == 0:
-            return 0
-        return round(somme_notes / somme_coefficients, 2)
+        if periode == 's1':
+            return f"{rentree}-09-01", f"{rentree + 1}-02-01"
+        return f"{rentree + 1}-02-01", f"{rentree + 1}-08-01"
+
+    def lire_version_pages(self):
+        """Jeton qui change dès qu'une note de l'élève, de sa classe ou que son emploi du temps change.
+
+        Une seule requête indexée : les pages élève peuvent répondre 304 sans
+        rien recalculer tant que ce jeton ne bouge pas. None si l'élève n'existe pas.
+        """
+        sql = '''SELECT Eleves.id_classe,
+                        (SELECT version FROM VersionsDonnees WHERE portee = 'eleve:' || Eleves.id_eleve),
+                        (SELECT version FROM VersionsDonnees WHERE portee = 'classe:' || Eleves.id_classe),
+                        (SELECT version FROM VersionsDonnees WHERE portee = 'edt:' || Eleves.id_classe)
+                 FROM Eleves WHERE id_eleve = ?'''
+        res = self._executer(sql, (self.id,), fetch=True)
+        if not res:
+            return None
+        return "-".join(str(valeur or 0) for valeur in res[0])
 
     def recuperer_id_classe(self):
         """Retourne l'id de classe de l'élève connecté."""
+        if self.contexte is not None:
+            infos = self.contexte['infos']
+            return infos['id_classe'] if infos else None
         sql = "SELECT id_classe FROM Eleves WHERE id_eleve = ?"
         res = self._executer(sql, (self.id,), fetch=True)
         if not res:
             return None
         return res[0][0]
 
-    def note_dans_periode(self, note, periode):
-        """Filtre les notes selon le semestre demandé."""
-        if periode == 'tout':
-            return True
-
-        _, mois, _ = self.convertir_date_fr_vers_tuple(note['date_note'])
-
-        if periode == 's1':
-            return mois in [9, 10, 11, 12, 1]
-        if periode == 's2':
-            return mois in [2, 3, 4, 5, 6, 7]
-        return True
-
-    def filtrer_notes(self, notes_detaillees, id_matiere, periode):
-        """Applique les filtres matière + période."""
-        notes_filtrees = []
-
-        for note in notes_detaillees:
-            if id_matiere != 'toutes' and str(note['id_matiere']) != str(id_matiere):
-                continue
-            if not self.note_dans_periode(note, periode):
-                continue
-            notes_filtrees.append(note)
-
-        return notes_filtrees
-
     def construire_notes_par_matiere(self, notes_detaillees):
-        """Regroupe les notes par matière (affichage type PRONOTE)."""
-        dictionnaire = {}
-
+        """Regroupe les notes par matière et calcule les moyennes dans la même boucle."""
+        groupes = {}
         for note in notes_detaillees:
-            id_matiere = note['id_matiere']
-            if id_matiere not in dictionnaire:
-                dictionnaire[id_matiere] = {
-                    'id_matiere': id_matiere,
-                    'nom_matiere': note['nom_matiere'],
-                    'notes': [],
-                    'moyenne_matiere': 0
-                }
-            dictionnaire[id_matiere]['notes'].append(note)
-
-        matieres = []
-        for matiere in dictionnaire.values():
-            notes_pour_moyenne = []
-            for note in matiere['notes']:
-                notes_pour_moyenne.append((note['valeur'], note['coefficient']))
-            matiere['moyenne_matiere'] = self.calculer_moyenne_ponderee(notes_pour_moyenne)
-            matieres.append(matiere)
-
-        matieres.sort(key=lambda matiere: matiere['nom_matiere'])
-        return matieres
-
-    def lister_matieres_disponibles(self, notes_detaillees):
-        """Retourne la liste unique des matières présentes dans les notes."""
-        matieres = {}
-        for note in notes_detaillees:
-            matieres[note['id_matiere']] = note['nom_matiere']
-
-        lignes = []
-        for id_matiere, nom_matiere in matieres.items():
-            lignes.append({'id_matiere': id_matiere, 'nom_matiere': nom_matiere})
-
-        lignes.sort(key=lambda ligne: ligne['nom_matiere'])
-        return lignes
+            groupe = groupes.get(note.id_matiere)
+            if groupe is None:
+                groupe = GroupeMatiere(note.id_matiere, note.nom_matiere)
+                groupes[note.id_matiere] = groupe
+            groupe.ajouter(note)
+
+        return sorted(groupes.values(), key=lambda groupe: groupe.nom_matiere)
+
+    def lister_matieres_disponibles(self):
+        """Retourne la liste unique des matières où l'élève a des notes."""
+        if self.contexte is not None:
+            return list(self.contexte['matieres'])
+        return self._lire_matieres_disponibles()
+
+    def _lire_matieres_disponibles(self):
+        """Lit les matières de l'élève dans la base, sans passer par le contexte."""
+        sql = '''SELECT Matieres.id_matiere, Matieres.nom_matiere
+                 FROM AgregatsEleveMatiere AS A JOIN Matieres ON A.id_matiere = Matieres.id_matiere
+                 WHERE A.id_eleve = ?
+                 ORDER BY Matieres.nom_matiere'''
+        lignes = self._executer(sql, (self.id,), fetch=True)
+        return [{'id_matiere': id_matiere, 'nom_matiere': nom_matiere} for id_matiere, nom_matiere in lignes]
 
     def construire_infos_detail_note(self, note_selectionnee, id_classe):
         """Prépare le panneau de droite (stats de classe pour la matière choisie)."""
         if note_selectionnee is None or id_classe is None:
             return None
 
-        sql = '''SELECT AVG(Notes.valeur), MIN(Notes.valeur), MAX(Notes.valeur)
-                 FROM Notes JOIN Eleves ON Notes.id_eleve = Eleves.id_eleve
-                 WHERE Eleves.id_classe = ? AND Notes.id_matiere = ?'''
-        res = self._executer(sql, (id_classe, note_selectionnee['id_matiere']), fetch=True)
+        stats = self.lire_stats_classe_matiere(id_classe, note_selectionnee.id_matiere)
 
         moyenne_classe = 0
         note_min = 0
         note_max = 0
-        if res and res[0][0] is not None:
-            moyenne_classe = round(res[0][0], 2)
-            note_min = round(res[0][1], 2)
-            note_max = round(res[0][2], 2)
+        if stats is not None:
+            moyenne_classe = round(stats[0], 2)
+            note_min = round(stats[1], 2)
+            note_max = round(stats[2], 2)
 
         return {
-            'matiere': note_selectionnee['nom_matiere'],
-            'date_note': note_selectionnee['date_note'],
-            'note_eleve': note_selectionnee['valeur'],
-            'coefficient': note_selectionnee['coefficient'],
+            'matiere': note_selectionnee.nom_matiere,
+            'date_note': note_selectionnee.date_note,
+            'note_eleve': note_selectionnee.valeur,
+            'coefficient': note_selectionnee.coefficient,
             'moyenne_classe': moyenne_classe,
             'note_min': note_min,
             'note_max': note_max,
-            'mention': self.generer_mention_note(note_selectionnee['valeur'])
+            'mention': self.generer_mention_note(note_selectionnee.valeur)
         }
 
 
 
     def recuperer_infos_personnelles(self):
         """Récupère les informations de base de l'élève et de sa classe."""
+        if self.contexte is not None:
+            infos = self.contexte['infos']
+            return dict(infos) if infos else None
+        return self._lire_infos_personnelles()
+
+    def _lire_infos_personnelles(self):
+        """Lit les informations de l'élève dans la base, sans passer par le contexte."""
         sql = '''SELECT Eleves.id_eleve, Eleves.nom, Eleves.prenom, Eleves.date_naissance,
                         Classes.id_classe, Classes.nom_classe
                  FROM Eleves JOIN Classes ON Eleves.id_classe = Classes.id_classe
@@ -255,23 +1309,12 @@ class Eleve(Utilisateur):
     def calculer_resultats_par_matiere(self):
         """Calcule la moyenne de l'élève matière par matière."""
         sql = '''SELECT Matieres.id_matiere, Matieres.nom_matiere,
-                        SUM(Notes.valeur * Notes.coefficient), SUM(Notes.coefficient), COUNT(Notes.id_note)
-                 FROM Notes JOIN Matieres ON Notes.id_matiere = Matieres.id_matiere
-                 WHERE Notes.id_eleve = ?
-                 GROUP BY Matieres.id_matiere, Matieres.nom_matiere
+                        A.somme_ponderee, A.somme_coefficients, A.nb_notes
+                 FROM AgregatsEleveMatiere AS A JOIN Matieres ON A.id_matiere = Matieres.id_matiere
+                 WHERE A.id_eleve = ?
                  ORDER BY Matieres.nom_matiere'''
         lignes = self._executer(sql, (self.id,), fetch=True)
-
-        resultats = []
-        for id_matiere, nom_matiere, somme_notes, somme_coef, nb_notes in lignes:
-            moyenne = round(somme_notes / somme_coef, 2) if somme_coef else 0
-            resultats.append({
-                'id_matiere': id_matiere,
-                'nom_matiere': nom_matiere,
-                'moyenne': moyenne,
-                'nb_notes': nb_notes
-            })
-        return resultats
+        return [formater_resultat_matiere(*ligne) for ligne in lignes]
 
     def construire_cahier_de_texte(self):
         """Construit un cahier de texte simple à partir des dernières évaluations."""
@@ -291,48 +1334,16 @@ class Eleve(Utilisateur):
         return entries
 
     def table_emploi_du_temps_disponible(self):
-        """Vérifie si la table EmploiDuTemps existe dans la base."""
-        sql = "SELECT name FROM sqlite_master WHERE type='table' AND name='EmploiDuTemps'"
-        res = self._executer(sql, fetch=True)
-        return bool(res)
+        """Vérifie si la table EmploiDuTemps existe dans la base (vérifié une seule fois par base)."""
+        return emploi_du_temps_disponible(self.db_path)
 
-    def recuperer_emploi_du_temps(self):
-        """Retourne l'emploi du temps de la classe de l'élève."""
-        id_classe = self.recuperer_id_classe()
+    def recuperer_emploi_du_temps(self, id_classe=None):
+        """Retourne l'emploi du temps de la classe de l'élève (le même pour toute la classe, gardé en cache)."""
         if id_classe is None:
+            id_classe = self.recuperer_id_classe()
+        if id_classe is None or not self.table_emploi_du_temps_disponible():
             return []
-
-        sql = '''SELECT EmploiDuTemps.jour_semaine, EmploiDuTemps.heure_debut, EmploiDuTemps.heure_fin,
-                        Matieres.nom_matiere, Professeurs.prenom, Professeurs.nom, EmploiDuTemps.salle
-                 FROM EmploiDuTemps
-                 JOIN Matieres ON EmploiDuTemps.id_matiere = Matieres.id_matiere
-                 JOIN Professeurs ON EmploiDuTemps.id_prof = Professeurs.id_prof
-                 WHERE EmploiDuTemps.id_classe = ?
-                 ORDER BY CASE EmploiDuTemps.jour_semaine
-                    WHEN 'Lundi' THEN 1
-                    WHEN 'Mardi' THEN 2
-                    WHEN 'Mercredi' THEN 3
-                    WHEN 'Jeudi' THEN 4
-                    WHEN 'Vendredi' THEN 5
-                    ELSE 6 END,
-                    EmploiDuTemps.heure_debut'''
-
-        try:
-            lignes = self._executer(sql, (id_classe,), fetch=True)
-        except sqlite3.OperationalError:
-            return []
-
-        edt = []
-        for jour, h_debut, h_fin, matiere, prenom_prof, nom_prof, salle in lignes:
-            edt.append({
-                'jour': jour,
-                'heure_debut': h_debut,
-                'heure_fin': h_fin,
-                'matiere': matiere,
-                'prof': f"{prenom_prof} {nom_prof}",
-                'salle': salle
-            })
-        return edt
+        return self.emploi_du_temps_classe(id_classe)
 
     def generer_mention_note(self, note_sur_20):
         """Donne une mention courte pour aider l'élève à se situer."""
@@ -346,78 +1357,961 @@ class Eleve(Utilisateur):
             return 'Niveau correct, tu peux viser plus haut.'
         return 'Ne lâche pas, une révision régulière va aider.'
 
-    def construire_emploi_par_jour(self, emploi):
-        """Regroupe les cours par jour pour simplifier l'affichage HTML."""
-        emploi_par_jour = {jour: [] for jour in JOURS_SEMAINE}
-        for cours in emploi:
-            if cours['jour'] in emploi_par_jour:
-                emploi_par_jour[cours['jour']].append(cours)
-        return emploi_par_jour
-
     def calculer_rang(self):
-        """Algorithme simple de classement dans la classe."""
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.cursor()
+        """Retourne (rang, effectif, moyenne générale) de l'élève dans sa classe."""
+        id_classe = self.recuperer_id_classe()
+        if id_classe is None:
+            return 0, 0, 0
+
+        classement = self.calculer_classement_classe(id_classe)
+        if str(self.id) not in classement:
+            return 0, len(classement), 0
+
+        rang, moyenne = classement[str(self.id)]
+        return rang, len(classement), round(moyenne, 2)
+
+    def generer_bulletin_txt(self, rang_classe=None, resultats=None):
+        """Génère le texte du bulletin (rien n'est écrit sur le disque).
+
+        rang_classe = (rang, total, moyenne) et resultats peuvent être fournis
+        s'ils ont déjà été calculés, pour ne pas refaire les requêtes.
+        """
+        if rang_classe is None:
+            rang_classe = self.calculer_rang()
+        if resultats is None:
+            resultats = self.calculer_resultats_par_matiere()
+
+        rang, total, moyenne_generale = rang_classe
+        return rendre_bulletin_txt(self.prenom, self.nom, resultats, rang, total, moyenne_generale)
+
+
+def note_valide(valeur):
+    """Vrai pour une note finie entre 0 et NOTE_MAX (NaN et infini refusés)."""
+    return math.isfinite(valeur) and 0 <= valeur <= NOTE_MAX
+
+
+def coefficient_valide(coeff):
+    """Vrai pour un coefficient fini, positif et au plus COEFFICIENT_MAX."""
+    return math.isfinite(coeff) and 0 < coeff <= COEFFICIENT_MAX
+
+
+def point_evolution(date_iso, somme_ponderee, somme_coefficients):
+    """Un point d'une courbe de moyenne : {'date', 'moyenne'} (None sans coefficient)."""
+    return {'date': date_iso, 'moyenne': round(somme_ponderee / somme_coefficients, 2) if somme_coefficients else None}
+
+
+def formater_resultat_matiere(id_matiere, nom_matiere, somme_ponderee, somme_coefficients, nb_notes):
+    """Transforme une ligne d'agrégats en résultat affichable d'une matière."""
+    return {
+        'id_matiere': id_matiere,
+        'nom_matiere': nom_matiere,
+        'moyenne': round(somme_ponderee / somme_coefficients, 2) if somme_coefficients else 0,
+        'nb_notes': nb_notes
+    }
+
+
+def rendre_bulletin_txt(prenom, nom, resultats, rang, total, moyenne_generale):
+    """Met en forme un bulletin texte à partir de résultats déjà calculés."""
+    fichier = io.StringIO()
+    fichier.write("╔" + "═" * 50 + "╗\n")
+    fichier.write(f"║{'BULLETIN TRIMESTRIEL':^50}║\n")
+    fichier.write("╠" + "═" * 50 + "╣\n")
+    fichier.write(f"║ Élève : {prenom} {nom:<31} ║\n")
+    fichier.write("╟" + "─" * 50 + "╢\n")
+
+    for ligne in resultats:
+        fichier.write(f"║ {ligne['nom_matiere']:<25} | Moy: {ligne['moyenne']:>5.2f}/20 ║\n")
+
+    fichier.write("╠" + "═" * 50 + "╣\n")
+    fichier.write(f"║ MOYENNE GENERALE : {moyenne_generale:>23.2f}/20 ║\n")
+    fichier.write(f"║ RANG : {str(rang) + '/' + str(total):>35} ║\n")
+    fichier.write("╚" + "═" * 50 + "╝\n")
+    return fichier.getvalue()
+
+
+def rendre_bulletin_eleve(bulletin):
+    """Retourne (nom_du_fichier, texte) pour un élément de preparer_bulletins_classe."""
+    nom_fichier = f"{bulletin['nom_classe']}/bulletin_{bulletin['id_eleve']}_{bulletin['nom']}_{bulletin['prenom']}.txt"
+    texte = rendre_bulletin_txt(
+        bulletin['prenom'], bulletin['nom'], bulletin['resultats'],
+        bulletin['rang'], bulletin['total'], bulletin['moyenne']
+    )
+    return nom_fichier, texte
+
+
+def ecrire_bulletins(bulletins_rendus, destination, format_sortie='zip'):
+    """Écrit les bulletins dans une archive zip ou dans un seul fichier texte.
+
+    destination peut être un chemin ou un objet fichier (BytesIO pour Flask).
+    """
+    if format_sortie == 'zip':
+        with zipfile.ZipFile(destination, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for nom_fichier, texte in bulletins_rendus:
+                archive.writestr(nom_fichier, texte)
+        return
+
+    # Un seul document : les bulletins sont séparés par un saut de page.
+    contenu = "\f\n".join(texte for _, texte in bulletins_rendus).encode('utf-8')
+    if hasattr(destination, 'write'):
+        destination.write(contenu)
+    else:
+        with open(destination, 'wb') as fichier:
+            fichier.write(contenu)
+
+# -------------------------------------------------------------------------
+# AGREGATS DES NOTES (tables tenues à jour à chaque écriture de note)
+# -------------------------------------------------------------------------
+
+
+def creer_tables_agregats(cur):
+    """Crée les tables d'agrégats si elles n'existent pas encore."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS AgregatsEleveMatiere (
+            id_eleve TEXT,
+            id_matiere INTEGER,
+            somme_ponderee REAL,
+            somme_coefficients REAL,
+            somme_valeurs REAL,
+            nb_notes INTEGER,
+            note_min REAL,
+            note_max REAL,
+            PRIMARY KEY (id_eleve, id_matiere)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS AgregatsClasseMatiere (
+            id_classe INTEGER,
+            id_matiere INTEGER,
+            somme_valeurs REAL,
+            nb_notes INTEGER,
+            note_min REAL,
+            note_max REAL,
+            PRIMARY KEY (id_classe, id_matiere)
+        )
+        """
+    )
+
+
+def incrementer_versions(cur, portees):
+    """Incrémente les compteurs de version (dans la transaction de l'écriture)."""
+    cur.executemany(
+        """
+        INSERT INTO VersionsDonnees (portee, version) VALUES (?, 1)
+        ON CONFLICT (portee) DO UPDATE SET version = version + 1
+        """,
+        [(portee,) for portee in portees]
+    )
 
-            cur.execute("SELECT id_classe FROM Eleves WHERE id_eleve = ?", (self.id,))
-            res = cur.fetchone()
-            if not res:
-                return 0, 0, 0
-            id_classe = res[0]
 
-            cur.execute("SELECT id_eleve FROM Eleves WHERE id_classe = ?", (id_classe,))
-            camarades = cur.fetchall()
+def rafraichir_agregats_eleve(cur, id_eleve, id_matiere):
+    """Recalcule les agrégats d'un couple (élève, matière) depuis ses seules notes."""
+    incrementer_versions(cur, [f"eleve:{id_eleve}"])
+    cur.execute("DELETE FROM AgregatsEleveMatiere WHERE id_eleve = ? AND id_matiere = ?", (id_eleve, id_matiere))
+    cur.execute(
+        """
+        INSERT INTO AgregatsEleveMatiere
+        SELECT id_eleve, id_matiere, SUM(valeur * coefficient), SUM(coefficient), SUM(valeur),
+               COUNT(*), MIN(valeur), MAX(valeur)
+        FROM Notes WHERE id_eleve = ? AND id_matiere = ?
+        GROUP BY id_eleve, id_matiere
+        """,
+        (id_eleve, id_matiere)
+    )
+
+
+def rafraichir_agregats_classe(cur, id_classe, id_matiere):
+    """Recalcule l'agrégat d'une classe dans une matière depuis les agrégats de ses élèves."""
+    incrementer_versions(cur, [f"classe:{id_classe}", f"classe:{id_classe}:{id_matiere}"])
+    cur.execute("DELETE FROM AgregatsClasseMatiere WHERE id_classe = ? AND id_matiere = ?", (id_classe, id_matiere))
+    cur.execute(
+        """
+        INSERT INTO AgregatsClasseMatiere
+        SELECT Eleves.id_classe, A.id_matiere, SUM(A.somme_valeurs), SUM(A.nb_notes),
+               MIN(A.note_min), MAX(A.note_max)
+        FROM AgregatsEleveMatiere AS A JOIN Eleves ON A.id_eleve = Eleves.id_eleve
+        WHERE Eleves.id_classe = ? AND A.id_matiere = ?
+        GROUP BY Eleves.id_classe, A.id_matiere
+        """,
+        (id_classe, id_matiere)
+    )
+
+
+def rafraichir_agregats(cur, id_eleve, id_matiere):
+    """Recalcule les agrégats d'un couple (élève, matière) puis ceux de sa classe.
+
+    Seules les notes de cet élève dans cette matière sont relues. La classe
+    est ensuite recalculée à partir des agrégats de ses élèves pour cette
+    matière : la table Notes n'est jamais parcourue en entier.
+    Retourne l'id de la classe de l'élève (None si l'élève n'existe pas).
+    """
+    rafraichir_agregats_eleve(cur, id_eleve, id_matiere)
+
+    cur.execute("SELECT id_classe FROM Eleves WHERE id_eleve = ?", (id_eleve,))
+    res = cur.fetchone()
+    if not res:
+        return None
+    rafraichir_agregats_classe(cur, res[0], id_matiere)
+    return res[0]
+
+
+def reconstruire_agregats(cur):
+    """Recalcule entièrement les agrégats à partir de la table Notes."""
+    cur.execute("DELETE FROM AgregatsEleveMatiere")
+    cur.execute("DELETE FROM AgregatsClasseMatiere")
+    cur.execute(
+        """
+        INSERT INTO AgregatsEleveMatiere
+        SELECT id_eleve, id_matiere, SUM(valeur * coefficient), SUM(coefficient), SUM(valeur),
+               COUNT(*), MIN(valeur), MAX(valeur)
+        FROM Notes
+        GROUP BY id_eleve, id_matiere
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO AgregatsClasseMatiere
+        SELECT Eleves.id_classe, A.id_matiere, SUM(A.somme_valeurs), SUM(A.nb_notes),
+               MIN(A.note_min), MAX(A.note_max)
+        FROM AgregatsEleveMatiere AS A JOIN Eleves ON A.id_eleve = Eleves.id_eleve
+        GROUP BY Eleves.id_classe, A.id_matiere
+        """
+    )
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='EvolutionEleve'")
+    if cur.fetchone() is not None:
+        reconstruire_evolution(cur)
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='VersionsDonnees'")
+    if cur.fetchone() is not None:
+        cur.execute("UPDATE VersionsDonnees SET version = version + 1")
+
+
+# -------------------------------------------------------------------------
+# EVOLUTION DES MOYENNES (sommes cumulées des notes, date par date)
+# -------------------------------------------------------------------------
+
+# Chaque ligne donne les sommes de toutes les notes jusqu'à cette date incluse :
+# la moyenne à une date D est la ligne de plus grande date <= D, une seule
+# recherche dans la clé primaire, sans relire les notes.
+
+
+def creer_tables_evolution(cur):
+    """Crée les tables des sommes cumulées par (élève, matière, date) et par (élève, date)."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS EvolutionEleveMatiere (
+            id_eleve TEXT NOT NULL,
+            id_matiere INTEGER NOT NULL,
+            date_iso TEXT NOT NULL,
+            somme_ponderee REAL,
+            somme_coefficients REAL,
+            nb_notes INTEGER,
+            PRIMARY KEY (id_eleve, id_matiere, date_iso)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS EvolutionEleve (
+            id_eleve TEXT NOT NULL,
+            date_iso TEXT NOT NULL,
+            somme_ponderee REAL,
+            somme_coefficients REAL,
+            nb_notes INTEGER,
+            PRIMARY KEY (id_eleve, date_iso)
+        ) WITHOUT ROWID
+        """
+    )
+
+
+def decaler_evolution(cur, id_eleve, id_matiere, date_iso, ecart_pondere, ecart_coefficients, ecart_notes):
+    """Reporte sur les sommes cumulées l'effet d'une note ajoutée, modifiée ou retirée à date_iso.
+
+    Seules les lignes à partir de date_iso changent, sans relire les notes.
+    La ligne du jour est créée au besoin à partir de la précédente. Elle et
+    les suivantes sont décalées de l'écart. Si plus aucune note ne tombe ce
+    jour-là, la ligne du jour est retirée.
+    """
+    for table, filtre, cle in (
+        ('EvolutionEleveMatiere', "id_eleve = ? AND id_matiere = ?", (id_eleve, id_matiere)),
+        ('EvolutionEleve', "id_eleve = ?", (id_eleve,)),
+    ):
+        cur.execute(
+            f"""SELECT somme_ponderee, somme_coefficients, nb_notes FROM {table}
+                WHERE {filtre} AND date_iso < ? ORDER BY date_iso DESC LIMIT 1""",
+            (*cle, date_iso)
+        )
+        precedente = cur.fetchone() or (0, 0, 0)
+        cur.execute(f"INSERT OR IGNORE INTO {table} VALUES ({', '.join('?' * (len(cle) + 4))})", (*cle, date_iso, *precedente))
+        cur.execute(
+            f"""UPDATE {table}
+                SET somme_ponderee = somme_ponderee + ?, somme_coefficients = somme_coefficients + ?,
+                    nb_notes = nb_notes + ?
+                WHERE {filtre} AND date_iso >= ?""",
+            (ecart_pondere, ecart_coefficients, ecart_notes, *cle, date_iso)
+        )
+        cur.execute(f"DELETE FROM {table} WHERE {filtre} AND date_iso = ? AND nb_notes = ?", (*cle, date_iso, precedente[2]))
+
+
+def reconstruire_evolution(cur):
+    """Recalcule toutes les sommes cumulées à partir de la table Notes."""
+    cur.execute("DELETE FROM EvolutionEleveMatiere")
+    cur.execute("DELETE FROM EvolutionEleve")
+    cur.execute(
+        """
+        INSERT INTO EvolutionEleveMatiere
+        SELECT id_eleve, id_matiere, date_iso,
+               SUM(SUM(valeur * coefficient)) OVER jusqua, SUM(SUM(coefficient)) OVER jusqua, SUM(COUNT(*)) OVER jusqua
+        FROM Notes
+        GROUP BY id_eleve, id_matiere, date_iso
+        WINDOW jusqua AS (PARTITION BY id_eleve, id_matiere ORDER BY date_iso)
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO EvolutionEleve
+        SELECT id_eleve, date_iso,
+               SUM(SUM(valeur * coefficient)) OVER jusqua, SUM(SUM(coefficient)) OVER jusqua, SUM(COUNT(*)) OVER jusqua
+        FROM Notes
+        GROUP BY id_eleve, date_iso
+        WINDOW jusqua AS (PARTITION BY id_eleve ORDER BY date_iso)
+        """
+    )
+
+
+def fins_de_mois(debut, fin):
+    """Dates ISO du dernier jour de chaque mois entre debut et fin, fin comprise (points d'une courbe)."""
+    dates = []
+    annee, mois = int(debut[:4]), int(debut[5:7])
+    while True:
+        annee_suivante, mois_suivant = (annee + 1, 1) if mois == 12 else (annee, mois + 1)
+        fin_du_mois = (datetime(annee_suivante, mois_suivant, 1) - timedelta(days=1)).strftime("%Y-%m-%d")
+        if fin_du_mois >= fin:
+            dates.append(fin)
+            return dates
+        dates.append(fin_du_mois)
+        annee, mois = annee_suivante, mois_suivant
+
+
+@app.cli.command('reconstruire-agregats')
+@click.option('--base', default=CHEMIN_DB, help="Chemin de la base SQLite (défaut: pronote.db)")
+def commande_reconstruire_agregats(base):
+    """Recalcule les tables d'agrégats d'une base existante."""
+    with obtenir_pool(base).transaction() as cur:
+        creer_tables_agregats(cur)
+        reconstruire_agregats(cur)
+        CACHE_CLASSES.vider()
+        cur.execute("SELECT COUNT(*) FROM AgregatsEleveMatiere")
+        print(f"Agrégats reconstruits : {cur.fetchone()[0]} couples (élève, matière).")
+
+
+# -------------------------------------------------------------------------
+# EMPLOI DU TEMPS : CONFLITS (professeur ou salle réservés deux fois)
+# -------------------------------------------------------------------------
+
+
+def detecter_conflits_emploi_du_temps(cur):
+    """Cherche tous les cours qui se chevauchent pour un même professeur ou une même salle.
+
+    Un seul balayage par type de ressource : les cours arrivent triés par
+    (ressource, jour, début) grâce aux index, et on garde dans un tas ceux
+    qui ne sont pas encore finis. Tout cours qui commence pendant l'un
+    d'eux est en conflit avec lui, sans comparer les cours deux à deux.
+    Retourne une liste de dictionnaires (type, ressource, jour_num, minute, cours).
+    """
+    conflits = []
+    for type_ressource, colonne in (('prof', 'id_prof'), ('salle', 'salle')):
+        cur.execute(
+            f"""
+            SELECT {colonne}, jour_num, minute_debut, minute_fin, id_cours, id_classe
+            FROM EmploiDuTemps
+            WHERE {colonne} IS NOT NULL
+            ORDER BY {colonne}, jour_num, minute_debut
+            """
+        )
+        groupe = None
+        en_cours = []
+        for ressource, jour_num, debut, fin, id_cours, id_classe in cur.fetchall():
+            if (ressource, jour_num) != groupe:
+                groupe = (ressource, jour_num)
+                en_cours = []
+            while en_cours and en_cours[0][0] <= debut:
+                heapq.heappop(en_cours)
+            for _, id_autre, classe_autre in en_cours:
+                conflits.append({
+                    'type': type_ressource,
+                    'ressource': ressource,
+                    'jour_num': jour_num,
+                    'minute': debut,
+                    'cours': [(id_autre, classe_autre), (id_cours, id_classe)]
+                })
+            heapq.heappush(en_cours, (fin, id_cours, id_classe))
+    return conflits
+
+
+@app.cli.command('verifier-emploi-du-temps')
+@click.option('--base', default=CHEMIN_DB, help="Base à vérifier (défaut: pronote.db)")
+def commande_verifier_emploi_du_temps(base):
+    """Signale les professeurs et les salles qui ont deux cours en même temps."""
+    appliquer_migrations(base)
+    with obtenir_pool(base).connexion() as conn:
+        conflits = detecter_conflits_emploi_du_temps(conn.cursor())
+
+    for conflit in conflits:
+        (cours_a, classe_a), (cours_b, classe_b) = conflit['cours']
+        jour = NOMS_JOURS[conflit['jour_num'] - 1] if conflit['jour_num'] else '?'
+        heure = f"{conflit['minute'] // 60:02d}:{conflit['minute'] % 60:02d}"
+        print(f"[{conflit['type']} {conflit['ressource']}] {jour} {heure} : "
+              f"cours {cours_a} (classe {classe_a}) et cours {cours_b} (classe {classe_b})")
+    print(f"{len(conflits)} conflit(s) dans l'emploi du temps.")
+    if conflits:
+        raise SystemExit(1)
+
+
+# -------------------------------------------------------------------------
+# MIGRATIONS DU SCHEMA (table schema_version)
+# -------------------------------------------------------------------------
+
+
+def migration_agregats(cur):
+    """Tables d'agrégats des notes, remplies depuis les notes existantes."""
+    creer_tables_agregats(cur)
+    reconstruire_agregats(cur)
+
+
+def migration_index(cur):
+    """Index pour ne plus parcourir toutes les notes, élèves et cours."""
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_notes_eleve_matiere ON Notes (id_eleve, id_matiere, valeur, coefficient)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_eleves_classe ON Eleves (id_classe, nom)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_edt_classe ON EmploiDuTemps (id_classe, jour_semaine, heure_debut)")
+    cur.execute("ANALYZE")
+
+
+def migration_dates_iso(cur):
+    """Colonne date_iso (AAAA-MM-JJ) triable et indexée, calculée depuis date_note (JJ/MM/AAAA)."""
+    cur.execute("PRAGMA table_info(Notes)")
+    colonnes = [ligne[1] for ligne in cur.fetchall()]
+    if 'date_iso' not in colonnes:
+        cur.execute("ALTER TABLE Notes ADD COLUMN date_iso TEXT")
+    cur.execute(
+        """
+        UPDATE Notes
+        SET date_iso = substr(date_note, 7, 4) || '-' || substr(date_note, 4, 2) || '-' || substr(date_note, 1, 2)
+        WHERE date_iso IS NULL
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_notes_eleve_date ON Notes (id_eleve, date_iso)")
+    cur.execute("ANALYZE Notes")
+
+
+def migration_versions(cur):
+    """Compteurs de version des données, lus par les caches pour savoir si une valeur est périmée."""
+    cur.execute("CREATE TABLE IF NOT EXISTS VersionsDonnees (portee TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+
+def migration_versions_emploi_du_temps(cur):
+    """Déclencheurs qui incrémentent la version 'edt:<classe>' à chaque modification d'un cours.
+
+    L'emploi du temps n'est pas modifié par l'application : les déclencheurs
+    suivent aussi les changements faits directement dans la base.
+    """
+    incrementer = """
+        INSERT INTO VersionsDonnees (portee, version) VALUES ('edt:' || {ligne}.id_classe, 1)
+        ON CONFLICT (portee) DO UPDATE SET version = version + 1;
+    """
+    for evenement, lignes in (('INSERT', ['NEW']), ('UPDATE', ['OLD', 'NEW']), ('DELETE', ['OLD'])):
+        corps = "".join(incrementer.format(ligne=ligne) for ligne in lignes)
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_edt_version_{evenement.lower()} "
+            f"AFTER {evenement} ON EmploiDuTemps BEGIN {corps} END"
+        )
+
+
+def migration_recherche_eleves(cur):
+    """Table FTS5 (nom, prénom, classe) des élèves, tenue à jour par des déclencheurs.
+
+    Les accents sont ignorés (Zoé = Zoe) et les préfixes de 2 et 3 lettres
+    sont indexés pour la saisie au fil de la frappe. Eleves n'a pas de rowid
+    stable (clé primaire texte) : la table est reliée par id_eleve.
+    """
+    cur.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS RechercheEleves USING fts5(
+            nom, prenom, nom_classe, id_eleve UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+        )
+        """
+    )
+    # Le nom compte plus que le prénom, qui compte plus que la classe.
+    cur.execute("INSERT INTO RechercheEleves (RechercheEleves, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')")
+    cur.execute("DELETE FROM RechercheEleves")
+    cur.execute(
+        """
+        INSERT INTO RechercheEleves (nom, prenom, nom_classe, id_eleve)
+        SELECT Eleves.nom, Eleves.prenom, Classes.nom_classe, Eleves.id_eleve
+        FROM Eleves LEFT JOIN Classes ON Eleves.id_classe = Classes.id_classe
+        """
+    )
+
+    inserer = """
+        INSERT INTO RechercheEleves (nom, prenom, nom_classe, id_eleve)
+        VALUES (NEW.nom, NEW.prenom, (SELECT nom_classe FROM Classes WHERE id_classe = NEW.id_classe), NEW.id_eleve);
+    """
+    supprimer = "DELETE FROM RechercheEleves WHERE id_eleve = OLD.id_eleve;"
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_recherche_eleves_insert AFTER INSERT ON Eleves BEGIN {inserer} END")
+    cur.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_recherche_eleves_update "
+        f"AFTER UPDATE OF id_eleve, nom, prenom, id_classe ON Eleves BEGIN {supprimer} {inserer} END"
+    )
+    cur.execute(f"CREATE TRIGGER IF NOT EXISTS trg_recherche_eleves_delete AFTER DELETE ON Eleves BEGIN {supprimer} END")
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_recherche_classes_update AFTER UPDATE OF nom_classe ON Classes
+        BEGIN
+            UPDATE RechercheEleves SET nom_classe = NEW.nom_classe
+            WHERE id_eleve IN (SELECT id_eleve FROM Eleves WHERE id_classe = NEW.id_classe);
+        END
+        """
+    )
+
+
+def migration_comptes(cur):
+    """Vue unique des comptes : la connexion trouve le rôle en une requête (deux recherches par clé primaire)."""
+    cur.execute(
+        """
+        CREATE VIEW IF NOT EXISTS Comptes AS
+        SELECT id_prof AS identifiant, 'PROF' AS role, nom, prenom, mot_de_passe FROM Professeurs
+        UNION ALL
+        SELECT id_eleve AS identifiant, 'ELEVE' AS role, nom, prenom, mot_de_passe FROM Eleves
+        """
+    )
+
+
+def migration_creneaux_emploi_du_temps(cur):
+    """Jour (1 = lundi) et minutes de début et de fin des cours en entiers, avec un index par classe, professeur et salle.
+
+    Colonnes générées à partir des colonnes texte : toujours justes, même
+    pour un cours saisi directement dans la base. Elles remplacent le tri
+    par CASE sur le nom du jour.
+    """
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='EmploiDuTemps'")
+    if cur.fetchone() is None:
+        return
+    cur.execute("PRAGMA table_xinfo(EmploiDuTemps)")
+    colonnes = [ligne[1] for ligne in cur.fetchall()]
+    jours = " ".join(f"WHEN '{nom}' THEN {numero}" for numero, nom in enumerate(NOMS_JOURS, start=1))
+    generees = {
+        'jour_num': f"CASE jour_semaine {jours} END",
+        'minute_debut': "CAST(substr(heure_debut, 1, 2) AS INTEGER) * 60 + CAST(substr(heure_debut, 4, 2) AS INTEGER)",
+        'minute_fin': "CAST(substr(heure_fin, 1, 2) AS INTEGER) * 60 + CAST(substr(heure_fin, 4, 2) AS INTEGER)",
+    }
+    for colonne, expression in generees.items():
+        if colonne not in colonnes:
+            cur.execute(f"ALTER TABLE EmploiDuTemps ADD COLUMN {colonne} INTEGER GENERATED ALWAYS AS ({expression}) VIRTUAL")
+
+    cur.execute("DROP INDEX IF EXISTS idx_edt_classe")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_edt_classe_creneau ON EmploiDuTemps (id_classe, jour_num, minute_debut, minute_fin)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_edt_prof_creneau ON EmploiDuTemps (id_prof, jour_num, minute_debut, minute_fin)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_edt_salle_creneau ON EmploiDuTemps (salle, jour_num, minute_debut, minute_fin)")
+    cur.execute("ANALYZE EmploiDuTemps")
+
+
+def migration_versions_emploi_du_temps_prof(cur):
+    """Déclencheurs qui incrémentent la version 'edt_prof:<professeur>' à chaque modification d'un de ses cours."""
+    incrementer = """
+        INSERT INTO VersionsDonnees (portee, version) VALUES ('edt_prof:' || {ligne}.id_prof, 1)
+        ON CONFLICT (portee) DO UPDATE SET version = version + 1;
+    """
+    for evenement, lignes in (('INSERT', ['NEW']), ('UPDATE', ['OLD', 'NEW']), ('DELETE', ['OLD'])):
+        corps = "".join(incrementer.format(ligne=ligne) for ligne in lignes)
+        cur.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_edt_prof_version_{evenement.lower()} "
+            f"AFTER {evenement} ON EmploiDuTemps BEGIN {corps} END"
+        )
+
+
+def migration_evolution(cur):
+    """Sommes cumulées des notes par date, pour lire une moyenne à n'importe quelle date sans relire les notes."""
+    creer_tables_evolution(cur)
+    reconstruire_evolution(cur)
+
+
+# (version, description, fonction) : ne jamais modifier une migration déjà publiée,
+# toujours en ajouter une nouvelle à la fin.
+MIGRATIONS = [
+    (1, "Tables d'agrégats des notes", migration_agregats),
+    (2, "Index sur Notes, Eleves et EmploiDuTemps", migration_index),
+    (3, "Dates des notes au format ISO", migration_dates_iso),
+    (4, "Compteurs de version des données", migration_versions),
+    (5, "Version de l'emploi du temps de chaque classe", migration_versions_emploi_du_temps),
+    (6, "Index plein texte de recherche des élèves", migration_recherche_eleves),
+    (7, "Vue Comptes (professeurs et élèves)", migration_comptes),
+    (8, "Créneaux entiers et index de l'emploi du temps", migration_creneaux_emploi_du_temps),
+    (9, "Version de l'emploi du temps de chaque professeur", migration_versions_emploi_du_temps_prof),
+    (10, "Évolution cumulée des moyennes", migration_evolution),
+]
+
+
+# Tables du schéma d'origine (generer_db.py) que les migrations publiées
+# supposent présentes. Une ancienne base sans emploi du temps reçoit une
+# table vide avant la première migration, sans toucher aux migrations.
+TABLES_ORIGINE = [
+    """
+    CREATE TABLE IF NOT EXISTS EmploiDuTemps (
+        id_cours INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_classe INTEGER,
+        jour_semaine TEXT,
+        heure_debut TEXT,
+        heure_fin TEXT,
+        id_matiere INTEGER,
+        id_prof TEXT,
+        salle TEXT,
+        FOREIGN KEY(id_classe) REFERENCES Classes(id_classe),
+        FOREIGN KEY(id_matiere) REFERENCES Matieres(id_matiere),
+        FOREIGN KEY(id_prof) REFERENCES Professeurs(id_prof)
+    )
+    """,
+]
+
+
+def lire_version_schema(cur):
+    """Retourne la dernière version de migration appliquée (0 si aucune)."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            date_application TEXT
+        )
+        """
+    )
+    cur.execute("SELECT MAX(version) FROM schema_version")
+    return cur.fetchone()[0] or 0
+
 
-            classement = []
-            for (id_comp,) in camarades:
+def appliquer_migrations(chemin_db):
+    """Applique dans l'ordre les migrations manquantes et retourne leurs descriptions.
+
+    Chaque migration tourne dans sa propre transaction BEGIN IMMEDIATE : si
+    plusieurs workers démarrent en même temps, un seul l'applique.
+    """
+    appliquees = []
+    with obtenir_pool(chemin_db).connexion() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='Notes'")
+        if cur.fetchone() is None:
+            return appliquees
+        cur.execute("PRAGMA journal_mode = WAL")
+
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            for sql in TABLES_ORIGINE:
+                cur.execute(sql)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        while True:
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                version = lire_version_schema(cur)
+                a_faire = [m for m in MIGRATIONS if m[0] > version]
+                if not a_faire:
+                    conn.commit()
+                    return appliquees
+
+                numero, description, fonction = a_faire[0]
+                fonction(cur)
                 cur.execute(
-                    "SELECT SUM(valeur * coefficient), SUM(coefficient) FROM Notes WHERE id_eleve = ?",
-                    (id_comp,)
+                    "INSERT INTO schema_version (version, description, date_application) VALUES (?, ?, ?)",
+                    (numero, description, datetime.now().strftime("%d/%m/%Y %H:%M:%S"))
                 )
-                row = cur.fetchone()
-                somme = row[0] if row[0] is not None else 0
-                coeffs = row[1] if row[1] is not None else 0
-                moyenne = (somme / coeffs) if coeffs > 0 else 0
-                classement.append((id_comp, moyenne))
-
-        classement.sort(key=lambda ligne: ligne[1], reverse=True)
-        for i, (id_c, moyenne) in enumerate(classement):
-            if id_c == self.id:
-                return i + 1, len(camarades), round(moyenne, 2)
-
-        return 0, len(camarades), 0
-
-    def generer_bulletin_txt(self):
-        """Génère un bulletin texte simple à télécharger."""
-        rang, total, moyenne_generale = self.calculer_rang()
-        notes = self.voir_mes_notes()
-
-        notes_par_matiere = {}
-        for nom_mat, val, coef, _ in notes:
-            if nom_mat not in notes_par_matiere:
-                notes_par_matiere[nom_mat] = []
-            notes_par_matiere[nom_mat].append((val, coef))
-
-        nom_fichier = f"bulletin_{self.nom}_{self.prenom}.txt"
-        with open(nom_fichier, "w", encoding="utf-8") as fichier:
-            fichier.write("╔" + "═" * 50 + "╗\n")
-            fichier.write(f"║{'BULLETIN TRIMESTRIEL':^50}║\n")
-            fichier.write("╠" + "═" * 50 + "╣\n")
-            fichier.write(f"║ Élève : {self.prenom} {self.nom:<31} ║\n")
-            fichier.write("╟" + "─" * 50 + "╢\n")
-
-            for matiere, liste_notes in notes_par_matiere.items():
-                somme = sum([note[0] * note[1] for note in liste_notes])
-                somme_coef = sum([note[1] for note in liste_notes])
-                moyenne_matiere = somme / somme_coef if somme_coef > 0 else 0
-                fichier.write(f"║ {matiere:<25} | Moy: {moyenne_matiere:>5.2f}/20 ║\n")
-
-            fichier.write("╠" + "═" * 50 + "╣\n")
-            fichier.write(f"║ MOYENNE GENERALE : {moyenne_generale:>23.2f}/20 ║\n")
-            fichier.write(f"║ RANG : {str(rang) + '/' + str(total):>35} ║\n")
-            fichier.write("╚" + "═" * 50 + "╝\n")
-
-        return nom_fichier
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            appliquees.append(f"{numero} - {description}")
+
+
+@app.cli.command('migrer')
+@click.option('--base', default=CHEMIN_DB, help="Chemin de la base SQLite (défaut: pronote.db)")
+def commande_migrer(base):
+    """Met le schéma d'une base à jour."""
+    appliquees = appliquer_migrations(base)
+    for ligne in appliquees:
+        print(f"Migration appliquée : {ligne}")
+    with obtenir_pool(base).connexion() as conn:
+        print(f"Version du schéma : {lire_version_schema(conn.cursor())}")
+
+
+_SCHEMAS_VERIFIES = set()
+
+
+def verifier_schema(chemin_db):
+    """Refuse de servir une base pas encore migrée, sans rien y écrire.
+
+    Les migrations ne tournent que par la commande migrer : ni l'import du
+    module ni une requête ne modifient le schéma.
+    """
+    if chemin_db in _SCHEMAS_VERIFIES:
+        return
+    with obtenir_pool(chemin_db).connexion() as conn:
+        version = 0
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_version'").fetchone():
+            version = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+    if version < MIGRATIONS[-1][0]:
+        raise RuntimeError(f"Schéma de {chemin_db} en version {version} sur {MIGRATIONS[-1][0]} : "
+                           f"lancer « flask --app app migrer » avant de démarrer l'application.")
+    _SCHEMAS_VERIFIES.add(chemin_db)
+
+
+@app.before_request
+def verifier_schema_avant_requete():
+    verifier_schema(app.config['CHEMIN_DB'])
+
+
+# -------------------------------------------------------------------------
+# SESSIONS COTE SERVEUR (fichier SQLite partagé par les workers)
+# -------------------------------------------------------------------------
+
+
+class SessionServeur(CallbackDict, SessionMixin):
+    """Session dont seul l'identifiant voyage dans le cookie ; le contenu reste sur le serveur."""
+
+    def __init__(self, donnees=None, id_session=None):
+        def marquer_modifiee(_):
+            self.modified = True
+
+        super().__init__(donnees, marquer_modifiee)
+        self.id_session = id_session
+        self.modified = False
+        self.renouveler = False
+
+
+class SessionsSQLite(SessionInterface):
+    """Range les sessions dans une table SQLite : tous les workers de la machine les partagent."""
+
+    serializer = TaggedJSONSerializer()
+    PURGE_TOUTES_LES = 256
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin
+        self._ecritures = 0
+        self._pret = False
+        self._verrou = threading.Lock()
+
+    def pool(self):
+        """Pool du fichier des sessions, créé avec sa table à la première requête (rien n'est écrit à l'import)."""
+        if not self._pret:
+            with self._verrou:
+                if not self._pret:
+                    if self.chemin is None:
+                        dossier_donnees = os.path.dirname(os.path.abspath(app.config['CHEMIN_DB']))
+                        self.chemin = os.path.join(dossier_donnees, 'sessions.db')
+                    activer_wal(self.chemin)
+                    with obtenir_pool(self.chemin).transaction() as cur:
+                        cur.execute("CREATE TABLE IF NOT EXISTS Sessions "
+                                    "(id_session TEXT PRIMARY KEY, donnees TEXT, expire REAL)")
+                    self._pret = True
+        return obtenir_pool(self.chemin)
+
+    def open_session(self, app, request):
+        id_session = request.cookies.get(self.get_cookie_name(app))
+        if id_session:
+            with self.pool().connexion() as conn:
+                res = conn.execute(
+                    "SELECT donnees FROM Sessions WHERE id_session = ? AND expire > ?", (id_session, time.time())
+                ).fetchone()
+            if res is not None:
+                return SessionServeur(self.serializer.loads(res[0]), id_session)
+        return SessionServeur()
+
+    def save_session(self, app, session, response):
+        nom_cookie = self.get_cookie_name(app)
+        domaine = self.get_cookie_domain(app)
+        chemin = self.get_cookie_path(app)
+        pool = self.pool()
+
+        if not session:
+            # Session vidée (déconnexion) : on oublie aussi la ligne côté serveur.
+            if session.id_session is not None and session.modified:
+                with pool.transaction() as cur:
+                    cur.execute("DELETE FROM Sessions WHERE id_session = ?", (session.id_session,))
+                response.delete_cookie(nom_cookie, domain=domaine, path=chemin)
+            return
+        if not session.modified and session.id_session is not None:
+            return
+
+        with pool.transaction() as cur:
+            if session.renouveler and session.id_session is not None:
+                cur.execute("DELETE FROM Sessions WHERE id_session = ?", (session.id_session,))
+            if session.id_session is None or session.renouveler:
+                session.id_session = secrets.token_urlsafe(32)
+            cur.execute(
+                "INSERT OR REPLACE INTO Sessions (id_session, donnees, expire) VALUES (?, ?, ?)",
+                (session.id_session, self.serializer.dumps(dict(session)),
+                 time.time() + app.permanent_session_lifetime.total_seconds())
+            )
+            self._ecritures += 1
+            if self._ecritures % self.PURGE_TOUTES_LES == 0:
+                cur.execute("DELETE FROM Sessions WHERE expire <= ?", (time.time(),))
+
+        response.set_cookie(
+            nom_cookie,
+            session.id_session,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domaine,
+            path=chemin,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def renouveler_session():
+    """Vide la session et, côté serveur, change son identifiant (à faire à chaque connexion)."""
+    session.clear()
+    if isinstance(session._get_current_object(), SessionServeur):
+        session.renouveler = True
+
+
+if TYPE_SESSIONS == 'sqlite':
+    app.session_interface = SessionsSQLite(FICHIER_SESSIONS)
+
+
+# -------------------------------------------------------------------------
+# AUTHENTIFICATION (mots de passe hachés, cache des vérifications)
+# -------------------------------------------------------------------------
+
+
+class StatistiquesConnexions:
+    """Débit et latence des connexions de ce worker (les N dernières tentatives)."""
+
+    def __init__(self, taille_fenetre=1000):
+        self.tentatives = 0
+        self.reussites = 0
+        self.mises_a_niveau = 0
+        self._durees = deque(maxlen=taille_fenetre)
+        self._instants = deque(maxlen=taille_fenetre)
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, duree, reussie):
+        with self._verrou:
+            self.tentatives += 1
+            self.reussites += 1 if reussie else 0
+            self._durees.append(duree)
+            self._instants.append(time.monotonic())
+
+    def compter_mise_a_niveau(self):
+        with self._verrou:
+            self.mises_a_niveau += 1
+
+    def statistiques(self):
+        with self._verrou:
+            durees = sorted(self._durees)
+            fenetre = self._instants[-1] - self._instants[0] if len(self._instants) > 1 else 0
+            return {
+                'pid': os.getpid(),
+                'tentatives': self.tentatives,
+                'reussites': self.reussites,
+                'echecs': self.tentatives - self.reussites,
+                'mises_a_niveau': self.mises_a_niveau,
+                'debit_par_s': round((len(self._instants) - 1) / fenetre, 2) if fenetre else 0,
+                'latence_p50_ms': round(durees[len(durees) // 2] * 1000, 2) if durees else 0,
+                'latence_p95_ms': round(durees[int(len(durees) * 0.95)] * 1000, 2) if durees else 0,
+                'latence_max_ms': round(durees[-1] * 1000, 2) if durees else 0,
+            }
+
+
+STATISTIQUES_CONNEXIONS = StatistiquesConnexions()
+
+# Vérifications de mot de passe réussies : une reconnexion ne refait pas le hachage.
+# Les échecs ne sont pas gardés, sinon un mauvais mot de passe répété répondrait plus vite.
+CACHE_CONNEXIONS = CacheLRU(TAILLE_CACHE_CONNEXIONS, DUREE_CACHE_CONNEXIONS)
+
+_hash_factice = []
+
+
+def hash_factice():
+    """Hash vérifié quand l'identifiant n'existe pas, pour répondre aussi lentement qu'avec un vrai compte."""
+    if not _hash_factice:
+        _hash_factice.append(generate_password_hash(secrets.token_hex(16), METHODE_HACHAGE))
+    return _hash_factice[0]
+
+
+def est_hache(mot_de_passe_stocke):
+    return mot_de_passe_stocke.startswith(('pbkdf2:', 'scrypt:'))
+
+
+def mot_de_passe_valide(mot_de_passe_stocke, mdp):
+    """Compare en temps constant ; le hachage n'est refait qu'après un échec ou l'expiration du cache."""
+    if mot_de_passe_stocke is None:
+        return False
+    if not est_hache(mot_de_passe_stocke):
+        # Ancienne base en clair : remplacé par un hash dès la première connexion réussie.
+        # Le hachage factice aligne le temps de réponse sur celui d'un compte déjà haché.
+        check_password_hash(hash_factice(), mdp)
+        return hmac.compare_digest(mot_de_passe_stocke.encode(), mdp.encode())
+
+    # La clé contient le hash stocké : changer de mot de passe rend l'ancienne entrée inutilisable.
+    cle = hmac.new(app.secret_key.encode(), f"{mot_de_passe_stocke}\0{mdp}".encode(), hashlib.sha256).hexdigest()
+    return CACHE_CONNEXIONS.obtenir(cle, lambda: check_password_hash(mot_de_passe_stocke, mdp), conserver=bool)
+
+
+def mettre_a_niveau_mot_de_passe(identifiant, role, mot_de_passe_stocke, mdp):
+    """Hache un mot de passe encore en clair (ou haché avec un autre coût) après une connexion réussie."""
+    if est_hache(mot_de_passe_stocke) and mot_de_passe_stocke.split('$', 1)[0] == METHODE_HACHAGE:
+        return
+    table, colonne = ('Professeurs', 'id_prof') if role == 'PROF' else ('Eleves', 'id_eleve')
+    with obtenir_pool().transaction() as cur:
+        cur.execute(f"UPDATE {table} SET mot_de_passe = ? WHERE {colonne} = ?",
+                    (generate_password_hash(mdp, METHODE_HACHAGE), identifiant))
+    STATISTIQUES_CONNEXIONS.compter_mise_a_niveau()
+
+
+def authentifier(identifiant, mdp):
+    """Retourne (role, nom, prenom) si les identifiants sont bons, sinon None.
+
+    Une seule requête sur la vue Comptes ; un professeur passe avant un
+    élève qui aurait le même identifiant.
+    """
+    debut = time.perf_counter()
+    with obtenir_pool().connexion() as conn:
+        comptes = conn.execute(
+            "SELECT role, nom, prenom, mot_de_passe FROM Comptes WHERE identifiant = ? ORDER BY role DESC",
+            (identifiant,)
+        ).fetchall()
+
+    resultat = None
+    if not comptes:
+        check_password_hash(hash_factice(), mdp)
+    for role, nom, prenom, mot_de_passe_stocke in comptes:
+        if mot_de_passe_valide(mot_de_passe_stocke, mdp):
+            mettre_a_niveau_mot_de_passe(identifiant, role, mot_de_passe_stocke, mdp)
+            resultat = (role, nom, prenom)
+            break
+
+    STATISTIQUES_CONNEXIONS.enregistrer(time.perf_counter() - debut, resultat is not None)
+    return resultat
+
+
+@app.cli.command('hacher-mots-de-passe')
+@click.option('--base', default=CHEMIN_DB, help="Chemin de la base SQLite (défaut: pronote.db)")
+def commande_hacher_mots_de_passe(base):
+    """Remplace d'un coup tous les mots de passe encore en clair par leur hash."""
+    total = 0
+    with obtenir_pool(base).transaction() as cur:
+        for table, colonne in (('Professeurs', 'id_prof'), ('Eleves', 'id_eleve')):
+            cur.execute(f"SELECT {colonne}, mot_de_passe FROM {table} WHERE mot_de_passe IS NOT NULL")
+            a_hacher = [(identifiant, mdp) for identifiant, mdp in cur.fetchall() if not est_hache(mdp)]
+            cur.executemany(
+                f"UPDATE {table} SET mot_de_passe = ? WHERE {colonne} = ?",
+                [(generate_password_hash(mdp, METHODE_HACHAGE), identifiant) for identifiant, mdp in a_hacher]
+            )
+            total += len(a_hacher)
+    print(f"{total} mot(s) de passe haché(s) ({METHODE_HACHAGE}).")
 
 
 # -------------------------------------------------------------------------
@@ -436,20 +2330,13 @@ def login():
         user_id = request.form['user_id']
         mdp = request.form['mdp']
 
-        with sqlite3.connect('pronote.db') as conn:
-            cur = conn.cursor()
-
-            cur.execute("SELECT nom, prenom FROM Professeurs WHERE id_prof=? AND mot_de_passe=?", (user_id, mdp))
-            res_prof = cur.fetchone()
-            if res_prof:
-                session['user'] = {'id': user_id, 'nom': res_prof[0], 'prenom': res_prof[1], 'role': 'PROF'}
-                return redirect(url_for('prof_dashboard'))
-
-            cur.execute("SELECT nom, prenom FROM Eleves WHERE id_eleve=? AND mot_de_passe=?", (user_id, mdp))
-            res_eleve = cur.fetchone()
-            if res_eleve:
-                session['user'] = {'id': user_id, 'nom': res_eleve[0], 'prenom': res_eleve[1], 'role': 'ELEVE'}
-                return redirect(url_for('eleve_dashboard'))
+        compte = authentifier(user_id, mdp)
+        if compte is not None:
+            role, nom, prenom = compte
+            renouveler_session()
+            session['user'] = {'id': user_id, 'nom': nom, 'prenom': prenom, 'role': role}
+            session['contexte'] = (Eleve if role == 'ELEVE' else Professeur)(user_id, nom, prenom).charger_contexte()
+            return redirect(url_for('prof_dashboard' if role == 'PROF' else 'eleve_dashboard'))
 
         flash("Identifiant ou mot de passe incorrect.")
     return render_template('login.html')
@@ -460,23 +2347,53 @@ def prof_dashboard():
     if 'user' not in session or session['user']['role'] != 'PROF':
         return redirect(url_for('login'))
 
-    p = Professeur(session['user']['id'], session['user']['nom'], session['user']['prenom'])
+    p = recuperer_professeur_connecte()
+    classes = p.classes_enseignees()
 
     recherche = request.args.get('search')
+    eleves = []
     if recherche:
         eleves = p.chercher_eleve(recherche)
         classe_active = None
     else:
-        classe_active = request.args.get('classe', '1')
-        eleves = p.lister_eleves_par_classe(classe_active)
+        classe_active = request.args.get('classe', str(classes[0][0]) if classes else None)
+        if classe_active is not None and not p.enseigne_dans(classe_active):
+            flash("Vous n'avez pas cours avec cette classe.")
+            return redirect(url_for('prof_dashboard'))
+        if classe_active is not None:
+            eleves = p.lister_eleves_par_classe(classe_active)
 
     stats_result = None
     if request.method == 'POST' and 'calculer_stats' in request.form:
         id_c = request.form.get('stat_classe')
         id_m = request.form.get('stat_matiere')
-        stats_result = p.stats_matiere_classe(id_c, id_m)
+        if p.enseigne_dans(id_c):
+            stats_result = p.stats_matiere_classe(id_c, id_m)
+
+    return render_template(
+        'prof.html',
+        eleves=eleves,
+        current_classe=classe_active,
+        stats=stats_result,
+        classes=classes,
+        matieres=p.matieres_enseignees()
+    )
 
-    return render_template('prof.html', eleves=eleves, current_classe=classe_active, stats=stats_result)
+
+@app.route('/prof/emploi-du-temps')
+def prof_emploi_du_temps():
+    if 'user' not in session or session['user']['role'] != 'PROF':
+        return redirect(url_for('login'))
+
+    p = recuperer_professeur_connecte()
+    emploi = p.emploi_du_temps_prof(p.id) if emploi_du_temps_disponible(p.db_path) else []
+    return render_template(
+        'prof_emploi_du_temps.html',
+        emploi_par_jour=p.construire_emploi_par_jour(emploi),
+        jours_semaine=JOURS_SEMAINE,
+        prochain=p.prochain_cours(id_prof=p.id),
+        classes=p.classes_enseignees()
+    )
 
 
 @app.route('/prof/gestion/<id_eleve>', methods=['GET', 'POST'])
@@ -484,22 +2401,51 @@ def prof_gestion_notes(id_eleve):
     if 'user' not in session or session['user']['role'] != 'PROF':
         return redirect(url_for('login'))
 
-    p = Professeur(session['user']['id'], session['user']['nom'], session['user']['prenom'])
+    p = recuperer_professeur_connecte()
+    id_classe = p.classe_de_l_eleve(id_eleve)
+    if id_classe is None or not p.enseigne_dans(id_classe):
+        flash("Vous n'avez pas cours avec la classe de cet élève.")
+        return redirect(url_for('prof_dashboard'))
+    matieres = p.matieres_enseignees(id_classe)
+
+    # Une note modifiée ou supprimée doit appartenir à l'élève affiché.
+    if request.method == 'POST' and 'id_note' in request.form:
+        if request.form['id_note'] not in {str(n[0]) for n in p.voir_notes_eleve(id_eleve)}:
+            flash("Cette note n'appartient pas à cet élève.")
+            return redirect(url_for('prof_gestion_notes', id_eleve=id_eleve))
 
     if request.method == 'POST' and 'ajouter' in request.form:
-        p.ajouter_note(id_eleve, request.form['matiere'], float(request.form['note']), float(request.form['coeff']))
-        flash("Note ajoutée.")
+        note, coeff = lire_nombre_formulaire('note'), lire_nombre_formulaire('coeff')
+        if request.form.get('matiere') not in {str(id_m) for id_m, _ in matieres}:
+            flash("Vous n'enseignez pas cette matière dans la classe.")
+        elif not (note_valide(note) and coefficient_valide(coeff)):
+            flash(f"La note doit être entre 0 et {NOTE_MAX} et le coefficient positif, au plus {COEFFICIENT_MAX}.")
+        else:
+            p.ajouter_note(id_eleve, request.form['matiere'], note, coeff)
+            flash("Note ajoutée.")
 
     if request.method == 'POST' and 'modifier' in request.form:
-        p.modifier_note(request.form['id_note'], float(request.form['valeur']), float(request.form['coeff']))
-        flash("Note modifiée.")
+        valeur, coeff = lire_nombre_formulaire('valeur'), lire_nombre_formulaire('coeff')
+        if not (note_valide(valeur) and coefficient_valide(coeff)):
+            flash(f"La note doit être entre 0 et {NOTE_MAX} et le coefficient positif, au plus {COEFFICIENT_MAX}.")
+        else:
+            p.modifier_note(request.form['id_note'], valeur, coeff)
+            flash("Note modifiée.")
 
     if request.method == 'POST' and 'supprimer' in request.form:
         p.supprimer_note(request.form['id_note'])
         flash("Note supprimée.")
 
     notes = p.voir_notes_eleve(id_eleve)
-    return render_template('prof_gestion.html', notes=notes, id_eleve=id_eleve)
+    return render_template('prof_gestion.html', notes=notes, id_eleve=id_eleve, matieres=matieres)
+
+
+def lire_nombre_formulaire(nom):
+    """Nombre saisi dans un champ du formulaire (virgule acceptée) ; NaN s'il est vide ou illisible."""
+    try:
+        return float(request.form.get(nom, '').replace(',', '.'))
+    except ValueError:
+        return math.nan
 
 
 @app.route('/eleve')
@@ -507,14 +2453,17 @@ def eleve_dashboard():
     if 'user' not in session or session['user']['role'] != 'ELEVE':
         return redirect(url_for('login'))
 
-    eleve = Eleve(session['user']['id'], session['user']['nom'], session['user']['prenom'])
+    eleve = recuperer_eleve_connecte()
+    etag = calculer_etag_eleve(eleve)
+    non_modifiee = reponse_non_modifiee(etag)
+    if non_modifiee is not None:
+        return non_modifiee
 
     tri_actif = request.args.get('tri', 'matiere')
     periode_active = request.args.get('periode', 'tout')
     id_matiere_active = request.args.get('matiere', 'toutes')
 
-    notes_detaillees = eleve.voir_mes_notes_detaillees()
-    notes_filtrees = eleve.filtrer_notes(notes_detaillees, id_matiere_active, periode_active)
+    notes_filtrees = eleve.voir_mes_notes_detaillees(id_matiere_active, periode_active)
 
     if tri_actif == 'matiere':
         notes_affichage = eleve.construire_notes_par_matiere(notes_filtrees)
@@ -525,7 +2474,7 @@ def eleve_dashboard():
     id_note_selectionnee = request.args.get('note')
     if id_note_selectionnee:
         for note in notes_filtrees:
-            if str(note['id_note']) == id_note_selectionnee:
+            if str(note.id_note) == id_note_selectionnee:
                 note_selectionnee = note
                 break
 
@@ -535,13 +2484,14 @@ def eleve_dashboard():
     id_classe = eleve.recuperer_id_classe()
     detail_note = eleve.construire_infos_detail_note(note_selectionnee, id_classe)
 
-    matieres_disponibles = eleve.lister_matieres_disponibles(notes_detaillees)
+    matieres_disponibles = eleve.lister_matieres_disponibles()
 
     rang, total, moyenne_generale = eleve.calculer_rang()
 
     return rendre_page_eleve(
         'eleve.html',
         'notes',
+        etag=etag,
         tri_actif=tri_actif,
         periode_active=periode_active,
         id_matiere_active=id_matiere_active,
@@ -559,9 +2509,14 @@ def eleve_download():
     if 'user' not in session or session['user']['role'] != 'ELEVE':
         return redirect(url_for('login'))
 
-    eleve = Eleve(session['user']['id'], session['user']['nom'], session['user']['prenom'])
-    path = eleve.generer_bulletin_txt()
-    return send_file(path, as_attachment=True)
+    eleve = recuperer_eleve_connecte()
+    bulletin = eleve.generer_bulletin_txt()
+    return send_file(
+        io.BytesIO(bulletin.encode('utf-8')),
+        mimetype='text/plain',
+        as_attachment=True,
+        download_name=f"bulletin_{eleve.nom}_{eleve.prenom}.txt"
+    )
 
 
 def verifier_session_eleve():
@@ -571,14 +2526,69 @@ def verifier_session_eleve():
     return session['user'].get('role') == 'ELEVE'
 
 
+def rattacher_contexte(utilisateur, version):
+    """Reprend le contexte gardé en session s'il est à jour, sinon le recharge et le garde."""
+    contexte = session.get('contexte')
+    if contexte is None or contexte.get('id') != utilisateur.id or contexte['version'] != version:
+        contexte = utilisateur.charger_contexte(version)
+        session['contexte'] = contexte
+    utilisateur.contexte = contexte
+    return utilisateur
+
+
 def recuperer_eleve_connecte():
-    """Crée l'objet Eleve à partir de la session."""
-    return Eleve(session['user']['id'], session['user']['nom'], session['user']['prenom'])
+    """Crée l'objet Eleve à partir de la session, avec son contexte rechargé seulement si les données ont changé."""
+    eleve = Eleve(session['user']['id'], session['user']['nom'], session['user']['prenom'])
+    return rattacher_contexte(eleve, eleve.lire_version_pages())
+
+
+def recuperer_professeur_connecte():
+    """Crée l'objet Professeur à partir de la session, avec ses classes rechargées seulement si ses cours ont changé."""
+    p = Professeur(session['user']['id'], session['user']['nom'], session['user']['prenom'])
+    return rattacher_contexte(p, p.lire_version_contexte())
+
+
+def calculer_etag_eleve(eleve):
+    """ETag d'une page élève : version des données, élève connecté, URL demandée et version des gabarits."""
+    version = eleve.contexte['version'] if eleve.contexte is not None else eleve.lire_version_pages()
+    if version is None:
+        return None
+    brut = f"{VERSION_GABARITS}|{eleve.id}|{version}|{request.full_path}"
+    return hashlib.sha1(brut.encode()).hexdigest()[:24]
+
+
+def reponse_non_modifiee(etag):
+    """Réponse 304 si le navigateur a déjà cette version de la page, sinon None."""
+    if etag is None or etag not in request.if_none_match:
+        return None
+    reponse = app.response_class(status=304)
+    reponse.set_etag(etag)
+    reponse.headers['Cache-Control'] = 'private, no-cache'
+    return reponse
+
+
+def rendre_grille_emploi_du_temps(eleve, id_classe):
+    """Grille HTML de l'emploi du temps d'une classe, rendue une fois puis gardée en cache."""
+    def rendre():
+        emploi = eleve.recuperer_emploi_du_temps(id_classe)
+        return render_template(
+            '_grille_emploi_du_temps.html',
+            emploi_par_jour=eleve.construire_emploi_par_jour(emploi),
+            jours_semaine=JOURS_SEMAINE
+        )
 
+    cle = f"{os.path.abspath(eleve.db_path)}|edt_html|{id_classe}|{eleve.lire_version(f'edt:{id_classe}')}"
+    return Markup(CACHE_CLASSES.obtenir(cle, rendre))
 
-def rendre_page_eleve(template, onglet_actif, **contexte):
+
+def rendre_page_eleve(template, onglet_actif, etag=None, **contexte):
     """Ajoute les infos de navigation communes à toutes les pages élève."""
-    return render_template(template, onglet_actif=onglet_actif, **contexte)
+    reponse = make_response(render_template(template, onglet_actif=onglet_actif, **contexte))
+    if etag is not None:
+        # private : la page est propre à l'élève ; no-cache : le navigateur revalide à chaque visite.
+        reponse.set_etag(etag)
+        reponse.headers['Cache-Control'] = 'private, no-cache'
+    return reponse
 
 
 @app.route('/eleve/mes-donnees')
@@ -607,9 +2617,15 @@ def eleve_resultats():
         return redirect(url_for('login'))
 
     eleve = recuperer_eleve_connecte()
+    etag = calculer_etag_eleve(eleve)
+    non_modifiee = reponse_non_modifiee(etag)
+    if non_modifiee is not None:
+        return non_modifiee
+
     resultats = eleve.calculer_resultats_par_matiere()
     rang, total, moyenne = eleve.calculer_rang()
-    return rendre_page_eleve('resultats.html', 'resultats', resultats=resultats, stats={'rang': rang, 'total': total, 'moy': moyenne})
+    return rendre_page_eleve('resultats.html', 'resultats', etag=etag, resultats=resultats,
+                             stats={'rang': rang, 'total': total, 'moy': moyenne})
 
 
 @app.route('/eleve/vie-scolaire')
@@ -641,25 +2657,688 @@ def eleve_emploi_du_temps():
         return redirect(url_for('login'))
 
     eleve = recuperer_eleve_connecte()
-    table_emploi_disponible = eleve.table_emploi_du_temps_disponible()
-    emploi = eleve.recuperer_emploi_du_temps()
+    etag = calculer_etag_eleve(eleve)
+    non_modifiee = reponse_non_modifiee(etag)
+    if non_modifiee is not None:
+        return non_modifiee
 
-    emploi_par_jour = eleve.construire_emploi_par_jour(emploi)
+    grille = rendre_grille_emploi_du_temps(eleve, eleve.recuperer_id_classe())
 
     return rendre_page_eleve(
         'emploi_du_temps.html',
         'emploi_du_temps',
-        emploi_par_jour=emploi_par_jour,
-        table_emploi_disponible=table_emploi_disponible,
-        jours_semaine=JOURS_SEMAINE
+        etag=etag,
+        grille=grille,
+        table_emploi_disponible=eleve.table_emploi_du_temps_disponible()
     )
 
 
+@app.route('/admin/stats')
+def admin_stats():
+    """Compteurs internes (pool de connexions, cache des classes) au format JSON."""
+    if 'user' not in session or session['user']['role'] != 'PROF':
+        return redirect(url_for('login'))
+    return jsonify({
+        'pool': obtenir_pool().statistiques(),
+        'cache': CACHE_CLASSES.statistiques(),
+        'connexions': STATISTIQUES_CONNEXIONS.statistiques(),
+        'cache_connexions': CACHE_CONNEXIONS.statistiques()
+    })
+
+
+def demarrer_mesures():
+    g.mesures = MesuresRequete()
+    g.debut_requete = time.perf_counter()
+
+
+def terminer_mesures(reponse):
+    """Range les mesures de la requête dans les histogrammes et signale les requêtes lentes."""
+    mesures = g.pop('mesures', None)
+    if mesures is None:
+        return reponse
+    duree = time.perf_counter() - g.debut_requete
+    route = request.endpoint or 'inconnue'
+
+    HISTOGRAMMES['requete'].observer(route, duree)
+    HISTOGRAMMES['sql'].observer(route, mesures.duree_sql)
+    HISTOGRAMMES['nb_requetes'].observer(route, len(mesures.instructions))
+    HISTOGRAMMES['lignes'].observer(route, mesures.nb_lignes)
+    HISTOGRAMMES['rendu'].observer(route, mesures.duree_rendu)
+    for _, duree_instruction, _ in mesures.instructions:
+        HISTOGRAMMES['instruction'].observer(route, duree_instruction)
+
+    if duree * 1000 >= SEUIL_REQUETE_LENTE_MS:
+        plus_lentes = sorted(mesures.instructions, key=lambda instruction: instruction[1], reverse=True)[:3]
+        app.logger.warning(
+            "Requête lente %s %s : %.0f ms (%d instructions SQL, %.0f ms SQL, %d lignes, %.0f ms de rendu) ; "
+            "plus lentes : %s",
+            request.method, request.full_path, duree * 1000, len(mesures.instructions),
+            mesures.duree_sql * 1000, mesures.nb_lignes, mesures.duree_rendu * 1000,
+            " | ".join(f"{d * 1000:.1f} ms {' '.join(sql.split())[:120]}" for sql, d, _ in plus_lentes)
+        )
+    return reponse
+
+
+def debut_rendu(expediteur, template, context, **extra):
+    if 'mesures' in g:
+        g.setdefault('debuts_rendu', []).append(time.perf_counter())
+
+
+def fin_rendu(expediteur, template, context, **extra):
+    if 'mesures' in g and g.get('debuts_rendu'):
+        g.mesures.duree_rendu += time.perf_counter() - g.debuts_rendu.pop()
+
+
+if PROFILAGE_ACTIF:
+    app.before_request(demarrer_mesures)
+    app.after_request(terminer_mesures)
+    before_render_template.connect(debut_rendu, app)
+    template_rendered.connect(fin_rendu, app)
+
+
+@app.route('/admin/metrics')
+def admin_metrics():
+    """Histogrammes du profilage par route, au format texte de Prometheus."""
+    if 'user' not in session or session['user']['role'] != 'PROF':
+        return redirect(url_for('login'))
+    lignes = []
+    for histogramme in HISTOGRAMMES.values():
+        lignes.extend(histogramme.exporter())
+    return app.response_class("\n".join(lignes) + "\n", mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/logout')
 def logout():
     session.clear()
     return redirect(url_for('login'))
 
 
+@app.route('/prof/bulletins/<id_classe>')
+def prof_bulletins_classe(id_classe):
+    if 'user' not in session or session['user']['role'] != 'PROF':
+        return redirect(url_for('login'))
+
+    p = recuperer_professeur_connecte()
+    if not p.enseigne_dans(id_classe):
+        flash("Vous n'avez pas cours avec cette classe.")
+        return redirect(url_for('prof_dashboard'))
+    bulletins = p.preparer_bulletins_classe(id_classe)
+    archive = io.BytesIO()
+    ecrire_bulletins(map(rendre_bulletin_eleve, bulletins), archive)
+    archive.seek(0)
+    return send_file(
+        archive,
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=f"bulletins_classe_{id_classe}.zip"
+    )
+
+
+def lire_saisies_csv(fichier):
+    """Lit un CSV « id_eleve;note » (ou séparé par des virgules), avec ou sans en-tête."""
+    contenu = fichier.read().decode('utf-8-sig')
+    separateur = ';' if ';' in contenu.split('\n', 1)[0] else ','
+    saisies = []
+    for ligne in csv.reader(io.StringIO(contenu), delimiter=separateur):
+        if len(ligne) < 2 or not ligne[0].strip():
+            continue
+        if not saisies and ligne[0].strip().lower() in ('id_eleve', 'eleve', 'identifiant'):
+            continue
+        saisies.append((ligne[0], ligne[1]))
+    return saisies
+
+
+@app.route('/prof/saisie/<id_classe>', methods=['GET', 'POST'])
+def prof_saisie_groupee(id_classe):
+    if 'user' not in session or session['user']['role'] != 'PROF':
+        return redirect(url_for('login'))
+
+    p = recuperer_professeur_connecte()
+    if not p.enseigne_dans(id_classe):
+        flash("Vous n'avez pas cours avec cette classe.")
+        return redirect(url_for('prof_dashboard'))
+    eleves = p.lister_eleves_par_classe(id_classe)
+    matieres = p.matieres_enseignees(id_classe)
+
+    resultat = None
+    if request.method == 'POST' and request.form.get('matiere') not in {str(id_m) for id_m, _ in matieres}:
+        resultat = {'ajoutees': 0, 'erreurs': [(0, '', "Vous n'enseignez pas cette matière dans la classe.")]}
+    elif request.method == 'POST':
+        fichier_csv = request.files.get('fichier_csv')
+        if fichier_csv and fichier_csv.filename:
+            saisies = lire_saisies_csv(fichier_csv)
+        else:
+            # Une case laissée vide signifie « pas de note » (élève absent).
+            saisies = []
+            for id_eleve, _, _ in eleves:
+                valeur = request.form.get(f"note_{id_eleve}", '').strip()
+                if valeur:
+                    saisies.append((id_eleve, valeur))
+
+        resultat = p.ajouter_notes_en_lot(
+            id_classe,
+            request.form.get('matiere'),
+            request.form.get('coeff'),
+            request.form.get('date') or datetime.now().strftime("%Y-%m-%d"),
+            saisies
+        )
+
+    return render_template(
+        'prof_saisie.html',
+        eleves=eleves,
+        matieres=matieres,
+        id_classe=id_classe,
+        resultat=resultat,
+        date_du_jour=datetime.now().strftime("%Y-%m-%d")
+    )
+
+
+@app.route('/prof/statistiques/<id_classe>')
+def prof_statistiques_classe(id_classe):
+    """Vue d'ensemble d'une classe : toutes les matières d'un coup, et comparaison avec les autres classes."""
+    if 'user' not in session or session['user']['role'] != 'PROF':
+        return redirect(url_for('login'))
+
+    p = recuperer_professeur_connecte()
+    if not p.enseigne_dans(id_classe):
+        flash("Vous n'avez pas cours avec cette classe.")
+        return redirect(url_for('prof_dashboard'))
+    classes, matieres, moyennes = p.comparer_classes()
+    return render_template(
+        'prof_statistiques.html',
+        id_classe=id_classe,
+        statistiques=p.statistiques_classe(id_classe),
+        tranches=libelles_tranches(),
+        classes=classes,
+        matieres=matieres,
+        moyennes=moyennes
+    )
+
+
+def libelles_tranches():
+    """Libellés des colonnes de l'histogramme ("0-4", "4-8", ... "16-20")."""
+    bornes = (0,) + TRANCHES_HISTOGRAMME + (20,)
+    return [f"{debut}-{fin}" for debut, fin in zip(bornes, bornes[1:])]
+
+
+# -------------------------------------------------------------------------
+# API JSON (v1) : mêmes données que les pages, sans rendu HTML
+# -------------------------------------------------------------------------
+
+LIMITE_API_DEFAUT = 50
+LIMITE_API_MAX = 200
+
+# JSON compact (pas d'espaces ni d'échappement des accents) : réponses plus légères.
+app.json.compact = True
+app.json.ensure_ascii = False
+app.json.sort_keys = False
+
+
+class ErreurApi(Exception):
+    """Erreur renvoyée au client de l'API sous la forme {"erreur": message}."""
+
+    def __init__(self, message, statut=400):
+        super().__init__(message)
+        self.message = message
+        self.statut = statut
+
+
+@app.errorhandler(ErreurApi)
+def repondre_erreur_api(erreur):
+    return jsonify({'erreur': erreur.message}), erreur.statut
+
+
+def verifier_role_api(role):
+    """Vérifie la session pour une route de l'API (401 / 403 en JSON plutôt qu'une redirection)."""
+    if 'user' not in session:
+        raise ErreurApi("Authentification requise.", 401)
+    if session['user'].get('role') != role:
+        raise ErreurApi("Accès refusé.", 403)
+
+
+def lire_champs_demandes(champs_possibles, defaut=None):
+    """Lit ?champs=a,b,c ; sans paramètre, renvoie defaut (tous les champs si None)."""
+    brut = request.args.get('champs')
+    if not brut:
+        return list(defaut if defaut is not None else champs_possibles)
+    champs = [champ for champ in brut.split(',') if champ]
+    inconnus = [champ for champ in champs if champ not in champs_possibles]
+    if inconnus:
+        raise ErreurApi(f"Champ(s) inconnu(s) : {', '.join(inconnus)}.")
+    return champs
+
+
+def lire_limite():
+    """Lit ?limite=N (défaut LIMITE_API_DEFAUT, au plus LIMITE_API_MAX)."""
+    try:
+        limite = int(request.args.get('limite', LIMITE_API_DEFAUT))
+    except ValueError:
+        raise ErreurApi("limite doit être un entier.")
+    return max(1, min(limite, LIMITE_API_MAX))
+
+
+def encoder_curseur(date_iso, id_note):
+    """Curseur opaque désignant la dernière note d'une page."""
+    return base64.urlsafe_b64encode(f"{date_iso}|{id_note}".encode()).decode().rstrip('=')
+
+
+def decoder_curseur(curseur):
+    """Retourne (date_iso, id_note) depuis un curseur, ou None s'il n'y en a pas."""
+    if not curseur:
+        return None
+    try:
+        brut = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4)).decode()
+        date_iso, id_note = brut.split('|')
+        return date_iso, int(id_note)
+    except (ValueError, UnicodeDecodeError):
+        raise ErreurApi("Curseur invalide.")
+
+
+def paginer_notes(lire_page, champs):
+    """Lit une page de notes (une de plus que la limite pour savoir s'il y a une suite)."""
+    limite = lire_limite()
+    notes = lire_page(limite + 1, decoder_curseur(request.args.get('curseur')))
+    suivant = None
+    if len(notes) > limite:
+        notes = notes[:limite]
+        suivant = encoder_curseur(notes[-1]['date_iso'], notes[-1]['id_note'])
+    return jsonify({
+        'notes': [{champ: note[champ] for champ in champs} for note in notes],
+        'curseur_suivant': suivant
+    })
+
+
+def lire_instant():
+    """Instant demandé (?instant=AAAA-MM-JJTHH:MM), maintenant par défaut."""
+    texte = request.args.get('instant')
+    if not texte:
+        return datetime.now()
+    try:
+        return datetime.fromisoformat(texte)
+    except ValueError:
+        raise ErreurApi("Paramètre instant invalide (AAAA-MM-JJTHH:MM attendu).")
+
+
+def lire_date(nom):
+    """Date passée dans ?<nom>=AAAA-MM-JJ, None si absente."""
+    texte = request.args.get(nom)
+    if not texte:
+        return None
+    try:
+        datetime.strptime(texte, "%Y-%m-%d")
+    except ValueError:
+        raise ErreurApi(f"Paramètre {nom} invalide (AAAA-MM-JJ attendu).")
+    return texte
+
+
+@app.route('/api/v1/eleve')
+def api_eleve():
+    """Profil de l'élève connecté ; ?champs= évite de calculer ce qui n'est pas demandé (rang...)."""
+    verifier_role_api('ELEVE')
+    eleve = recuperer_eleve_connecte()
+    calculs = {
+        'profil': eleve.recuperer_infos_personnelles,
+        'resultats': eleve.calculer_resultats_par_matiere,
+        'rang': lambda: dict(zip(('rang', 'total', 'moyenne'), eleve.calculer_rang())),
+        'emploi_du_temps': eleve.recuperer_emploi_du_temps,
+    }
+    return jsonify({champ: calculs[champ]() for champ in lire_champs_demandes(calculs)})
+
+
+@app.route('/api/v1/eleve/notes')
+def api_eleve_notes():
+    """Notes de l'élève connecté, de la plus récente à la plus ancienne, page par page."""
+    verifier_role_api('ELEVE')
+    eleve = recuperer_eleve_connecte()
+    champs = lire_champs_demandes(NoteEleve._fields)
+    id_matiere = request.args.get('matiere', 'toutes')
+    periode = request.args.get('periode', 'tout')
+
+    def lire_page(limite, apres):
+        notes = eleve.voir_mes_notes_detaillees(id_matiere, periode, limite=limite, apres=apres)
+        return [note._asdict() for note in notes]
+
+    return paginer_notes(lire_page, champs)
+
+
+@app.route('/api/v1/eleve/resultats')
+def api_eleve_resultats():
+    verifier_role_api('ELEVE')
+    return jsonify({'resultats': recuperer_eleve_connecte().calculer_resultats_par_matiere()})
+
+
+@app.route('/api/v1/eleve/rang')
+def api_eleve_rang():
+    verifier_role_api('ELEVE')
+    rang, total, moyenne = recuperer_eleve_connecte().calculer_rang()
+    return jsonify({'rang': rang, 'total': total, 'moyenne': moyenne})
+
+
+@app.route('/api/v1/eleve/emploi-du-temps')
+def api_eleve_emploi_du_temps():
+    verifier_role_api('ELEVE')
+    return jsonify({'emploi_du_temps': recuperer_eleve_connecte().recuperer_emploi_du_temps()})
+
+
+@app.route('/api/v1/eleve/evolution')
+def api_eleve_evolution():
+    """Courbes de moyenne de l'élève connecté (générale et par matière)."""
+    verifier_role_api('ELEVE')
+    eleve = recuperer_eleve_connecte()
+    return jsonify(eleve.evolution_eleve(eleve.id))
+
+
+@app.route('/api/v1/eleve/moyennes')
+def api_eleve_moyennes():
+    """Moyennes de l'élève connecté à ?date= (aujourd'hui par défaut)."""
+    verifier_role_api('ELEVE')
+    eleve = recuperer_eleve_connecte()
+    return jsonify(eleve.moyennes_eleve_au(eleve.id, lire_date('date') or datetime.now().strftime("%Y-%m-%d")))
+
+
+@app.route('/api/v1/eleve/prochain-cours')
+def api_eleve_prochain_cours():
+    verifier_role_api('ELEVE')
+    eleve = recuperer_eleve_connecte()
+    return jsonify({'cours': eleve.prochain_cours(lire_instant(), id_classe=eleve.recuperer_id_classe())})
+
+
+@app.route('/api/v1/eleve/cours-de-la-semaine')
+def api_eleve_cours_de_la_semaine():
+    verifier_role_api('ELEVE')
+    eleve = recuperer_eleve_connecte()
+    return jsonify({'cours': eleve.cours_de_la_semaine(lire_instant(), id_classe=eleve.recuperer_id_classe())})
+
+
+@app.route('/api/v1/classes')
+def api_classes():
+    verifier_role_api('PROF')
+    return jsonify({'classes': [id_classe for id_classe, _ in recuperer_professeur_connecte().classes_enseignees()]})
+
+
+@app.route('/api/v1/classes/<id_classe>/eleves')
+def api_eleves_classe(id_classe):
+    """Élèves d'une classe ; rang et moyenne seulement si demandés dans ?champs=."""
+    verifier_role_api('PROF')
+    champs = lire_champs_demandes(('id_eleve', 'nom', 'prenom', 'rang', 'moyenne'), ('id_eleve', 'nom', 'prenom'))
+    p = recuperer_professeur_connecte()
+    if not p.enseigne_dans(id_classe):
+        raise ErreurApi("Vous n'avez pas cours avec cette classe.", 403)
+    classement = {}
+    if 'rang' in champs or 'moyenne' in champs:
+        classement = p.calculer_classement_classe(id_classe)
+
+    eleves = []
+    for id_eleve, nom, prenom in p.lister_eleves_par_classe(id_classe):
+        rang, moyenne = classement.get(id_eleve, (0, 0))
+        eleve = {'id_eleve': id_eleve, 'nom': nom, 'prenom': prenom, 'rang': rang, 'moyenne': round(moyenne, 2)}
+        eleves.append({champ: eleve[champ] for champ in champs})
+    return jsonify({'eleves': eleves})
+
+
+@app.route('/api/v1/classes/<id_classe>/statistiques')
+def api_statistiques_classe(id_classe):
+    verifier_role_api('PROF')
+    p = recuperer_professeur_connecte()
+    if not p.enseigne_dans(id_classe):
+        raise ErreurApi("Vous n'avez pas cours avec cette classe.", 403)
+    return jsonify({'tranches': libelles_tranches(), 'matieres': p.statistiques_classe(id_classe)})
+
+
+@app.route('/api/v1/classes/<id_classe>/evolution')
+def api_evolution_classe(id_classe):
+    """Médiane des moyennes de la classe fin de mois par fin de mois (?matiere=, ?debut=, ?fin=)."""
+    verifier_role_api('PROF')
+    id_matiere = request.args.get('matiere')
+    if id_matiere is not None and not id_matiere.isdigit():
+        raise ErreurApi("Paramètre matiere invalide.")
+    p = recuperer_professeur_connecte()
+    if not p.enseigne_dans(id_classe):
+        raise ErreurApi("Vous n'avez pas cours avec cette classe.", 403)
+    points = p.courbe_mediane_classe(id_classe, int(id_matiere) if id_matiere else None, lire_date('debut'), lire_date('fin'))
+    return jsonify({'points': points})
+
+
+@app.route('/api/v1/recherche/eleves')
+def api_recherche_eleves():
+    """Suggestions pendant la frappe (?q=, ?limite= jusqu'à LIMITE_RECHERCHE)."""
+    verifier_role_api('PROF')
+    limite = min(lire_limite(), LIMITE_RECHERCHE) if 'limite' in request.args else 10
+    p = Professeur(session['user']['id'], '', '')
+    colonnes = ('id_eleve', 'nom', 'prenom', 'id_classe', 'nom_classe')
+    return jsonify({'eleves': [dict(zip(colonnes, ligne)) for ligne in p.chercher_eleve(request.args.get('q', ''), limite)]})
+
+
+@app.route('/api/v1/eleves/<id_eleve>/notes')
+def api_notes_eleve(id_eleve):
+    """Notes d'un élève pour un professeur, page par page."""
+    verifier_role_api('PROF')
+    colonnes = ('id_note', 'nom_matiere', 'valeur', 'coefficient', 'date_note', 'id_matiere', 'date_iso')
+    champs = lire_champs_demandes(colonnes)
+    p = recuperer_professeur_connecte()
+    if not p.enseigne_a_eleve(id_eleve):
+        raise ErreurApi("Vous n'avez pas cours avec la classe de cet élève.", 403)
+
+    def lire_page(limite, apres):
+        return [dict(zip(colonnes, ligne)) for ligne in p.voir_notes_eleve(id_eleve, limite=limite, apres=apres)]
+
+    return paginer_notes(lire_page, champs)
+
+
+@app.route('/api/v1/eleves/<id_eleve>/evolution')
+def api_evolution_eleve(id_eleve):
+    verifier_role_api('PROF')
+    p = recuperer_professeur_connecte()
+    if not p.enseigne_a_eleve(id_eleve):
+        raise ErreurApi("Vous n'avez pas cours avec la classe de cet élève.", 403)
+    return jsonify(p.evolution_eleve(id_eleve))
+
+
+@app.route('/api/v1/prof/prochain-cours')
+def api_prof_prochain_cours():
+    verifier_role_api('PROF')
+    p = Professeur(session['user']['id'], '', '')
+    return jsonify({'cours': p.prochain_cours(lire_instant(), id_prof=p.id)})
+
+
+@app.route('/api/v1/prof/cours-de-la-semaine')
+def api_prof_cours_de_la_semaine():
+    verifier_role_api('PROF')
+    p = Professeur(session['user']['id'], '', '')
+    return jsonify({'cours': p.cours_de_la_semaine(lire_instant(), id_prof=p.id)})
+
+
+@app.route('/api/v1/salles/libres')
+def api_salles_libres():
+    """Salles sans cours à ?instant= (maintenant par défaut)."""
+    verifier_role_api('PROF')
+    p = Professeur(session['user']['id'], '', '')
+    return jsonify({'salles': p.salles_libres(lire_instant())})
+
+
+# -------------------------------------------------------------------------
+# EXPORT DES BULLETINS EN LOT (ligne de commande)
+# -------------------------------------------------------------------------
+
+
+@app.cli.command('exporter-bulletins')
+@click.option('--classe', 'classes', multiple=True, help="Classe à exporter (répétable). Par défaut : toutes.")
+@click.option('--sortie', default='bulletins.zip', help="Fichier produit (défaut: bulletins.zip)")
+@click.option('--format', 'format_sortie', type=click.Choice(['zip', 'txt']), default='zip',
+              help="zip : un fichier par élève ; txt : un seul document")
+@click.option('--processus', default=os.cpu_count() or 1, help="Nombre de processus pour la mise en forme")
+def commande_exporter_bulletins(classes, sortie, format_sortie, processus):
+    """Produit les bulletins d'une ou plusieurs classes en une seule passe."""
+    verifier_schema(app.config['CHEMIN_DB'])
+    debut = time.perf_counter()
+    exporteur = Professeur(None, 'Export', 'Bulletins')
+    ids_classes = list(classes) or exporteur.lister_classes()
+
+    bulletins = []
+    for id_classe in ids_classes:
+        bulletins.extend(exporteur.preparer_bulletins_classe(id_classe))
+    fin_requetes = time.perf_counter()
+
+    if processus > 1 and len(bulletins) > 1:
+        with ProcessPoolExecutor(max_workers=processus) as executeur:
+            taille_lot = max(1, len(bulletins) // (processus * 4))
+            rendus = list(executeur.map(rendre_bulletin_eleve, bulletins, chunksize=taille_lot))
+    else:
+        rendus = [rendre_bulletin_eleve(bulletin) for bulletin in bulletins]
+    fin_rendu = time.perf_counter()
+
+    ecrire_bulletins(rendus, sortie, format_sortie)
+    fin = time.perf_counter()
+
+    duree = fin - debut
+    print(f"{len(rendus)} bulletins ({len(ids_classes)} classes) écrits dans {sortie}")
+    print(f"- données     : {fin_requetes - debut:.3f} s")
+    print(f"- mise en forme ({processus} processus) : {fin_rendu - fin_requetes:.3f} s")
+    print(f"- écriture    : {fin - fin_rendu:.3f} s")
+    print(f"Débit : {len(rendus) / duree if duree else 0:.0f} bulletins/s")
+
+
+# -------------------------------------------------------------------------
+# VERIFICATION DES PLANS DE REQUETES (EXPLAIN QUERY PLAN)
+# -------------------------------------------------------------------------
+
+# Tables de référence minuscules : les parcourir en entier ne coûte rien.
+TABLES_SANS_INDEX_ACCEPTEES = {'Matieres', 'Classes', 'schema_version'}
+
+# Requêtes envoyées en plus des pages GET sans paramètre pour couvrir les
+# recherches, les filtres et les écritures : (rôle, méthode, url, formulaire).
+REQUETES_HTTP_A_VERIFIER = [
+    ('PROF', 'GET', '/prof?search=ar', {}),
+    ('PROF', 'GET', '/api/v1/recherche/eleves?q=mar', {}),
+    ('ELEVE', 'GET', '/eleve?tri=chrono&periode=s1&matiere=1', {}),
+    ('PROF', 'POST', '/prof', {'calculer_stats': '1', 'stat_classe': '{id_classe}', 'stat_matiere': '1'}),
+    ('PROF', 'POST', '/prof/gestion/{id_eleve}', {'ajouter': '1', 'matiere': '1', 'note': '12', 'coeff': '1'}),
+    ('PROF', 'POST', '/prof/gestion/{id_eleve}', {'modifier': '1', 'id_note': '{id_note}', 'valeur': '13', 'coeff': '2'}),
+    ('PROF', 'POST', '/prof/gestion/{id_eleve}', {'supprimer': '1', 'id_note': '{id_note}'}),
+    ('PROF', 'POST', '/prof/saisie/{id_classe}', {'matiere': '1', 'coeff': '1', 'note_{id_eleve}': '14'}),
+    ('ELEVE', 'GET', '/api/v1/eleve/notes?limite=2&curseur={curseur}', {}),
+    ('PROF', 'GET', '/api/v1/classes/{id_classe}/eleves?champs=id_eleve,rang', {}),
+    ('PROF', 'GET', '/api/v1/eleves/{id_eleve}/notes?limite=2&curseur={curseur}', {}),
+    ('ELEVE', 'GET', '/api/v1/eleve/prochain-cours?instant=2025-01-10T19:00', {}),
+    ('PROF', 'GET', '/api/v1/prof/prochain-cours?instant=2025-01-10T19:00', {}),
+    ('PROF', 'GET', '/api/v1/salles/libres?instant=2025-01-06T10:30', {}),
+    ('ELEVE', 'GET', '/api/v1/eleve/moyennes?date=2025-12-31', {}),
+    ('PROF', 'GET', '/api/v1/classes/{id_classe}/evolution?matiere=1', {}),
+]
+
+
+def collecter_requetes_des_routes(chemin_db):
+    """Visite toutes les pages comme un élève puis un professeur et note chaque requête SQL."""
+    requetes = []
+
+    pool = obtenir_pool(chemin_db)
+    ancien_chemin = app.config['CHEMIN_DB']
+    app.config['CHEMIN_DB'] = chemin_db
+    try:
+        with pool.connexion() as conn:
+            id_eleve, id_classe = conn.execute("SELECT id_eleve, id_classe FROM Eleves LIMIT 1").fetchone()
+            id_prof, nom_prof, prenom_prof = conn.execute("SELECT id_prof, nom, prenom FROM Professeurs LIMIT 1").fetchone()
+            id_note = conn.execute("SELECT MIN(id_note) FROM Notes WHERE id_eleve = ?", (id_eleve,)).fetchone()[0]
+            nom_eleve, prenom_eleve = conn.execute("SELECT nom, prenom FROM Eleves WHERE id_eleve = ?", (id_eleve,)).fetchone()
+            date_iso = conn.execute("SELECT date_iso FROM Notes WHERE id_note = ?", (id_note,)).fetchone()[0]
+        valeurs = {'id_eleve': id_eleve, 'id_classe': id_classe, 'id_note': id_note,
+                   'curseur': encoder_curseur(date_iso, id_note)}
+        utilisateurs = {
+            'ELEVE': {'id': id_eleve, 'nom': nom_eleve, 'prenom': prenom_eleve, 'role': 'ELEVE'},
+            'PROF': {'id': id_prof, 'nom': nom_prof, 'prenom': prenom_prof, 'role': 'PROF'},
+        }
+
+        # Les connexions du pool transmettent désormais leurs requêtes à la liste.
+        pool.tracer(requetes.append)
+
+        client = app.test_client()
+        client.post('/login', data={'user_id': id_eleve, 'mdp': '-'})
+
+        for role, utilisateur in utilisateurs.items():
+            with client.session_transaction() as sess:
+                sess['user'] = utilisateur
+            for regle in app.url_map.iter_rules():
+                if 'GET' not in regle.methods or regle.endpoint in ('static', 'logout'):
+                    continue
+                if not set(regle.arguments) <= set(valeurs):
+                    continue
+                client.get(regle.rule.replace('<', '{').replace('>', '}').format(**valeurs))
+
+        for role, methode, url, formulaire in REQUETES_HTTP_A_VERIFIER:
+            with client.session_transaction() as sess:
+                sess['user'] = utilisateurs[role]
+            donnees = {cle.format(**valeurs): valeur.format(**valeurs) for cle, valeur in formulaire.items()}
+            client.open(url.format(**valeurs), method=methode, data=donnees)
+    finally:
+        app.config['CHEMIN_DB'] = ancien_chemin
+        pool.tracer(None)
+
+    return requetes
+
+
+def verifier_plans_requetes(chemin_db):
+    """Retourne [(requete, lignes_du_plan, parcours_complets)] pour chaque requête des routes."""
+    uniques = []
+    for sql in collecter_requetes_des_routes(chemin_db):
+        sql = sql.strip()
+        premier_mot = sql.split(None, 1)[0].upper() if sql else ''
+        if premier_mot not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH') or 'sqlite_master' in sql:
+            continue
+        # Requêtes internes de FTS5 sur ses propres tables ('main'.'RechercheEleves_data'...).
+        if "'main'." in sql:
+            continue
+        if sql not in uniques:
+            uniques.append(sql)
+
+    rapport = []
+    with obtenir_pool(chemin_db).connexion() as conn:
+        for sql in uniques:
+            plan = [ligne[3] for ligne in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            # Relire un résultat intermédiaire (sous-requête, table WITH) n'est pas parcourir une table.
+            intermediaires = set(re.findall(r"(?:WITH(?:\s+RECURSIVE)?|,)\s*(\w+)\s*(?:\([^)]*\))?\s+AS\s*\(", sql))
+            parcours = []
+            for detail in plan:
+                if not detail.startswith('SCAN '):
+                    continue
+                if detail.startswith('SCAN (subquery') or detail.split()[1] in intermediaires:
+                    continue
+                # Lignes écrites dans la requête (VALUES) : aucune table derrière.
+                if detail.endswith(' CONSTANT ROWS'):
+                    continue
+                # Table FTS5 interrogée avec MATCH : c'est son index plein texte qui répond.
+                if ' VIRTUAL TABLE INDEX ' in detail and ':M' in detail:
+                    continue
+                if detail.split()[1] in TABLES_SANS_INDEX_ACCEPTEES:
+                    continue
+                parcours.append(detail)
+            rapport.append((sql, plan, parcours))
+    return rapport
+
+
+@app.cli.command('verifier-plans')
+@click.option('--base', default=CHEMIN_DB, help="Base à copier pour le test (défaut: pronote.db)")
+def commande_verifier_plans(base):
+    """Affiche EXPLAIN QUERY PLAN de chaque requête des routes et signale les parcours complets."""
+    dossier = tempfile.mkdtemp()
+    copie = os.path.join(dossier, 'verification.db')
+    with sqlite3.connect(base) as source, sqlite3.connect(copie) as destination:
+        source.backup(destination)
+    appliquer_migrations(copie)
+
+    rapport = verifier_plans_requetes(copie)
+    nb_problemes = 0
+    for sql, plan, parcours in rapport:
+        statut = 'PARCOURS COMPLET' if parcours else 'OK'
+        nb_problemes += bool(parcours)
+        print(f"[{statut}] {' '.join(sql.split())[:150]}")
+        for detail in plan:
+            print(f"    {detail}")
+
+    shutil.rmtree(dossier, ignore_errors=True)
+    print(f"\n{len(rapport)} requêtes analysées, {nb_problemes} avec un parcours complet de table.")
+    if nb_problemes:
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Banc de mesure des pages les plus visitées (élève et professeur).
+
+Pour chaque taille de base demandée, le script:
+- génère la base avec generer_db.py (même graine = mêmes données d'un run à l'autre)
+- appelle les routes avec le client de test de Flask (et, avec --gunicorn N,
+  à travers un vrai serveur gunicorn local à N workers)
+- affiche p50 / p95 / p99, le débit et le nombre de requêtes SQL par page
+- enregistre tout en JSON pour comparer deux commits:
+    python benchmark.py --tailles petite moyenne
+    python benchmark.py --comparer benchmarks/ancien.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookiejar import CookieJar
+
+import generer_db
+
+DOSSIER_PROJET = os.path.dirname(os.path.abspath(__file__))
+
+# nom: (classes, élèves par classe, notes par élève)
+TAILLES = {
+    'petite': (5, 30, 20),
+    'moyenne': (10, 30, 50),
+    'grande': (40, 35, 120),
+}
+
+# (route, rôle, URL) : {id_eleve} et {id_classe} changent à chaque appel.
+ROUTES = [
+    ('eleve_dashboard', 'ELEVE', '/eleve'),
+    ('eleve_resultats', 'ELEVE', '/eleve/resultats'),
+    ('eleve_download', 'ELEVE', '/eleve/download'),
+    ('prof_dashboard', 'PROF', '/prof?classe={id_classe}'),
+    ('prof_gestion_notes', 'PROF', '/prof/gestion/{id_eleve}'),
+]
+
+NB_ELEVES_CONNECTES = 20
+PROF_BENCH = ('p1_1', 'mdp_p1_1')
+
+
+def percentile(valeurs_triees, pourcentage):
+    """Percentile par rang le plus proche sur une liste déjà triée."""
+    if not valeurs_triees:
+        return 0
+    rang = max(0, min(len(valeurs_triees) - 1, round(pourcentage / 100 * len(valeurs_triees) + 0.5) - 1))
+    return valeurs_triees[rang]
+
+
+def resumer(route, mode, taille, durees, duree_totale, requetes_sql=None):
+    """Statistiques d'une route (durées en secondes en entrée, millisecondes en sortie)."""
+    durees = sorted(durees)
+    return {
+        'taille': taille,
+        'mode': mode,
+        'route': route,
+        'requetes': len(durees),
+        'p50_ms': round(percentile(durees, 50) * 1000, 3),
+        'p95_ms': round(percentile(durees, 95) * 1000, 3),
+        'p99_ms': round(percentile(durees, 99) * 1000, 3),
+        'debit_rps': round(len(durees) / duree_totale, 1) if duree_totale else 0,
+        'requetes_sql': requetes_sql,
+    }
+
+
+def lire_identifiants(chemin_db):
+    """Élèves connectés pendant la mesure (répartis sur toutes les classes), classes du professeur mesuré et élèves de ces classes."""
+    conn = sqlite3.connect(chemin_db)
+    eleves = [ligne[0] for ligne in conn.execute("SELECT id_eleve FROM Eleves ORDER BY id_classe, rowid")]
+    # Le professeur ne voit que les classes où il a cours.
+    classes = [ligne[0] for ligne in conn.execute(
+        "SELECT DISTINCT id_classe FROM EmploiDuTemps WHERE id_prof = ? ORDER BY id_classe", (PROF_BENCH[0],)
+    )]
+    eleves_prof = [ligne[0] for ligne in conn.execute(
+        "SELECT id_eleve FROM Eleves WHERE id_classe IN (SELECT id_classe FROM EmploiDuTemps WHERE id_prof = ?) "
+        "ORDER BY id_classe, rowid", (PROF_BENCH[0],)
+    )]
+    conn.close()
+    pas = max(1, len(eleves) // NB_ELEVES_CONNECTES)
+    pas_prof = max(1, len(eleves_prof) // NB_ELEVES_CONNECTES)
+    return eleves[::pas][:NB_ELEVES_CONNECTES], classes, eleves_prof[::pas_prof][:NB_ELEVES_CONNECTES]
+
+
+def preparer_base(dossier, taille, seed):
+    """Génère la base d'une taille (le chargement lui-même n'est pas mesuré ici)."""
+    nb_classes, eleves_par_classe, notes_par_eleve = TAILLES[taille]
+    chemin = os.path.join(dossier, f"bench_{taille}.db")
+    generer_db.generer_base(chemin, seed, nb_classes, eleves_par_classe, notes_par_eleve)
+    return chemin
+
+
+# ---------------------------------------------------------------------
+# MESURE AVEC LE CLIENT DE TEST FLASK (un seul processus)
+# ---------------------------------------------------------------------
+
+def mesurer_client_test(appli, chemin_db, taille, nb_requetes, echauffement):
+    """Appelle chaque route en séquence et compte les requêtes SQL de chaque appel."""
+    compteur = [0]
+
+    def compter(sql):
+        # Les instructions exécutées par un déclencheur arrivent précédées de "--".
+        if not sql.startswith('--'):
+            compteur[0] += 1
+
+    appli.app.config['CHEMIN_DB'] = chemin_db
+    appli.obtenir_pool(chemin_db).tracer(compter)
+    appli.appliquer_migrations(chemin_db)
+    eleves, classes, eleves_prof = lire_identifiants(chemin_db)
+
+    clients_eleves = []
+    for id_eleve in eleves:
+        client = appli.app.test_client()
+        client.post('/login', data={'user_id': id_eleve, 'mdp': f"pass{id_eleve}"})
+        clients_eleves.append(client)
+    client_prof = appli.app.test_client()
+    client_prof.post('/login', data={'user_id': PROF_BENCH[0], 'mdp': PROF_BENCH[1]})
+
+    resultats = []
+    for route, role, modele in ROUTES:
+        # Le professeur ne consulte que les élèves de ses classes.
+        ids_eleves = eleves if role == 'ELEVE' else eleves_prof
+        durees = []
+        debut_route = None
+        for i in range(echauffement + nb_requetes):
+            if i == echauffement:
+                debut_route = time.perf_counter()
+                compteur[0] = 0
+            client = clients_eleves[i % len(clients_eleves)] if role == 'ELEVE' else client_prof
+            url = modele.format(id_eleve=ids_eleves[i % len(ids_eleves)], id_classe=classes[i % len(classes)])
+
+            debut = time.perf_counter()
+            reponse = client.get(url)
+            reponse.get_data()
+            durees.append(time.perf_counter() - debut)
+            if reponse.status_code != 200:
+                raise RuntimeError(f"{url} a répondu {reponse.status_code}")
+        nb_sql = compteur[0]
+        duree_totale = time.perf_counter() - debut_route
+        resultats.append(resumer(route, 'client_test', taille, durees[echauffement:], duree_totale,
+                                 round(nb_sql / nb_requetes, 2)))
+    return resultats
+
+
+# ---------------------------------------------------------------------
+# MESURE A TRAVERS GUNICORN (plusieurs workers, clients en parallèle)
+# ---------------------------------------------------------------------
+
+def port_libre():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def demarrer_gunicorn(chemin_db, nb_workers):
+    """Lance gunicorn sur un port libre et attend qu'il réponde."""
+    port = port_libre()
+    env = dict(os.environ, NOOB_NOTE_DB=chemin_db,
+               NOOB_NOTE_SESSIONS_FICHIER=os.path.join(os.path.dirname(chemin_db), 'sessions.db'))
+    processus = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(nb_workers), '-b', f"127.0.0.1:{port}", '--log-level', 'warning',
+         'app:app'],
+        cwd=DOSSIER_PROJET, env=env
+    )
+    adresse = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{adresse}/login", timeout=1).read()
+            return processus, adresse
+        except OSError:
+            time.sleep(0.1)
+    processus.terminate()
+    raise RuntimeError("gunicorn n'a pas démarré")
+
+
+def ouvrir_session(adresse, identifiant, mot_de_passe):
+    """Client HTTP avec ses propres cookies, déjà connecté."""
+    navigateur = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+    donnees = urllib.parse.urlencode({'user_id': identifiant, 'mdp': mot_de_passe}).encode()
+    navigateur.open(f"{adresse}/login", donnees).read()
+    return navigateur
+
+
+def mesurer_gunicorn(chemin_db, taille, nb_requetes, echauffement, nb_workers, concurrence):
+    """Envoie les requêtes de chaque route depuis `concurrence` clients en parallèle."""
+    eleves, classes, eleves_prof = lire_identifiants(chemin_db)
+    processus, adresse = demarrer_gunicorn(chemin_db, nb_workers)
+    try:
+        sessions_eleves = [ouvrir_session(adresse, id_eleve, f"pass{id_eleve}") for id_eleve in eleves]
+        sessions_profs = [ouvrir_session(adresse, *PROF_BENCH) for _ in range(concurrence)]
+
+        resultats = []
+        for route, role, modele in ROUTES:
+            ids_eleves = eleves if role == 'ELEVE' else eleves_prof
+
+            def appeler(i):
+                navigateur = sessions_eleves[i % len(sessions_eleves)] if role == 'ELEVE' else sessions_profs[i % concurrence]
+                url = modele.format(id_eleve=ids_eleves[i % len(ids_eleves)], id_classe=classes[i % len(classes)])
+                debut = time.perf_counter()
+                navigateur.open(f"{adresse}{url}").read()
+                return time.perf_counter() - debut
+
+            with ThreadPoolExecutor(max_workers=concurrence) as executeur:
+                list(executeur.map(appeler, range(echauffement)))
+                debut_route = time.perf_counter()
+                durees = list(executeur.map(appeler, range(nb_requetes)))
+                duree_totale = time.perf_counter() - debut_route
+            resultats.append(resumer(route, f"gunicorn_{nb_workers}w_{concurrence}c", taille, durees, duree_totale))
+        return resultats
+    finally:
+        processus.terminate()
+        processus.wait()
+
+
+# ---------------------------------------------------------------------
+# AFFICHAGE, ENREGISTREMENT ET COMPARAISON
+# ---------------------------------------------------------------------
+
+def afficher_resultats(resultats):
+    print(f"\n{'taille':<8} {'mode':<22} {'route':<20} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'SQL/req':>8}")
+    for r in resultats:
+        sql = '-' if r['requetes_sql'] is None else r['requetes_sql']
+        print(f"{r['taille']:<8} {r['mode']:<22} {r['route']:<20} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['p99_ms']:>8} {r['debit_rps']:>8} {sql:>8}")
+
+
+def lire_commit():
+    """Commit courant (pour savoir quel code a produit les chiffres), None hors d'un dépôt git."""
+    try:
+        sortie = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DOSSIER_PROJET,
+                                capture_output=True, text=True, check=True)
+        return sortie.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparer(ancien, nouveau):
+    """Écart de p50 / p95 entre deux runs, route par route."""
+    anciens = {(r['taille'], r['mode'], r['route']): r for r in ancien['resultats']}
+    print(f"\nComparaison avec {ancien.get('commit')} ({ancien.get('date')}):")
+    for r in nouveau['resultats']:
+        avant = anciens.get((r['taille'], r['mode'], r['route']))
+        if avant is None:
+            continue
+        ecarts = []
+        for mesure in ('p50_ms', 'p95_ms'):
+            if avant[mesure]:
+                ecarts.append(f"{mesure} {avant[mesure]} -> {r[mesure]} ({(r[mesure] / avant[mesure] - 1) * 100:+.0f} %)")
+        print(f"- {r['taille']} {r['mode']} {r['route']}: " + ", ".join(ecarts))
+
+
+def construire_arguments():
+    """Lit les arguments de ligne de commande."""
+    parser = argparse.ArgumentParser(description="Mesurer les pages élève et professeur sur des bases générées.")
+    parser.add_argument("--tailles", nargs='+', choices=sorted(TAILLES), default=['petite', 'moyenne'],
+                        help="Tailles de base à mesurer (défaut: petite moyenne)")
+    parser.add_argument("--requetes", type=int, default=200, help="Requêtes mesurées par route (défaut: 200)")
+    parser.add_argument("--echauffement", type=int, default=20, help="Requêtes non mesurées avant chaque route")
+    parser.add_argument("--seed", type=int, default=2026, help="Graine des bases générées")
+    parser.add_argument("--gunicorn", type=int, default=0, metavar="N",
+                        help="Mesurer aussi à travers gunicorn avec N workers (défaut: non)")
+    parser.add_argument("--concurrence", type=int, default=8, help="Clients simultanés avec --gunicorn (défaut: 8)")
+    parser.add_argument("--sortie", help="Fichier JSON des résultats (défaut: benchmarks/<commit>.json)")
+    parser.add_argument("--comparer", help="Fichier JSON d'un run précédent à comparer")
+    return parser.parse_args()
+
+
+def main():
+    args = construire_arguments()
+    # Bases générées et fichiers annexes : supprimés à la fin, même après une erreur.
+    with tempfile.TemporaryDirectory(prefix="noob_note_bench_") as dossier:
+        bases = {taille: preparer_base(dossier, taille, args.seed) for taille in args.tailles}
+
+        # L'application lit ses chemins à l'import : on les fait pointer dans le dossier
+        # temporaire, chaque base mesurée a ensuite son propre pool (et donc son compteur de requêtes).
+        os.environ['NOOB_NOTE_DB'] = os.path.join(dossier, 'vide.db')
+        os.environ['NOOB_NOTE_SESSIONS_FICHIER'] = os.path.join(dossier, 'sessions.db')
+        sys.path.insert(0, DOSSIER_PROJET)
+        import app as appli
+
+        resultats = []
+        for taille, chemin_db in bases.items():
+            print(f"\n== Base {taille} ({chemin_db})")
+            resultats.extend(mesurer_client_test(appli, chemin_db, taille, args.requetes, args.echauffement))
+            if args.gunicorn:
+                resultats.extend(mesurer_gunicorn(chemin_db, taille, args.requetes, args.echauffement,
+                                                  args.gunicorn, args.concurrence))
+    afficher_resultats(resultats)
+
+    commit = lire_commit()
+    run = {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'parametres': {'tailles': {t: TAILLES[t] for t in args.tailles}, 'requetes': args.requetes,
+                       'echauffement': args.echauffement, 'seed': args.seed,
+                       'gunicorn': args.gunicorn, 'concurrence': args.concurrence},
+        'resultats': resultats,
+    }
+    sortie = args.sortie or os.path.join(DOSSIER_PROJET, 'benchmarks', f"{commit or 'run'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(sortie)), exist_ok=True)
+    with open(sortie, 'w', encoding='utf-8') as fichier:
+        json.dump(run, fichier, indent=2, ensure_ascii=False)
+    print(f"\nRésultats enregistrés: {sortie}")
+
+    if args.comparer:
+        with open(args.comparer, encoding='utf-8') as fichier:
+            comparer(json.load(fichier), run)
+
+
+if __name__ == "__main__":
+    main()
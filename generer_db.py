@@ -4,18 +4,24 @@
 """
 Script de génération d'une base PRONOTE de démonstration.
 
-Objectif:
+Objectif (valeurs par défaut, modifiables en ligne de commande):
 - 10 classes
 - 30 élèves par classe
 - 50 notes par élève réparties dans l'année
 - emploi du temps du lundi au vendredi de 08h à 18h
 - un professeur par paire de classes pour chaque matière
+
+Pour les tests de charge, on peut générer des bases bien plus grosses:
+    python generer_db.py --classes 500 --eleves-par-classe 35 --notes-par-eleve 120
+Les insertions se font par lots (executemany), sans journal pendant le
+chargement, et les index ne sont créés qu'une fois les données en place.
 """
 
 import argparse
 import os
 import random
 import sqlite3
+import time
 from datetime import datetime, timedelta
 
 NOMS = [
@@ -57,6 +63,27 @@ MATIERES = [
 
 JOURS_SEMAINE = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi"]
 
+# Mêmes index que les migrations de app.py : créés après le chargement des
+# données, c'est beaucoup plus rapide que de les tenir à jour ligne par ligne.
+INDEX_APRES_CHARGEMENT = [
+    "CREATE INDEX IF NOT EXISTS idx_notes_eleve_matiere ON Notes (id_eleve, id_matiere, valeur, coefficient)",
+    "CREATE INDEX IF NOT EXISTS idx_notes_eleve_date ON Notes (id_eleve, date_iso)",
+    "CREATE INDEX IF NOT EXISTS idx_eleves_classe ON Eleves (id_classe, nom)",
+    "CREATE INDEX IF NOT EXISTS idx_edt_classe_creneau ON EmploiDuTemps (id_classe, jour_num, minute_debut, minute_fin)",
+    "CREATE INDEX IF NOT EXISTS idx_edt_prof_creneau ON EmploiDuTemps (id_prof, jour_num, minute_debut, minute_fin)",
+    "CREATE INDEX IF NOT EXISTS idx_edt_salle_creneau ON EmploiDuTemps (salle, jour_num, minute_debut, minute_fin)",
+]
+
+# Réglages du chargement : aucune écriture de journal, pas d'attente du disque.
+# Si le script s'arrête en cours de route, la base est simplement à régénérer.
+PRAGMAS_CHARGEMENT = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -200000",
+]
+
 
 # ---------------------------------------------------------------------
 # OUTILS SIMPLES
@@ -74,6 +101,14 @@ def format_date_fr(date_obj):
     return date_obj.strftime("%d/%m/%Y")
 
 
+def liste_matieres(nb_matieres):
+    """Retourne les nb_matieres premières matières, complétées par des options numérotées."""
+    matieres = list(MATIERES[:nb_matieres])
+    for id_matiere in range(len(matieres) + 1, nb_matieres + 1):
+        matieres.append((id_matiere, f"Option {id_matiere}"))
+    return matieres
+
+
 # ---------------------------------------------------------------------
 # CREATION DE LA BASE
 # ---------------------------------------------------------------------
@@ -123,6 +158,7 @@ def creer_tables(cur):
             valeur REAL,
             coefficient REAL,
             date_note TEXT,
+            date_iso TEXT,
             id_eleve TEXT,
             id_matiere INTEGER,
             FOREIGN KEY(id_eleve) REFERENCES Eleves(id_eleve),
@@ -142,6 +178,13 @@ def creer_tables(cur):
             id_matiere INTEGER,
             id_prof TEXT,
             salle TEXT,
+            jour_num INTEGER GENERATED ALWAYS AS (CASE jour_semaine
+                WHEN 'Lundi' THEN 1 WHEN 'Mardi' THEN 2 WHEN 'Mercredi' THEN 3 WHEN 'Jeudi' THEN 4
+                WHEN 'Vendredi' THEN 5 WHEN 'Samedi' THEN 6 WHEN 'Dimanche' THEN 7 END) VIRTUAL,
+            minute_debut INTEGER GENERATED ALWAYS AS (
+                CAST(substr(heure_debut, 1, 2) AS INTEGER) * 60 + CAST(substr(heure_debut, 4, 2) AS INTEGER)) VIRTUAL,
+            minute_fin INTEGER GENERATED ALWAYS AS (
+                CAST(substr(heure_fin, 1, 2) AS INTEGER) * 60 + CAST(substr(heure_fin, 4, 2) AS INTEGER)) VIRTUAL,
             FOREIGN KEY(id_classe) REFERENCES Classes(id_classe),
             FOREIGN KEY(id_matiere) REFERENCES Matieres(id_matiere),
             FOREIGN KEY(id_prof) REFERENCES Professeurs(id_prof)
@@ -151,24 +194,21 @@ def creer_tables(cur):
 
 
 def inserer_classes(cur, nb_classes):
-    """Insère les classes C1 à C10."""
-    for id_classe in range(1, nb_classes + 1):
-        cur.execute(
-            "INSERT INTO Classes (id_classe, nom_classe) VALUES (?, ?)",
-            (id_classe, f"Classe {id_classe}")
-        )
+    """Insère les classes 1 à nb_classes."""
+    cur.executemany(
+        "INSERT INTO Classes (id_classe, nom_classe) VALUES (?, ?)",
+        ((id_classe, f"Classe {id_classe}") for id_classe in range(1, nb_classes + 1))
+    )
+    return nb_classes
 
 
-def inserer_matieres(cur):
+def inserer_matieres(cur, matieres):
     """Insère les matières de base."""
-    for id_matiere, nom in MATIERES:
-        cur.execute(
-            "INSERT INTO Matieres (id_matiere, nom_matiere) VALUES (?, ?)",
-            (id_matiere, nom)
-        )
+    cur.executemany("INSERT INTO Matieres (id_matiere, nom_matiere) VALUES (?, ?)", matieres)
+    return len(matieres)
 
 
-def creer_profs_par_matiere_et_classes(cur, nb_classes):
+def creer_profs_par_matiere_et_classes(cur, nb_classes, matieres):
     """
     Crée les profs et la correspondance (classe, matière) -> professeur.
 
@@ -176,8 +216,9 @@ def creer_profs_par_matiere_et_classes(cur, nb_classes):
     Donc pour 10 classes et 6 matières: 5 profs par matière.
     """
     mapping = {}
+    profs = []
 
-    for id_matiere, nom_matiere in MATIERES:
+    for id_matiere, nom_matiere in matieres:
         groupe = 1
         for classe_a in range(1, nb_classes + 1, 2):
             classe_b = classe_a + 1
@@ -185,11 +226,7 @@ def creer_profs_par_matiere_et_classes(cur, nb_classes):
             nom_prof = random.choice(NOMS)
             prenom_prof = random.choice(PRENOMS)
             mot_de_passe = f"mdp_{id_prof}"
-
-            cur.execute(
-                "INSERT INTO Professeurs (id_prof, nom, prenom, mot_de_passe) VALUES (?, ?, ?, ?)",
-                (id_prof, nom_prof, prenom_prof, mot_de_passe)
-            )
+            profs.append((id_prof, nom_prof, prenom_prof, mot_de_passe))
 
             mapping[(classe_a, id_matiere)] = id_prof
             if classe_b <= nb_classes:
@@ -197,17 +234,16 @@ def creer_profs_par_matiere_et_classes(cur, nb_classes):
 
             groupe += 1
 
-    return mapping
+    cur.executemany("INSERT INTO Professeurs (id_prof, nom, prenom, mot_de_passe) VALUES (?, ?, ?, ?)", profs)
+    return mapping, len(profs)
 
 
-def inserer_eleves(cur, nb_classes, eleves_par_classe):
-    """Insère les élèves avec identifiant unique et mot de passe simple."""
+def generer_eleves(nb_classes, eleves_par_classe, ids_eleves):
+    """Produit les lignes Eleves une par une (et note chaque identifiant créé)."""
     date_min = datetime(2007, 1, 1)
     date_max = datetime(2010, 12, 31)
 
     compteur = 1
-    ids_eleves = []
-
     for id_classe in range(1, nb_classes + 1):
         for _ in range(eleves_par_classe):
             id_eleve = str(compteur)
@@ -216,67 +252,106 @@ def inserer_eleves(cur, nb_classes, eleves_par_classe):
             naissance = format_date_fr(date_aleatoire(date_min, date_max))
             mot_de_passe = f"pass{id_eleve}"
 
-            cur.execute(
-                """
-                INSERT INTO Eleves (id_eleve, nom, prenom, date_naissance, mot_de_passe, id_classe)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (id_eleve, nom, prenom, naissance, mot_de_passe, id_classe)
-            )
-
             ids_eleves.append(id_eleve)
             compteur += 1
+            yield id_eleve, nom, prenom, naissance, mot_de_passe, id_classe
+
 
+def inserer_eleves(cur, nb_classes, eleves_par_classe):
+    """Insère les élèves avec identifiant unique et mot de passe simple."""
+    ids_eleves = []
+    cur.executemany(
+        """
+        INSERT INTO Eleves (id_eleve, nom, prenom, date_naissance, mot_de_passe, id_classe)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        generer_eleves(nb_classes, eleves_par_classe, ids_eleves)
+    )
     return ids_eleves
 
 
-def inserer_notes(cur, ids_eleves, nb_notes_par_eleve):
-    """Insère des notes aléatoires sur l'année scolaire."""
+def generer_notes(ids_eleves, nb_notes_par_eleve, nb_matieres):
+    """Produit les lignes Notes une par une, sans jamais les garder toutes en mémoire."""
     debut_annee = datetime(2025, 9, 1)
     fin_annee = datetime(2026, 6, 30)
 
+    # Les dates possibles sont formatées une seule fois, pas à chaque note.
+    dates = []
+    jour = debut_annee
+    while jour <= fin_annee:
+        dates.append((format_date_fr(jour), jour.strftime("%Y-%m-%d")))
+        jour += timedelta(days=1)
+    coefficients = [0.5, 1, 1, 1, 2, 2, 3]
+
     for id_eleve in ids_eleves:
         for _ in range(nb_notes_par_eleve):
             valeur = round(random.uniform(2, 20), 2)
-            coefficient = random.choice([0.5, 1, 1, 1, 2, 2, 3])
-            date_note = format_date_fr(date_aleatoire(debut_annee, fin_annee))
-            id_matiere = random.randint(1, len(MATIERES))
+            coefficient = random.choice(coefficients)
+            date_note, date_iso = random.choice(dates)
+            id_matiere = random.randint(1, nb_matieres)
+            yield valeur, coefficient, date_note, date_iso, id_eleve, id_matiere
 
-            cur.execute(
-                """
-                INSERT INTO Notes (valeur, coefficient, date_note, id_eleve, id_matiere)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (valeur, coefficient, date_note, id_eleve, id_matiere)
-            )
 
+def inserer_notes(cur, ids_eleves, nb_notes_par_eleve, nb_matieres=len(MATIERES)):
+    """Insère des notes aléatoires sur l'année scolaire."""
+    cur.executemany(
+        """
+        INSERT INTO Notes (valeur, coefficient, date_note, date_iso, id_eleve, id_matiere)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        generer_notes(ids_eleves, nb_notes_par_eleve, nb_matieres)
+    )
+    return len(ids_eleves) * nb_notes_par_eleve
 
-def inserer_emploi_du_temps(cur, nb_classes, mapping_profs):
-    """
-    Insère un EDT complet du lundi au vendredi, de 08h à 18h.
 
-    On crée des créneaux d'1h: 08-09, 09-10, ..., 17-18.
-    """
-    salles = [f"B{numero:02d}" for numero in range(1, 31)]
+def generer_emploi_du_temps(nb_classes, mapping_profs, nb_matieres):
+    """Produit les créneaux d'1h: 08-09, 09-10, ..., 17-18 pour chaque classe.
 
-    for id_classe in range(1, nb_classes + 1):
-        for jour in JOURS_SEMAINE:
-            for heure in range(8, 18):
-                id_matiere = random.randint(1, len(MATIERES))
+    Créneau par créneau, chaque classe reçoit une salle différente et une
+    matière dont le professeur n'a pas déjà cours : l'emploi du temps passe
+    `flask verifier-emploi-du-temps`. Seule exception : avec une seule
+    matière, les deux classes d'un même professeur se chevauchent forcément.
+    """
+    salles = [f"B{numero:02d}" for numero in range(1, max(30, nb_classes) + 1)]
+    matieres = list(range(1, nb_matieres + 1))
+
+    cours_par_classe = {id_classe: [] for id_classe in range(1, nb_classes + 1)}
+    for jour in JOURS_SEMAINE:
+        for heure in range(8, 18):
+            salles_du_creneau = random.sample(salles, nb_classes)
+            profs_occupes = set()
+            for id_classe, salle in zip(cours_par_classe, salles_du_creneau):
+                libres = [m for m in matieres if mapping_profs[(id_classe, m)] not in profs_occupes]
+                id_matiere = random.choice(libres or matieres)
                 id_prof = mapping_profs[(id_classe, id_matiere)]
+                profs_occupes.add(id_prof)
                 heure_debut = f"{heure:02d}:00"
                 heure_fin = f"{heure + 1:02d}:00"
-                salle = random.choice(salles)
+                cours_par_classe[id_classe].append((id_classe, jour, heure_debut, heure_fin, id_matiere, id_prof, salle))
 
-                cur.execute(
-                    """
-                    INSERT INTO EmploiDuTemps (
-                        id_classe, jour_semaine, heure_debut, heure_fin, id_matiere, id_prof, salle
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (id_classe, jour, heure_debut, heure_fin, id_matiere, id_prof, salle)
-                )
+    for cours in cours_par_classe.values():
+        yield from cours
+
+
+def inserer_emploi_du_temps(cur, nb_classes, mapping_profs, nb_matieres=len(MATIERES)):
+    """Insère un EDT complet du lundi au vendredi, de 08h à 18h."""
+    cur.executemany(
+        """
+        INSERT INTO EmploiDuTemps (
+            id_classe, jour_semaine, heure_debut, heure_fin, id_matiere, id_prof, salle
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        generer_emploi_du_temps(nb_classes, mapping_profs, nb_matieres)
+    )
+    return nb_classes * len(JOURS_SEMAINE) * 10
+
+
+def creer_index(cur):
+    """Crée les index une fois toutes les lignes insérées."""
+    for sql in INDEX_APRES_CHARGEMENT:
+        cur.execute(sql)
+    cur.execute("ANALYZE")
 
 
 def afficher_resume(cur):
@@ -293,8 +368,12 @@ def afficher_resume(cur):
 # MAIN
 # ---------------------------------------------------------------------
 
-def generer_base(chemin_db, seed):
-    """Génère une base complète en écrasant le fichier si besoin."""
+def generer_base(chemin_db, seed, nb_classes=10, eleves_par_classe=30, nb_notes_par_eleve=50,
+                 nb_matieres=len(MATIERES)):
+    """Génère une base complète en écrasant le fichier si besoin.
+
+    Retourne un petit rapport {étape: (lignes, secondes)} du chargement.
+    """
     random.seed(seed)
 
     if os.path.exists(chemin_db):
@@ -302,23 +381,65 @@ def generer_base(chemin_db, seed):
 
     conn = sqlite3.connect(chemin_db)
     cur = conn.cursor()
+    for pragma in PRAGMAS_CHARGEMENT:
+        cur.execute(pragma)
 
-    nb_classes = 10
-    eleves_par_classe = 30
-    nb_notes_par_eleve = 50
+    matieres = liste_matieres(nb_matieres)
+    rapport = {}
+
+    def mesurer(etape, fonction, *args):
+        debut = time.perf_counter()
+        resultat = fonction(*args)
+        rapport[etape] = (resultat if isinstance(resultat, int) else len(resultat), time.perf_counter() - debut)
+        return resultat
 
     creer_tables(cur)
-    inserer_classes(cur, nb_classes)
-    inserer_matieres(cur)
+    mesurer("Classes", inserer_classes, cur, nb_classes)
+    mesurer("Matieres", inserer_matieres, cur, matieres)
+
+    debut = time.perf_counter()
+    mapping_profs, nb_profs = creer_profs_par_matiere_et_classes(cur, nb_classes, matieres)
+    rapport["Professeurs"] = (nb_profs, time.perf_counter() - debut)
 
-    mapping_profs = creer_profs_par_matiere_et_classes(cur, nb_classes)
-    ids_eleves = inserer_eleves(cur, nb_classes, eleves_par_classe)
-    inserer_notes(cur, ids_eleves, nb_notes_par_eleve)
-    inserer_emploi_du_temps(cur, nb_classes, mapping_profs)
+    ids_eleves = mesurer("Eleves", inserer_eleves, cur, nb_classes, eleves_par_classe)
+    mesurer("Notes", inserer_notes, cur, ids_eleves, nb_notes_par_eleve, nb_matieres)
+    mesurer("EmploiDuTemps", inserer_emploi_du_temps, cur, nb_classes, mapping_profs, nb_matieres)
+    conn.commit()
 
+    debut = time.perf_counter()
+    creer_index(cur)
     conn.commit()
+    rapport["index"] = (0, time.perf_counter() - debut)
+
     afficher_resume(cur)
     conn.close()
+    return rapport
+
+
+def afficher_rapport(rapport):
+    """Affiche le débit obtenu pour chaque table."""
+    print("\nDébit du chargement:")
+    total_lignes = 0
+    total_secondes = 0
+    for etape, (lignes, secondes) in rapport.items():
+        total_lignes += lignes
+        total_secondes += secondes
+        if lignes:
+            print(f"- {etape}: {lignes} lignes en {secondes:.2f} s ({lignes / max(secondes, 1e-9):.0f} lignes/s)")
+        else:
+            print(f"- {etape}: {secondes:.2f} s")
+    print(f"Total: {total_lignes} lignes en {total_secondes:.2f} s ({total_lignes / max(total_secondes, 1e-9):.0f} lignes/s)")
+
+
+def entier_positif(texte):
+    """Type argparse : un entier au moins égal à 1."""
+    try:
+        valeur = int(texte)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"entier attendu, pas {texte!r}")
+    if valeur < 1:
+        raise argparse.ArgumentTypeError(f"doit être au moins 1 (reçu {valeur})")
+    return valeur
 
 
 def construire_arguments():
@@ -335,12 +456,20 @@ def construire_arguments():
         default=2026,
         help="Graine aléatoire pour retrouver le même jeu de données"
     )
+    parser.add_argument("--classes", type=entier_positif, default=10, help="Nombre de classes (défaut: 10)")
+    parser.add_argument("--eleves-par-classe", type=entier_positif, default=30, help="Élèves par classe (défaut: 30)")
+    parser.add_argument("--notes-par-eleve", type=entier_positif, default=50, help="Notes par élève (défaut: 50)")
+    parser.add_argument("--matieres", type=entier_positif, default=len(MATIERES),
+                        help=f"Nombre de matières (défaut: {len(MATIERES)})")
     return parser.parse_args()
 
 
 def main():
     args = construire_arguments()
-    generer_base(args.sortie, args.seed)
+    rapport = generer_base(
+        args.sortie, args.seed, args.classes, args.eleves_par_classe, args.notes_par_eleve, args.matieres
+    )
+    afficher_rapport(rapport)
     print(f"\nBase créée: {args.sortie}")
 
 
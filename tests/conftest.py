@@ -0,0 +1,54 @@
+"""Fixtures communes : l'application pointée sur une copie de pronote.db."""
+import importlib
+import os
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+
+@pytest.fixture(scope='session')
+def appli(tmp_path_factory):
+    """Module app importé une fois, avec ses fichiers annexes dans un dossier temporaire."""
+    dossier = tmp_path_factory.mktemp('appli')
+    os.environ['NOOB_NOTE_DB'] = str(dossier / 'pronote.db')
+    os.environ['NOOB_NOTE_SESSIONS_FICHIER'] = str(dossier / 'sessions.db')
+    os.environ['NOOB_NOTE_CACHE_FICHIER'] = str(dossier / 'cache_calculs.db')
+    # Hachage rapide : les tests se connectent souvent.
+    os.environ['NOOB_NOTE_HACHAGE_ITERATIONS'] = '1000'
+    return importlib.import_module('app')
+
+
+@pytest.fixture
+def base(appli, tmp_path):
+    """Copie migrée de pronote.db, utilisée par l'application le temps du test."""
+    chemin_db = str(tmp_path / 'pronote.db')
+    shutil.copy(os.path.join(RACINE, 'pronote.db'), chemin_db)
+    appli.appliquer_migrations(chemin_db)
+    ancien_chemin = appli.app.config['CHEMIN_DB']
+    appli.app.config['CHEMIN_DB'] = chemin_db
+    try:
+        yield chemin_db
+    finally:
+        appli.app.config['CHEMIN_DB'] = ancien_chemin
+
+
+@pytest.fixture
+def lire(base):
+    """Exécute une requête de lecture sur la base du test et retourne toutes les lignes."""
+    def lire(sql, params=()):
+        with sqlite3.connect(base) as conn:
+            return conn.execute(sql, params).fetchall()
+    return lire
+
+
+def connecter(appli, identifiant, mdp):
+    """Client de test déjà connecté."""
+    client = appli.app.test_client()
+    reponse = client.post('/login', data={'user_id': identifiant, 'mdp': mdp})
+    assert reponse.status_code == 302
+    return client
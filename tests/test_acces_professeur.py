@@ -0,0 +1,71 @@
+"""Un professeur ne voit que les classes (et les élèves) avec qui il a cours."""
+import pytest
+
+from conftest import connecter
+
+# p1_1 a cours avec les classes 1 et 2 dans la base fournie.
+PROF, MDP = 'p1_1', 'mdp_p1_1'
+CLASSE_ETRANGERE = 7
+
+
+@pytest.fixture
+def eleve_etranger(lire):
+    return lire("SELECT id_eleve FROM Eleves WHERE id_classe = ? LIMIT 1", (CLASSE_ETRANGERE,))[0][0]
+
+
+@pytest.fixture
+def client(appli, base):
+    return connecter(appli, PROF, MDP)
+
+
+@pytest.mark.parametrize('url', [
+    f'/api/v1/classes/{CLASSE_ETRANGERE}/statistiques',
+    f'/api/v1/classes/{CLASSE_ETRANGERE}/evolution',
+    f'/api/v1/classes/{CLASSE_ETRANGERE}/eleves',
+])
+def test_api_classe_refusee(client, url):
+    assert client.get(url).status_code == 403
+
+
+@pytest.mark.parametrize('suffixe', ['notes', 'evolution'])
+def test_api_eleve_refusee(client, eleve_etranger, suffixe):
+    assert client.get(f'/api/v1/eleves/{eleve_etranger}/{suffixe}').status_code == 403
+
+
+def test_pages_refusees(client, eleve_etranger):
+    for url in (f'/prof/statistiques/{CLASSE_ETRANGERE}', f'/prof/gestion/{eleve_etranger}'):
+        reponse = client.get(url)
+        assert reponse.status_code == 302
+        assert reponse.headers['Location'].endswith('/prof')
+
+
+def test_ajout_de_note_refuse(client, eleve_etranger, lire):
+    compter = "SELECT COUNT(*) FROM Notes WHERE id_eleve = ?"
+    avant = lire(compter, (eleve_etranger,))[0][0]
+    client.post(f'/prof/gestion/{eleve_etranger}', data={'ajouter': '1', 'matiere': '1', 'note': '20', 'coeff': '1'})
+    assert lire(compter, (eleve_etranger,))[0][0] == avant
+
+
+def test_classe_enseignee_acceptee(client):
+    assert client.get('/api/v1/classes/1/statistiques').status_code == 200
+    assert client.get('/prof/statistiques/1').status_code == 200
+
+
+@pytest.mark.parametrize('formulaire', [
+    {'matiere': '2', 'note': '12', 'coeff': '1'},
+    {'matiere': '1', 'note': '25', 'coeff': '1'},
+    {'matiere': '1', 'note': 'nan', 'coeff': '1'},
+    {'matiere': '1', 'note': '12', 'coeff': 'inf'},
+])
+def test_ajout_de_note_invalide_refuse(client, lire, formulaire):
+    compter = "SELECT COUNT(*) FROM Notes WHERE id_eleve = '1'"
+    avant = lire(compter)[0][0]
+    client.post('/prof/gestion/1', data={'ajouter': '1', **formulaire})
+    assert lire(compter)[0][0] == avant
+
+
+def test_ajout_de_note_dans_sa_matiere(client, lire):
+    compter = "SELECT COUNT(*) FROM Notes WHERE id_eleve = '1'"
+    avant = lire(compter)[0][0]
+    client.post('/prof/gestion/1', data={'ajouter': '1', 'matiere': '1', 'note': '14,5', 'coeff': '2'})
+    assert lire(compter)[0][0] == avant + 1
@@ -0,0 +1,83 @@
+"""Agrégats et sommes cumulées mis à jour à chaque écriture : identiques à un recalcul complet."""
+import math
+import random
+
+import pytest
+
+# Table -> nombre de colonnes de la clé (tri et comparaison exacte), les autres sont des sommes.
+TABLES = {
+    'AgregatsEleveMatiere': 2,
+    'AgregatsClasseMatiere': 2,
+    'EvolutionEleveMatiere': 3,
+    'EvolutionEleve': 2,
+}
+ELEVES = ['1', '2', '3', '4', '5']
+DATES = ['2025-09-05', '2025-11-15', '2026-01-20', '2026-05-02']
+
+
+@pytest.fixture
+def prof(appli, base):
+    return appli.Professeur('p1_1', '', '')
+
+
+def photographier(lire):
+    return {table: lire(f"SELECT * FROM {table} ORDER BY {', '.join(str(i + 1) for i in range(cle))}")
+            for table, cle in TABLES.items()}
+
+
+def verifier_comme_recalcul(appli, lire):
+    incremental = photographier(lire)
+    with appli.obtenir_pool().transaction() as cur:
+        appli.reconstruire_agregats(cur)
+    recalcul = photographier(lire)
+    for table, cle in TABLES.items():
+        assert len(incremental[table]) == len(recalcul[table]), table
+        for ligne, attendue in zip(incremental[table], recalcul[table]):
+            assert ligne[:cle] == attendue[:cle], table
+            assert all(math.isclose(a or 0, b or 0, abs_tol=1e-9) for a, b in zip(ligne[cle:], attendue[cle:])), \
+                (table, ligne, attendue)
+
+
+def ids_notes(lire, id_eleve):
+    return [id_note for id_note, in lire("SELECT id_note FROM Notes WHERE id_eleve = ?", (id_eleve,))]
+
+
+def test_ajout(appli, prof, lire):
+    prof.ajouter_note('1', 1, 15, 2)
+    verifier_comme_recalcul(appli, lire)
+
+
+def test_modification(appli, prof, lire):
+    prof.modifier_note(ids_notes(lire, '1')[0], 3.5, 4)
+    verifier_comme_recalcul(appli, lire)
+
+
+def test_suppression_de_toutes_les_notes_d_un_eleve(appli, prof, lire):
+    for id_note in ids_notes(lire, '2'):
+        prof.supprimer_note(id_note)
+    verifier_comme_recalcul(appli, lire)
+
+
+def test_saisie_groupee_a_une_date_passee(appli, prof, lire):
+    resultat = prof.ajouter_notes_en_lot(1, 1, '2', DATES[0], [(id_eleve, '11') for id_eleve in ELEVES])
+    assert resultat['ajoutees'] == len(ELEVES)
+    verifier_comme_recalcul(appli, lire)
+
+
+def test_suite_aleatoire_d_ecritures(appli, prof, lire):
+    hasard = random.Random(7)
+    for _ in range(150):
+        operation = hasard.random()
+        id_eleve = hasard.choice(ELEVES)
+        id_matiere = hasard.randint(1, 6)
+        ids = ids_notes(lire, id_eleve)
+        if operation < 0.3:
+            prof.ajouter_note(id_eleve, id_matiere, hasard.randint(0, 40) / 2, hasard.randint(1, 8) / 2)
+        elif operation < 0.5:
+            saisies = [(e, str(hasard.randint(0, 20))) for e in hasard.sample(ELEVES, 3)]
+            prof.ajouter_notes_en_lot(1, id_matiere, str(hasard.randint(1, 4)), hasard.choice(DATES), saisies)
+        elif operation < 0.75 and ids:
+            prof.modifier_note(hasard.choice(ids), hasard.randint(0, 40) / 2, hasard.randint(1, 8) / 2)
+        elif ids:
+            prof.supprimer_note(hasard.choice(ids))
+    verifier_comme_recalcul(appli, lire)
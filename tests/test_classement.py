@@ -0,0 +1,43 @@
+"""Classement d'une classe en une requête : mêmes rangs que le calcul élève par élève d'origine."""
+import pytest
+
+
+def classement_attendu(lire, id_classe):
+    """Ancien algorithme : moyenne pondérée de chaque camarade, tri stable par moyenne décroissante."""
+    moyennes = []
+    for id_eleve, in lire("SELECT id_eleve FROM Eleves WHERE id_classe = ?", (id_classe,)):
+        somme, coeffs = lire("SELECT SUM(valeur * coefficient), SUM(coefficient) FROM Notes WHERE id_eleve = ?",
+                             (id_eleve,))[0]
+        moyennes.append((id_eleve, somme / coeffs if coeffs else 0))
+    moyennes.sort(key=lambda ligne: ligne[1], reverse=True)
+    return {id_eleve: (rang, len(moyennes), round(moyenne, 2))
+            for rang, (id_eleve, moyenne) in enumerate(moyennes, start=1)}
+
+
+def classement_calcule(appli, lire, id_classe):
+    return {id_eleve: appli.Eleve(id_eleve, '', '').calculer_rang()
+            for id_eleve, in lire("SELECT id_eleve FROM Eleves WHERE id_classe = ?", (id_classe,))}
+
+
+@pytest.mark.parametrize('id_classe', [1, 7])
+def test_meme_classement_que_le_calcul_eleve_par_eleve(appli, lire, id_classe):
+    assert classement_calcule(appli, lire, id_classe) == classement_attendu(lire, id_classe)
+
+
+def test_classement_suit_les_notes(appli, lire):
+    classement_calcule(appli, lire, 1)  # met le classement en cache
+    dernier = max(classement_attendu(lire, 1).items(), key=lambda ligne: ligne[1][0])[0]
+    prof = appli.Professeur('p1_1', '', '')
+    for _ in range(20):
+        prof.ajouter_note(dernier, 1, 20, 8)
+    assert appli.Eleve(dernier, '', '').calculer_rang()[0] == 1
+    assert classement_calcule(appli, lire, 1) == classement_attendu(lire, 1)
+
+
+def test_eleve_sans_note(appli, lire):
+    with appli.obtenir_pool().transaction() as cur:
+        cur.execute("DELETE FROM Notes WHERE id_eleve = '3'")
+        appli.reconstruire_agregats(cur)
+    rang, effectif, moyenne = appli.Eleve('3', '', '').calculer_rang()
+    assert (rang, effectif, moyenne) == classement_attendu(lire, 1)['3']
+    assert moyenne == 0
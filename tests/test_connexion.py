@@ -0,0 +1,40 @@
+"""Connexion : mêmes coûts de hachage quel que soit le compte, échecs jamais mis en cache."""
+import pytest
+
+
+@pytest.fixture
+def hachages(appli, base, monkeypatch):
+    """Compte les appels à check_password_hash pendant le test."""
+    appels = []
+    original = appli.check_password_hash
+
+    def compter(*args):
+        appels.append(args)
+        return original(*args)
+
+    monkeypatch.setattr(appli, 'check_password_hash', compter)
+    appli.CACHE_CONNEXIONS.vider()
+    return appels
+
+
+@pytest.mark.parametrize('identifiant, mdp', [('1', 'pass1'), ('1', 'mauvais'), ('inconnu', 'pass1')])
+def test_un_hachage_par_tentative_sur_un_compte_en_clair(appli, hachages, identifiant, mdp):
+    appli.authentifier(identifiant, mdp)
+    assert len(hachages) == 1
+
+
+def test_echec_jamais_mis_en_cache(appli, hachages):
+    assert appli.authentifier('1', 'pass1') is not None  # le mot de passe est haché à cette connexion
+    del hachages[:]
+    for _ in range(3):
+        assert appli.authentifier('1', 'mauvais') is None
+    assert len(hachages) == 3
+    assert appli.CACHE_CONNEXIONS.statistiques()['entrees'] == 0
+
+
+def test_reussite_mise_en_cache(appli, hachages):
+    appli.authentifier('1', 'pass1')
+    del hachages[:]
+    for _ in range(3):
+        assert appli.authentifier('1', 'pass1') is not None
+    assert len(hachages) == 1
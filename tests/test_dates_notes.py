@@ -0,0 +1,62 @@
+"""Dates des notes en ISO : tri, semestres et pagination faits en SQL."""
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def eleve(appli, base):
+    return appli.Eleve('1', '', '')
+
+
+def en_iso(date_note):
+    return datetime.strptime(date_note, "%d/%m/%Y").strftime("%Y-%m-%d")
+
+
+def test_migration_remplit_date_iso(lire):
+    lignes = lire("SELECT date_note, date_iso FROM Notes")
+    assert lignes and all(date_iso == en_iso(date_note) for date_note, date_iso in lignes)
+
+
+def test_ajout_ecrit_les_deux_dates(appli, base, lire):
+    appli.Professeur('p1_1', '', '').ajouter_note('1', 1, 12, 1)
+    date_note, date_iso = lire("SELECT date_note, date_iso FROM Notes ORDER BY id_note DESC LIMIT 1")[0]
+    assert date_iso == en_iso(date_note)
+
+
+def test_tri_du_plus_recent_au_plus_ancien(eleve):
+    notes = eleve.voir_mes_notes_detaillees()
+    assert notes
+    assert [(n.date_iso, -n.id_note) for n in notes] == sorted(((n.date_iso, -n.id_note) for n in notes), reverse=True)
+
+
+@pytest.mark.parametrize('periode, mois', [('s1', {9, 10, 11, 12, 1}), ('s2', {2, 3, 4, 5, 6, 7})])
+def test_semestres_de_l_annee_scolaire(eleve, periode, mois):
+    toutes = eleve.voir_mes_notes_detaillees()
+    derniere = max(n.date_iso for n in toutes)
+    rentree = int(derniere[:4]) if int(derniere[5:7]) >= 8 else int(derniere[:4]) - 1
+
+    def dans_semestre(date_iso):
+        annee, numero_mois = int(date_iso[:4]), int(date_iso[5:7])
+        annee_scolaire = annee if numero_mois >= 8 else annee - 1
+        return annee_scolaire == rentree and numero_mois in mois
+
+    attendues = [n.id_note for n in toutes if dans_semestre(n.date_iso)]
+    assert [n.id_note for n in eleve.voir_mes_notes_detaillees(periode=periode)] == attendues
+
+
+def test_filtre_matiere(eleve):
+    notes = eleve.voir_mes_notes_detaillees(id_matiere=1)
+    assert notes and {n.id_matiere for n in notes} == {1}
+
+
+def test_pagination_par_curseur(eleve):
+    toutes = eleve.voir_mes_notes_detaillees()
+    pages, apres = [], None
+    while True:
+        page = eleve.voir_mes_notes_detaillees(limite=4, apres=apres)
+        if not page:
+            break
+        pages.extend(page)
+        apres = (page[-1].date_iso, page[-1].id_note)
+    assert pages == toutes
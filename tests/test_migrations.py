@@ -0,0 +1,52 @@
+"""Migrations : seule la commande migrer modifie le schéma."""
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from conftest import RACINE
+
+
+@pytest.fixture
+def base_non_migree(appli, tmp_path):
+    chemin_db = str(tmp_path / 'pronote.db')
+    shutil.copy(os.path.join(RACINE, 'pronote.db'), chemin_db)
+    ancien_chemin = appli.app.config['CHEMIN_DB']
+    appli.app.config['CHEMIN_DB'] = chemin_db
+    try:
+        yield chemin_db
+    finally:
+        appli.app.config['CHEMIN_DB'] = ancien_chemin
+
+
+def schema(chemin_db):
+    with sqlite3.connect(chemin_db) as conn:
+        return (conn.execute("PRAGMA journal_mode").fetchone()[0],
+                sorted(nom for nom, in conn.execute("SELECT name FROM sqlite_master")))
+
+
+def test_une_requete_ne_migre_pas_la_base(appli, base_non_migree):
+    avant = schema(base_non_migree)
+    assert appli.app.test_client().get('/login').status_code == 500
+    assert schema(base_non_migree) == avant
+
+
+def test_commande_migrer(appli, base_non_migree):
+    resultat = appli.app.test_cli_runner().invoke(args=['migrer', '--base', base_non_migree])
+    assert resultat.exit_code == 0, resultat.output
+    assert f"Version du schéma : {appli.MIGRATIONS[-1][0]}" in resultat.output
+    assert schema(base_non_migree)[0] == 'wal'
+    assert appli.app.test_client().get('/login').status_code == 200
+
+
+def test_base_sans_emploi_du_temps(appli, tmp_path):
+    """Les migrations publiées supposent la table EmploiDuTemps : elle est créée vide si elle manque."""
+    chemin_db = str(tmp_path / 'pronote.db')
+    shutil.copy(os.path.join(RACINE, 'pronote.db'), chemin_db)
+    with sqlite3.connect(chemin_db) as conn:
+        conn.execute("DROP TABLE EmploiDuTemps")
+    appli.appliquer_migrations(chemin_db)
+    with sqlite3.connect(chemin_db) as conn:
+        assert conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] == appli.MIGRATIONS[-1][0]
+        assert conn.execute("SELECT COUNT(*) FROM EmploiDuTemps").fetchone()[0] == 0
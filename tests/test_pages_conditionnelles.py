@@ -0,0 +1,42 @@
+"""Pages élève : 304 tant que les données de l'élève et de sa classe n'ont pas changé."""
+import pytest
+
+from conftest import connecter
+
+
+@pytest.fixture
+def client(appli, base):
+    return connecter(appli, '1', 'pass1')
+
+
+def revalider(client, url, etag):
+    return client.get(url, headers={'If-None-Match': f'"{etag}"'})
+
+
+@pytest.mark.parametrize('url', ['/eleve', '/eleve/resultats', '/eleve/emploi-du-temps'])
+def test_304_si_rien_n_a_change(client, url):
+    premiere = client.get(url)
+    etag, _ = premiere.get_etag()
+    assert premiere.status_code == 200 and etag
+    assert premiere.headers['Cache-Control'] == 'private, no-cache'
+
+    reponse = revalider(client, url, etag)
+    assert reponse.status_code == 304
+    assert reponse.data == b''
+    assert reponse.get_etag()[0] == etag
+
+
+@pytest.mark.parametrize('id_eleve, change', [('1', True), ('2', True), ('181', False)])
+def test_une_note_change_la_page_des_eleves_de_la_classe(appli, client, id_eleve, change):
+    etag, _ = client.get('/eleve').get_etag()
+    appli.Professeur('p1_1', '', '').ajouter_note(id_eleve, 1, 12, 1)
+    reponse = revalider(client, '/eleve', etag)
+    assert reponse.status_code == (200 if change else 304)
+    if change:
+        assert reponse.get_etag()[0] != etag
+
+
+def test_etag_propre_a_l_eleve_et_a_l_url(appli, client):
+    etag, _ = client.get('/eleve').get_etag()
+    assert revalider(client, '/eleve/resultats', etag).status_code == 200
+    assert revalider(connecter(appli, '2', 'pass2'), '/eleve', etag).status_code == 200
@@ -0,0 +1,63 @@
+"""Recherche d'élèves par préfixes dans l'index plein texte, accents ignorés."""
+import re
+import unicodedata
+
+import pytest
+
+
+@pytest.fixture
+def prof(appli, base):
+    return appli.Professeur('p1_1', '', '')
+
+
+def sans_accents(texte):
+    return unicodedata.normalize('NFKD', texte).encode('ascii', 'ignore').decode().lower()
+
+
+def attendus(lire, *prefixes):
+    """Élèves dont le nom, le prénom ou la classe a un mot qui commence par chaque préfixe."""
+    resultat = set()
+    for id_eleve, nom, prenom, nom_classe in lire(
+            "SELECT id_eleve, nom, prenom, nom_classe FROM Eleves JOIN Classes USING (id_classe)"):
+        mots = re.findall(r"\w+", sans_accents(f"{nom} {prenom} {nom_classe}"))
+        if all(any(mot.startswith(prefixe) for mot in mots) for prefixe in prefixes):
+            resultat.add(id_eleve)
+    return resultat
+
+
+def trouves(prof, texte):
+    return {ligne[0] for ligne in prof.chercher_eleve(texte, limite=10000)}
+
+
+@pytest.mark.parametrize('texte, prefixes', [
+    ('zoe', ['zoe']),
+    ('Zoé', ['zoe']),
+    ('zo ma', ['zo', 'ma']),
+    ('LEO', ['leo']),
+])
+def test_prefixes_sans_accents(prof, lire, texte, prefixes):
+    resultat = trouves(prof, texte)
+    assert resultat and resultat == attendus(lire, *prefixes)
+
+
+@pytest.mark.parametrize('texte', ['', '   ', '"*()', None])
+def test_saisie_vide(prof, texte):
+    assert prof.chercher_eleve(texte) == []
+
+
+def test_limite(prof):
+    assert len(prof.chercher_eleve('classe', limite=5)) == 5
+
+
+def test_index_suit_la_table_eleves(appli, prof):
+    def ecrire(sql):
+        with appli.obtenir_pool().transaction() as cur:
+            cur.execute(sql)
+
+    ecrire("INSERT INTO Eleves (id_eleve, nom, prenom, id_classe) VALUES ('9001', 'Quénard', 'Élodie', 1)")
+    assert '9001' in trouves(prof, 'quen elo')
+    ecrire("UPDATE Eleves SET nom = 'Xavier' WHERE id_eleve = '9001'")
+    assert '9001' not in trouves(prof, 'quen')
+    assert '9001' in trouves(prof, 'xav elo')
+    ecrire("DELETE FROM Eleves WHERE id_eleve = '9001'")
+    assert '9001' not in trouves(prof, 'xav elo')
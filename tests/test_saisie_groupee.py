@@ -0,0 +1,59 @@
+"""Saisie d'une évaluation entière : seules les lignes valides d'élèves de la classe sont écrites."""
+import io
+
+import pytest
+
+from conftest import connecter
+
+DATE = '2025-11-15'
+
+
+@pytest.fixture
+def prof(appli, base):
+    return appli.Professeur('p1_1', '', '')
+
+
+def nb_notes(lire, id_eleve):
+    return lire("SELECT COUNT(*) FROM Notes WHERE id_eleve = ?", (id_eleve,))[0][0]
+
+
+def test_lignes_valides_ecrites_et_erreurs_par_ligne(prof, lire):
+    resultat = prof.ajouter_notes_en_lot(1, 1, '2', DATE, [('1', '12'), ('2', '13,5'), ('3', 'abc'), ('4', '25')])
+    assert resultat['ajoutees'] == 2
+    assert [ligne for ligne, _, _ in resultat['erreurs']] == [3, 4]
+    assert lire("SELECT valeur, coefficient FROM Notes WHERE id_eleve = '2' AND date_iso = ?", (DATE,)) == [(13.5, 2.0)]
+
+
+def test_eleve_d_une_autre_classe_refuse(prof, lire):
+    avant = nb_notes(lire, '181')
+    resultat = prof.ajouter_notes_en_lot(1, 1, '1', DATE, [('181', '12'), ('1', '12')])
+    assert resultat['ajoutees'] == 1
+    assert resultat['erreurs'][0][:2] == (1, '181')
+    assert nb_notes(lire, '181') == avant
+
+
+@pytest.mark.parametrize('valeur', ['nan', 'inf', '-inf', '-1', '20.5'])
+def test_note_non_finie_ou_hors_bornes_refusee(prof, lire, valeur):
+    avant = nb_notes(lire, '1')
+    resultat = prof.ajouter_notes_en_lot(1, 1, '1', DATE, [('1', valeur)])
+    assert resultat['ajoutees'] == 0 and len(resultat['erreurs']) == 1
+    assert nb_notes(lire, '1') == avant
+
+
+@pytest.mark.parametrize('coeff', ['nan', 'inf', '0', '-2', '21', 'x'])
+def test_coefficient_invalide_refuse(prof, lire, coeff):
+    avant = nb_notes(lire, '1')
+    resultat = prof.ajouter_notes_en_lot(1, 1, coeff, DATE, [('1', '12')])
+    assert resultat['ajoutees'] == 0
+    assert nb_notes(lire, '1') == avant
+
+
+def test_csv_limite_a_la_classe_de_l_url(appli, base, lire):
+    client = connecter(appli, 'p1_1', 'mdp_p1_1')
+    avant = nb_notes(lire, '181')
+    fichier = io.BytesIO(b"id_eleve;note\n1;12\n181;15\n")
+    reponse = client.post('/prof/saisie/1', data={'matiere': '1', 'coeff': '1', 'date': DATE, 'fichier_csv': (fichier, 'notes.csv')},
+                          content_type='multipart/form-data')
+    assert reponse.status_code == 200
+    assert nb_notes(lire, '181') == avant
+    assert lire("SELECT COUNT(*) FROM Notes WHERE id_eleve = '1' AND date_iso = ?", (DATE,))[0][0] == 1
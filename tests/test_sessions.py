@@ -0,0 +1,27 @@
+"""Sessions côté serveur : le fichier n'est créé qu'à la première requête, à côté de la base."""
+import os
+import subprocess
+import sys
+
+from conftest import RACINE
+
+
+def test_import_sans_fichier_puis_sessions_a_cote_de_la_base(tmp_path):
+    dossier_courant = tmp_path / 'courant'
+    dossier_donnees = tmp_path / 'donnees'
+    dossier_courant.mkdir()
+    dossier_donnees.mkdir()
+    env = {cle: valeur for cle, valeur in os.environ.items() if not cle.startswith('NOOB_NOTE_')}
+    env['NOOB_NOTE_DB'] = str(dossier_donnees / 'pronote.db')
+
+    def lancer(code):
+        resultat = subprocess.run([sys.executable, '-c', f"import sys; sys.path.insert(0, {RACINE!r}); import app; {code}"],
+                                  cwd=dossier_courant, env=env, capture_output=True, text=True)
+        assert resultat.returncode == 0, resultat.stderr
+
+    lancer("")
+    assert os.listdir(dossier_courant) == [] and os.listdir(dossier_donnees) == []
+
+    lancer("app.app.session_interface.pool()")
+    assert os.listdir(dossier_courant) == []
+    assert 'sessions.db' in os.listdir(dossier_donnees)